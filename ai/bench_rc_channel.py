@@ -0,0 +1,103 @@
+"""Stick-to-motor latency of send_rc_control() in the Webots Tello client
+(djitellopy_webots.py): from the call until the setpoint arrives at the
+simulated drone, and until its control step picks it up (which adds up to
+one simulation time step).
+
+One software-in-the-loop drone (controllers/cfc/sil/run_swarm.py) runs in
+real time in this process, so both ends share time.perf_counter(). A
+control loop sends a new setpoint at --rate per second, over
+    http: an HTTP request per setpoint through the command scheduler
+    udp:  the fire-and-forget datagram channel (RcChannel, the default)
+while a --slow-every-th setpoint is followed by a query command, to show how
+a command in flight holds up the rc setpoints on the HTTP path.
+
+    python bench_rc_channel.py [--seconds 5] [--rate 50] [--slow-every 10]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+SIL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'controllers', 'cfc', 'sil')
+sys.path.append(SIL_DIR)
+
+from djitellopy_webots import Tello  # noqa: E402
+from run_swarm import build_swarm, run, start_server  # noqa: E402
+
+
+def control_loop(tello, seconds, rate, slow_every, sent_at):
+    """Send the setpoints (0, v, 0, 0) with v counting 1 to 99, recording
+    when each was handed to send_rc_control().
+    """
+    start = time.perf_counter()
+    for i in range(int(seconds * rate)):
+        value = i % 99 + 1
+        sent_at.append((value, time.perf_counter()))
+        tello.send_rc_control(0, value, 0, 0)
+        if slow_every and i % slow_every == 0:
+            # A query from another part of the application
+            threading.Thread(target=tello.query_battery, daemon=True).start()
+        delay = start + (i + 1) / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def bench(label, rc_udp, seconds, rate, slow_every):
+    swarm_server, drones = build_swarm(1)
+    server_thread = start_server(swarm_server)
+    applied = []
+    last = [0, None]
+
+    def after_step(robot, controller):
+        rc = controller.interpreter.rc
+        # The rc channel resends an unchanged setpoint, only a new value
+        # counts
+        if rc.sequence != last[0] and rc.value[1] != last[1]:
+            last[:] = rc.sequence, rc.value[1]
+            applied.append((rc.value[1], rc.received_at, time.perf_counter()))
+
+    sim = threading.Thread(target=lambda: run(drones, float('inf'), after_step, realtime=True,
+                                              wall_time=seconds + 1))
+    sim.start()
+    tello = Tello('127.0.0.1', rc_udp=rc_udp)
+    sent_at = []
+    control_loop(tello, seconds, rate, slow_every, sent_at)
+    sim.join()
+    tello.end()
+    swarm_server.stop()
+    server_thread.join()
+
+    # Setpoints the drone saw, matched to their latest send
+    latencies = []
+    sent = {}
+    order = iter(sent_at)
+    for value, received_at, applied_at in applied:
+        for sent_value, at in order:
+            sent[sent_value] = at
+            if sent_value == value:
+                break
+        if value in sent:
+            latencies.append((received_at - sent[value], applied_at - sent[value]))
+    latencies = np.asarray(latencies) * 1e3
+    print("{:5s} applied {:4d} of {:4d} setpoints".format(label, len(latencies), len(sent_at)))
+    for i, stage in enumerate(('arrival', 'applied')):
+        print("      {:8s} median {:6.2f} ms  p95 {:6.2f} ms  max {:7.2f} ms".format(
+            stage, np.median(latencies[:, i]), np.percentile(latencies[:, i], 95), latencies[:, i].max()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration of every measurement')
+    parser.add_argument('--rate', type=float, default=50, help='setpoints per second')
+    parser.add_argument('--slow-every', type=int, default=10, help='query after every n-th setpoint, 0 for none')
+    args = parser.parse_args()
+
+    Tello.LOGGER.setLevel(logging.WARNING)
+
+    for label, rc_udp in (('http', False), ('udp', True)):
+        bench(label, rc_udp, args.seconds, args.rate, args.slow_every)
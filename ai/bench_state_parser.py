@@ -0,0 +1,62 @@
+"""Time per state packet of the state parsers of djitellopy_webots.py:
+    dict:    Tello.parse_state(), as the state receiver used to do it
+    record:  StateParser.parse() into a preallocated TelloState
+    row:     StateParser.parse_into() into a row of a STATE_DTYPE array
+for a packet of the simulator, a packet with a mission pad detected and an
+SDK 1.3 packet (no mission pad fields, other layout).
+
+    python bench_state_parser.py [--packets 100000]
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+
+from djitellopy_webots import STATE_DTYPE, StateParser, Tello, TelloState
+
+PACKETS = {
+    'simulator': b'mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:3;roll:-2;yaw:45;vgx:12;vgy:-4;vgz:0;templ:60;temph:62;'
+                 b'tof:102;h:100;bat:97;baro:1.00;time:12;agx:5.00;agy:-3.00;agz:-1000.00;\r\n',
+    'mission pad': b'mid:4;x:10;y:-20;z:80;mpry:1,-2,30;pitch:0;roll:0;yaw:0;vgx:0;vgy:0;vgz:0;templ:60;temph:62;'
+                   b'tof:10;h:0;bat:100;baro:-52.21;time:0;agx:0.00;agy:0.00;agz:-1000.00;\r\n',
+    'sdk 1.3': b'pitch:1;roll:2;yaw:3;vgx:0;vgy:0;vgz:0;templ:60;temph:62;tof:10;h:0;bat:88;baro:0.50;time:0;'
+               b'agx:0.00;agy:0.00;agz:-998.00;\r\n',
+}
+
+
+def per_packet(function, count):
+    """Microseconds per call of function()."""
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--packets', type=int, default=100000)
+    args = parser.parse_args()
+
+    Tello.LOGGER.setLevel(logging.WARNING)
+    state_parser = StateParser()
+    record = TelloState()
+    history = np.zeros(1024, STATE_DTYPE)
+
+    def parse_dict(data):
+        state = Tello.parse_state(data.decode('ASCII'))
+        state['received_at'] = datetime.now()
+
+    def parse_record(data):
+        state_parser.parse(data, record)
+        record.received_at = time.time()
+
+    print("packet        dict us  record us  row us")
+    for name, data in PACKETS.items():
+        print("{:12s}  {:7.2f}  {:9.2f}  {:6.2f}".format(
+            name,
+            per_packet(lambda: parse_dict(data), args.packets),
+            per_packet(lambda: parse_record(data), args.packets),
+            per_packet(lambda: state_parser.parse_into(data, history, 7, time.time()), args.packets)))
@@ -0,0 +1,109 @@
+"""Commands per second of the Webots Tello client (djitellopy_webots.py)
+against a local stand-in for the simulator's HTTP server.
+
+The stand-in runs in its own process and answers every /send with "ok" over
+HTTP/1.1 keep-alive connections. Compared are:
+    new connection: requests.get() per command, as the client used to do
+    pooled:         the client's shared keep-alive session
+for blocking commands, for send_rc_control() called at 1 kHz and for a
+swarm of drones sharing the pool (all of 127.0.0.0/8 reaches the stand-in on
+Linux).
+
+    python bench_tello_client.py [--seconds 2] [--drones 10]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from djitellopy_webots import Tello
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # The status line and the body go out in separate writes, Nagle's
+    # algorithm would hold the body back for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, ready):
+    server = ThreadingHTTPServer(('0.0.0.0', port), StandInHandler)
+    ready.set()
+    server.serve_forever()
+
+
+def rate(function, seconds):
+    """Calls of function per second, over seconds."""
+    count = 0
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        function()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def make_tello(host, session=None):
+    # rc over HTTP like the other commands, the stand-in does not speak UDP
+    tello = Tello(host, session=session, rc_udp=False)
+    # Measure the transport, not the pacing of the client
+    tello.scheduler.interval = 0
+    tello.scheduler.rc_interval = 0
+    return tello
+
+
+def rc_rate(tello, seconds, calls=1000):
+    """rc commands sent per second while send_rc_control() is called calls
+    times per second. Setpoints replaced before they went out do not count.
+    """
+    sent = tello.scheduler.get_metrics()['rc_sent']
+    start = time.perf_counter()
+    for i in range(int(seconds * calls)):
+        tello.send_rc_control(0, 10, 0, 0)
+        delay = start + (i + 1) / calls - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return (tello.scheduler.get_metrics()['rc_sent'] - sent) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=2.0, help='duration of every measurement')
+    parser.add_argument('--drones', type=int, default=10, help='drones of the swarm measurement')
+    args = parser.parse_args()
+
+    Tello.LOGGER.setLevel(logging.WARNING)
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(Tello.CONTROL_UDP_PORT, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    # The requests module has the same get() as a session and opens a new
+    # connection for every call, like the client before the pool
+    for label, session in (('new connection', requests), ('pooled', None)):
+        tello = make_tello('127.0.0.1', session)
+        print("{:15s} command  {:7.0f} /s".format(label, rate(lambda: tello.send_command_with_return('battery?'),
+                                                             args.seconds)))
+        print("{:15s} rc       {:7.0f} /s".format(label, rc_rate(tello, args.seconds)))
+        swarm = [make_tello('127.0.0.{}'.format(i + 1), session) for i in range(args.drones)]
+        turn = iter(range(1 << 62))
+        print("{:15s} swarm    {:7.0f} /s over {} drones".format(
+            label, rate(lambda: swarm[next(turn) % len(swarm)].send_command_with_return('battery?'), args.seconds),
+            args.drones))
+
+    server.terminate()
@@ -0,0 +1,76 @@
+"""Command scheduling of the Webots Tello client (djitellopy_webots.py) under
+load, against the stand-in server of bench_tello_client.py.
+
+    backlog: --threads threads each send a move at once, with the default
+             pacing of 10 commands per second that is a backlog of seconds.
+             Then land() is called: its latency, and the moves it preempted.
+    rc:      send_rc_control() called at 1 kHz with rc commands paced to
+             --rc-rate per second: setpoints sent, replaced before sending
+             and the longest time a setpoint waited.
+
+    python bench_tello_scheduler.py [--threads 30] [--rc-rate 100]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import time
+from threading import Thread
+
+from bench_tello_client import serve
+from djitellopy_webots import Tello, TelloException
+
+
+def move(tello, results):
+    try:
+        tello.move_forward(20)
+        results.append('done')
+    except TelloException:
+        results.append('preempted')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=30, help='moves queued before land()')
+    parser.add_argument('--rc-rate', type=float, default=100, help='rc commands per second')
+    args = parser.parse_args()
+
+    Tello.LOGGER.setLevel(logging.WARNING)
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(Tello.CONTROL_UDP_PORT, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    tello = Tello('127.0.0.1')
+    results = []
+    threads = [Thread(target=move, args=(tello, results)) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    depth = tello.scheduler.get_metrics()['queue_depth']
+    start = time.perf_counter()
+    tello.land()
+    latency = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+    metrics = tello.scheduler.get_metrics()
+    print("backlog  queued moves {}, land() took {:.2f} ms, moves done {} preempted {}".format(
+        depth, latency * 1e3, results.count('done'), results.count('preempted')))
+    print("         command wait mean {:.0f} ms, max {:.0f} ms".format(
+        metrics['mean_wait'] * 1e3, metrics['max_wait'] * 1e3))
+
+    tello = Tello('127.0.0.2', rc_udp=False)
+    tello.scheduler.rc_interval = 1 / args.rc_rate
+    start = time.perf_counter()
+    for i in range(1000):
+        tello.send_rc_control(0, i % 100, 0, 0)
+        delay = start + (i + 1) / 1000 - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    time.sleep(0.05)
+    metrics = tello.scheduler.get_metrics()
+    print("rc       1000 setpoints in {:.2f} s: sent {}, replaced {}, max wait {:.1f} ms".format(
+        time.perf_counter() - start, metrics['rc_sent'], metrics['rc_superseded'], metrics['max_rc_wait'] * 1e3))
+
+    server.terminate()
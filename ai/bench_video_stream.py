@@ -0,0 +1,93 @@
+"""Frame rate and latency of the simulated camera stream read through
+BackgroundFrameRead (djitellopy_webots.py).
+
+Starts one software-in-the-loop drone in real time
+(controllers/cfc/sil/run_swarm.py), sends streamon and reads the frames the
+simulator publishes to shared memory, first as the newest frame view
+(tello.get_frame_read().frame), then through the queue
+(get_frame_read(with_queue=True)). Latency is the time from the publication
+of a frame in the simulation step to its first read.
+
+    python bench_video_stream.py [--seconds 5]
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from djitellopy_webots import Tello
+
+RUN_SWARM = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'controllers', 'cfc', 'sil',
+                         'run_swarm.py')
+
+
+def start_simulator(seconds):
+    simulator = subprocess.Popen([sys.executable, RUN_SWARM, '--drones', '1', '--realtime',
+                                  '--duration', str(seconds)], stdout=subprocess.DEVNULL)
+    tello = Tello('127.0.0.1')
+    end = time.time() + 10
+    while True:
+        try:
+            tello.connect(wait_for_state=False)
+            return simulator, tello
+        except Exception:
+            if time.time() > end or simulator.poll() is not None:
+                simulator.kill()
+                raise
+            time.sleep(0.1)
+
+
+def read_latest(tello, seconds):
+    """Frames seen by a consumer polling .frame, as fast as it can."""
+    frame_read = tello.get_frame_read()
+    seen = 0
+    last = frame_read.last_sequence
+    end = time.time() + seconds
+    while time.time() < end:
+        frame_read.frame
+        if frame_read.last_sequence != last:
+            seen += 1
+            last = frame_read.last_sequence
+        time.sleep(0.001)
+    return seen / seconds, frame_read.get_latency_stats()
+
+
+def read_queued(tello, seconds):
+    """Frames taken from the queue by a consumer draining it."""
+    frame_read = tello.get_frame_read(with_queue=True)
+    taken = 0
+    end = time.time() + seconds
+    while time.time() < end:
+        if frame_read.get_queued_frame() is not None:
+            taken += 1
+        else:
+            time.sleep(0.001)
+    return taken / seconds, frame_read.get_latency_stats()
+
+
+def report(label, fps, stats):
+    print("{:8s} {:5.1f} frames/s  latency mean {:.2f} ms  median {:.2f} ms  p95 {:.2f} ms  max {:.2f} ms"
+          "  (dropped {})".format(label, fps, stats['mean'] * 1e3, stats['median'] * 1e3, stats['p95'] * 1e3,
+                                  stats['max'] * 1e3, stats['dropped']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration of every measurement')
+    args = parser.parse_args()
+
+    Tello.LOGGER.setLevel(logging.WARNING)
+
+    simulator, tello = start_simulator(2 * args.seconds + 10)
+    try:
+        for label, read in (('latest', read_latest), ('queued', read_queued)):
+            tello.streamon()
+            report(label, *read(tello, args.seconds))
+            tello.streamoff()
+    finally:
+        tello.end()
+        simulator.terminate()
+        simulator.wait()
@@ -0,0 +1,101 @@
+"""Check that AsyncTello hands every reply to the command it answers when
+replies come late or get lost, against a stand-in drone on UDP that
+answers in order, "<command> reply", each reply after its own delay.
+
+    late:  the reply to the first command comes after its timeout, while
+           the second command waits for its own reply
+    lost:  the reply to the first command never comes
+    burst: every reply comes after the timeout of its command
+
+In every case a command must get its own reply or none (a timeout), never
+the reply of another command.
+
+    python check_async_replies.py [--timeout 0.3]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from djitellopy_webots import AsyncTello, Tello
+
+
+class StandInDrone(asyncio.DatagramProtocol):
+    """Answers the commands in order, the i-th after delays[i] seconds
+    (the last delay for the rest), or never for a delay of None.
+    """
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.received = 0
+        self.answered = None
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.answered = asyncio.get_running_loop().create_future()
+        self.answered.set_result(None)
+
+    def datagram_received(self, data, addr):
+        delay = self.delays[min(self.received, len(self.delays) - 1)]
+        self.received += 1
+        if delay is not None:
+            self.answered = asyncio.ensure_future(self.answer(self.answered, delay, data + b' reply', addr))
+
+    async def answer(self, previous, delay, reply, addr):
+        await asyncio.sleep(delay)
+        # In order, after the reply to the command before
+        await previous
+        self.transport.sendto(reply, addr)
+
+
+async def run_case(delays, commands, timeout):
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(lambda: StandInDrone(delays), local_addr=('127.0.0.1', 0))
+    tello = AsyncTello('127.0.0.1', port=transport.get_extra_info('sockname')[1])
+    replies = []
+    for command in commands:
+        replies.append(await tello.send_command_with_return(command, timeout=timeout))
+    # Let the late replies arrive before closing
+    await asyncio.sleep(2 * timeout)
+    tello.transport.close()
+    transport.close()
+    return replies
+
+
+def check(label, commands, replies, expected):
+    ok = True
+    for command, reply, own in zip(commands, replies, expected):
+        mine = reply == command + ' reply'
+        timed_out = reply.startswith('Aborting')
+        if not (mine or timed_out) or (own and not mine):
+            ok = False
+        print("  {:9s} -> {}".format(command, reply if not timed_out else 'timeout'))
+    print("{:6s} {}".format(label, 'OK' if ok else 'FAIL'))
+    return ok
+
+
+async def main(timeout):
+    commands = ['battery?', 'height?', 'speed?', 'time?', 'wifi?']
+    cases = [
+        # Reply to battery? late by 0.4 of the timeout, then fast replies
+        ('late', [1.4 * timeout, 0.05], [False, True, True, True, True]),
+        # battery? never answered, the commands after it must recover
+        ('lost', [None, 0.05], [False, False, True, True, True]),
+        ('burst', [1.2 * timeout], [False, False, False, False, False]),
+    ]
+    ok = True
+    for label, delays, expected in cases:
+        replies = await run_case(delays, commands, timeout)
+        ok = check(label, commands, replies, expected) and ok
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--timeout', type=float, default=0.3, help='seconds a command waits for its reply')
+    args = parser.parse_args()
+
+    Tello.LOGGER.setLevel(logging.ERROR)
+    sys.exit(0 if asyncio.run(main(args.timeout)) else 1)
@@ -1,12 +1,13 @@
 import cv2
-import time
 import numpy as np
 import collections
 
 from djitellopy import Tello, TelloSwarm
 from mp.scan import search_tello
 
-from mp.run import recognize_action, classes
+from mp.capture import LatestFrameCapture
+from mp.engine import GestureEngine
+from mp.pool import GesturePool
 
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QWidget, QVBoxLayout, QHBoxLayout, QFrame, QSizePolicy
@@ -39,6 +40,16 @@ def send_command(command):
 
 if __name__ == "__main__":
     swarm = False
+    # Pose inference in this many processes (mp/pool.py), 0 to run it here
+    workers = 0
+
+    # Loads MediaPipe and the model while the drone connects
+    if workers:
+        engine = GestureEngine()
+        pool = GesturePool(workers).start()
+    else:
+        engine = GestureEngine().start()
+        pool = None
 
     if swarm:
         tello = TelloSwarm.fromIps(search_tello())
@@ -54,13 +65,16 @@ if __name__ == "__main__":
     # stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
     # stream.set(3, 640)
     # stream.set(4, 480)
+    # Always the newest frame, not the ones OpenCV buffered during inference
+    capture = LatestFrameCapture(stream).start()
     print("Started")
 
-    if not stream.isOpened():
+    if not capture.isOpened():
         print("Cannot open camera")
         exit()
 
     height = 100
+    classes = engine.classes
 
     predictions_buffer = []
     frames_to_accumulate = 10
@@ -71,31 +85,58 @@ if __name__ == "__main__":
     try:
 
         while True:
-            (grabbed, frame) = stream.read()
-
-            frame = frame.copy()
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            r = recognize_action(frame_rgb)
-            if r:
-                prediction, frame_rgb = r
-
-                predicted = classes[int(prediction[0][0])]
-                predictions_buffer.append(predicted)
-
-                if len(predictions_buffer) == frames_to_accumulate:
-                    most_common = collections.Counter(predictions_buffer).most_common(1)[0][0]
-                    send_command(most_common)
-                    predictions_buffer = []
+            captured = capture.read()
+            if captured is None:
+                print("Can't receive frame (stream end?). Exiting ...")
+                break
 
-            frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-            cv2.imshow('Object detector', frame)
+            frame_rgb = cv2.cvtColor(captured.image, cv2.COLOR_BGR2RGB)
+            if pool is None:
+                results = [((captured, frame_rgb), engine.recognize_action(frame_rgb))]
+            else:
+                # The results finished so far, in frame order
+                try:
+                    pool.submit(frame_rgb, (captured, frame_rgb))
+                except RuntimeError as e:
+                    print(e)
+                    break
+                results = []
+                while True:
+                    try:
+                        result = pool.get(timeout=0)
+                    except RuntimeError as e:
+                        # A frame that failed or whose worker died, the others go on
+                        print(e)
+                        continue
+                    if result is None:
+                        break
+                    results.append(result)
+
+            for (captured, frame_rgb), r in results:
+                if r:
+                    prediction, frame_rgb = r
+
+                    predicted = classes[int(prediction[0][0])]
+                    predictions_buffer.append(predicted)
+
+                    if len(predictions_buffer) == frames_to_accumulate:
+                        most_common = collections.Counter(predictions_buffer).most_common(1)[0][0]
+                        send_command(most_common)
+                        predictions_buffer = []
+                capture.decided(captured)
+
+                frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+                cv2.imshow('Object detector', frame)
 
             if cv2.waitKey(1) == ord('q'):
                 break
 
-            time.sleep(0.025)
-            
     except KeyboardInterrupt:
         tello.land()
         cv2.waitKey(0)
         cv2.destroyAllWindows()
+    finally:
+        capture.release()
+        if pool is not None:
+            pool.close()
+        print("Camera to decision:", capture.get_latency_stats())
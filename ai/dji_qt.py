@@ -7,7 +7,8 @@ from collections import Counter
 from djitellopy import Tello, TelloSwarm
 from mp.scan import search_tello
 
-from mp.run import recognize_action, classes
+from mp.capture import LatestFrameCapture
+from mp.engine import GestureEngine
 
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -119,7 +120,7 @@ class TelloControlThread(QThread):
         self.running = False
 
 class MainWindow(QMainWindow):
-    def __init__(self, with_drone=False, with_swarm=False):
+    def __init__(self, with_drone=False, with_swarm=False, engine=None):
         super().__init__()
 
         self.setWindowTitle("Action Recognition + Drone Control")
@@ -195,10 +196,13 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.settings_button, alignment=Qt.AlignRight)  # Кнопка справа
         self.central_widget.setLayout(main_layout)
 
-        self.cap = cv2.VideoCapture(0)
+        self.engine = engine or GestureEngine().start()
+        # Newest frame only, read by a background thread
+        self.capture = LatestFrameCapture(0).start()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)
+        # Polls for a new frame without blocking the GUI thread
+        self.timer.start(5)
 
         # Дрон и контроллер дрона
         self.tello_control = TelloControlThread()
@@ -221,11 +225,16 @@ class MainWindow(QMainWindow):
         self.settings_window.activateWindow()
             
     def update_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
+        captured = self.capture.read(timeout=0)
+        if captured is None:
             return
-        imgRGB = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        response = recognize_action(imgRGB.copy())
+        imgRGB = cv2.cvtColor(captured.image, cv2.COLOR_BGR2RGB)
+        recognized = self.engine.ready()
+        if not recognized:
+            # Show the camera while the engine is still loading
+            response = None
+        else:
+            response = self.engine.recognize_action(imgRGB.copy())
         if response:
             prediction, imgRGB_draw = response
         else:
@@ -244,6 +253,7 @@ class MainWindow(QMainWindow):
         )
         self.image_label.setPixmap(pixmap)
         if prediction is not None:
+            classes = self.engine.classes
             self.text_label.setText(f"Predicted class: {classes[int(prediction[0][0])]}")
             if self.with_drone:
                 self.predictions_buffer.append(classes[int(prediction[0][0])])
@@ -253,6 +263,8 @@ class MainWindow(QMainWindow):
                     self.predictions_buffer = []
         else:
             self.text_label.setText("Predicted class: ...")
+        if recognized:
+            self.capture.decided(captured)
 
     def land_drone(self):
         self.tello_control.add_command("land")
@@ -267,7 +279,8 @@ class MainWindow(QMainWindow):
             self.with_drone = False
 
     def closeEvent(self, event):
-        self.cap.release()
+        self.capture.release()
+        print("Camera to decision:", self.capture.get_latency_stats())
         if self.with_drone:
             try:
                 self.tello_control.add_command("land")  # Send land command
@@ -439,25 +452,27 @@ if __name__ == "__main__":
 
         def start_with_drone(self):
             self.hide()
-            self.main = MainWindow(with_drone=True)
+            self.main = MainWindow(with_drone=True, engine=engine)
             self.main.show()
             self.main.raise_()
             self.main.activateWindow()
 
         def start_with_swarm(self):
             self.hide()
-            self.main = MainWindow(with_drone=True, with_swarm=True)
+            self.main = MainWindow(with_drone=True, with_swarm=True, engine=engine)
             self.main.show()
             self.main.raise_()
             self.main.activateWindow()
 
         def start_without_drone(self):
             self.hide()
-            self.main = MainWindow(with_drone=False)
+            self.main = MainWindow(with_drone=False, engine=engine)
             self.main.show()
             self.main.raise_()
             self.main.activateWindow()
 
+    # Loads MediaPipe and the model while the start window is shown
+    engine = GestureEngine().start()
     app = QApplication(sys.argv)
     start = StartWindow()
     start.show()
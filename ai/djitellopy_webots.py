@@ -2,22 +2,532 @@
 """
 
 # coding=utf-8
+import asyncio
+import json
 import logging
 import requests
+import socket
+import struct
+from requests.adapters import HTTPAdapter
 import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+from threading import Barrier, BrokenBarrierError, Condition, Lock, Thread
 from datetime import datetime
-from typing import Optional, Union, Type, Dict
+from typing import Any, Callable, Iterator, List, Optional, Union, Type, Deque, Dict
 
 import numpy as np
 
 
+threads_initialized = False
 drones: Optional[dict] = {}
+shared_session: Optional[requests.Session] = None
 
 
 class TelloException(Exception):
     pass
 
 
+class LatencyHistogram:
+    """Durations in fixed buckets, like a Prometheus histogram: constant
+    memory and a bisect per observation, so it can stay on all the time.
+    Internal class, see CommandStats.
+    """
+    # Upper bounds in seconds; one more bucket counts everything above
+    BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate of the q quantile, interpolated in its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.BOUNDS[i - 1] if i > 0 else 0.0
+                upper = self.BOUNDS[i] if i < len(self.BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+            'buckets': dict(zip([str(bound) for bound in self.BOUNDS] + ['+Inf'], self.counts)),
+        }
+
+
+class CommandStats:
+    """Per command verb (takeoff, battery?, rc, ...) of one drone: round trip
+    latency and throttle wait histograms, and counts of the commands sent,
+    retries, timeouts and failed attempts (error responses or transport
+    errors). Recording takes a lock and a few additions.
+
+        tello.get_stats()                    # dict, see snapshot()
+        tello.export_stats('prometheus')     # text exposition format
+    """
+
+    __slots__ = ('lock', 'verbs')
+
+    class Verb:
+        __slots__ = ('sent', 'retries', 'timeouts', 'failures', 'latency', 'wait')
+
+        def __init__(self):
+            self.sent = self.retries = self.timeouts = self.failures = 0
+            self.latency = LatencyHistogram()
+            self.wait = LatencyHistogram()
+
+    def __init__(self):
+        self.lock = Lock()
+        self.verbs: Dict[str, 'CommandStats.Verb'] = {}
+
+    def verb(self, command: str) -> 'CommandStats.Verb':
+        """The entry of the verb of command. Call with the lock held.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        verb = command.split(' ', 1)[0]
+        entry = self.verbs.get(verb)
+        if entry is None:
+            entry = self.verbs[verb] = CommandStats.Verb()
+        return entry
+
+    def record_latency(self, command: str, seconds: float):
+        """A response to command arrived seconds after it was sent."""
+        with self.lock:
+            entry = self.verb(command)
+            entry.sent += 1
+            entry.latency.observe(seconds)
+
+    def record_wait(self, command: str, seconds: float):
+        """command waited seconds for its turn before it was sent."""
+        with self.lock:
+            self.verb(command).wait.observe(seconds)
+
+    def record_retry(self, command: str):
+        with self.lock:
+            self.verb(command).retries += 1
+
+    def record_timeout(self, command: str):
+        with self.lock:
+            entry = self.verb(command)
+            entry.sent += 1
+            entry.timeouts += 1
+
+    def record_failure(self, command: str):
+        with self.lock:
+            self.verb(command).failures += 1
+
+    def snapshot(self) -> dict:
+        """{verb: {'sent', 'retries', 'timeouts', 'failures', 'latency',
+        'wait'}}, the histograms as LatencyHistogram.as_dict(), in seconds.
+        """
+        with self.lock:
+            return {verb: {
+                'sent': entry.sent,
+                'retries': entry.retries,
+                'timeouts': entry.timeouts,
+                'failures': entry.failures,
+                'latency': entry.latency.as_dict(),
+                'wait': entry.wait.as_dict(),
+            } for verb, entry in sorted(self.verbs.items())}
+
+    @staticmethod
+    def to_prometheus(stats_by_drone: Dict[str, 'CommandStats']) -> str:
+        """Prometheus text exposition of the stats of several drones,
+        {host: CommandStats}, labelled by drone and verb.
+        """
+        counters = (('sent', 'Commands sent'), ('retries', 'Retries after a failed attempt'),
+                    ('timeouts', 'Commands without a response in time'),
+                    ('failures', 'Attempts answered with an error or failed in transport'))
+        histograms = (('latency', 'Round trip from sending to the response'),
+                      ('wait', 'Wait for the rate limit and the queue before sending'))
+        snapshots = {drone: stats.snapshot() for drone, stats in stats_by_drone.items()}
+        lines = []
+        for name, help_text in counters:
+            lines.append('# HELP tello_command_{}_total {}.'.format(name, help_text))
+            lines.append('# TYPE tello_command_{}_total counter'.format(name))
+            for drone, snapshot in snapshots.items():
+                for verb, entry in snapshot.items():
+                    lines.append('tello_command_{}_total{{drone="{}",verb="{}"}} {}'.format(
+                        name, drone, verb, entry[name]))
+        for name, help_text in histograms:
+            metric = 'tello_command_{}_seconds'.format(name)
+            lines.append('# HELP {} {}.'.format(metric, help_text))
+            lines.append('# TYPE {} histogram'.format(metric))
+            for drone, snapshot in snapshots.items():
+                for verb, entry in snapshot.items():
+                    histogram = entry[name]
+                    cumulative = 0
+                    for bound, count in histogram['buckets'].items():
+                        cumulative += count
+                        lines.append('{}_bucket{{drone="{}",verb="{}",le="{}"}} {}'.format(
+                            metric, drone, verb, bound, cumulative))
+                    lines.append('{}_sum{{drone="{}",verb="{}"}} {}'.format(metric, drone, verb, histogram['sum']))
+                    lines.append('{}_count{{drone="{}",verb="{}"}} {}'.format(
+                        metric, drone, verb, histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+
+class CommandScheduler:
+    """Sends the commands of one drone from a worker thread, in three
+    priority classes:
+        safety: emergency, land and stop. preempt() cancels the queued
+                commands (except read commands, e.g. battery?) and drops the
+                pending rc setpoint; the caller then sends the safety command
+                right away, past the queue and the rate limit.
+        commands: everything else, first in first out, no more than one per
+                interval seconds on average and burst at once (token bucket).
+        rc:     latest wins. Only the newest setpoint waits to be sent, at
+                most one every rc_interval seconds, older ones are dropped.
+    get_metrics() reports the queue depth and how long commands waited.
+    Internal class, Tello creates one per drone.
+    """
+    SAFETY_COMMANDS = ('emergency', 'land', 'stop')
+
+    def __init__(self, send, send_without_return, interval: float, rc_interval: float, burst: int = 1,
+                 stats: Optional[CommandStats] = None):
+        """
+        Arguments:
+            send: function(command, timeout) sending a command and returning
+                the response text
+            send_without_return: function(command) sending a command
+            interval: seconds between commands, on average
+            rc_interval: minimum seconds between rc commands
+            burst: commands that may be sent back to back after a pause
+            stats: CommandStats to record the wait of every command in
+        """
+        self.send = send
+        self.send_without_return = send_without_return
+        self.interval = interval
+        self.rc_interval = rc_interval
+        self.burst = burst
+        self.stats = stats
+
+        self.condition = Condition()
+        # (command, timeout, future or None, enqueued at)
+        self.queue: Deque[tuple] = deque()
+        # The newest rc command and when it was submitted
+        self.rc: Optional[tuple] = None
+        # Token buckets, as the time the bucket of the class is full again
+        self.command_full_at = 0.0
+        self.rc_full_at = 0.0
+        self.worker: Optional[Thread] = None
+        self.closed = False
+
+        self.max_queue_depth = 0
+        self.sent = 0
+        self.safety_sent = 0
+        self.preempted = 0
+        self.rc_sent = 0
+        self.rc_superseded = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_rc_wait = 0.0
+
+    @classmethod
+    def is_safety(cls, command: str) -> bool:
+        return command.split(' ', 1)[0] in cls.SAFETY_COMMANDS
+
+    def start(self):
+        """Start the worker thread. Call with the condition held."""
+        if self.worker is None:
+            self.worker = Thread(target=self.run, daemon=True)
+            self.worker.start()
+
+    def submit(self, command: str, timeout: float, wait_for_return: bool = True) -> Optional[Future]:
+        """Queue a command. Returns a Future of the response text, or None
+        when wait_for_return is False.
+        """
+        future = Future() if wait_for_return else None
+        with self.condition:
+            if self.closed:
+                raise TelloException("Command '{}' was not sent, the Tello object was ended".format(command))
+            self.queue.append((command, timeout, future, time.monotonic()))
+            self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+            self.start()
+            self.condition.notify()
+        return future
+
+    def submit_rc(self, command: str):
+        """Make command the rc setpoint to send next, replacing a pending one."""
+        with self.condition:
+            if self.closed:
+                return
+            if self.rc is not None:
+                self.rc_superseded += 1
+            self.rc = (command, time.monotonic())
+            self.start()
+            self.condition.notify()
+
+    def preempt(self, command: str):
+        """Clear the way for the safety command command: cancel the queued
+        commands but the read commands and drop the pending rc setpoint. The
+        caller sends command itself.
+        """
+        with self.condition:
+            kept = deque()
+            for entry in self.queue:
+                queued, _, future, _ = entry
+                if queued.endswith('?'):
+                    kept.append(entry)
+                    continue
+                self.preempted += 1
+                if future is not None:
+                    future.set_exception(TelloException("Command '{}' was preempted by '{}'".format(queued, command)))
+            self.queue = kept
+            self.rc = None
+            self.safety_sent += 1
+
+    def take(self, now: float):
+        """Next (command, timeout, future, enqueued at) allowed to be sent at
+        now, or the time to wait for one (None: until notified). Call with
+        the condition held.
+        """
+        wait = None
+        if self.rc is not None:
+            if now >= self.rc_full_at:
+                command, submitted = self.rc
+                self.rc = None
+                self.rc_full_at = now + self.rc_interval
+                self.rc_sent += 1
+                self.max_rc_wait = max(self.max_rc_wait, now - submitted)
+                if self.stats is not None:
+                    self.stats.record_wait(command, now - submitted)
+                return (command, None, None, submitted), None
+            wait = self.rc_full_at - now
+        if self.queue:
+            # A bucket of burst tokens, one token per interval
+            allowed_at = self.command_full_at - (self.burst - 1) * self.interval
+            if now >= allowed_at:
+                entry = self.queue.popleft()
+                self.command_full_at = max(self.command_full_at, now) + self.interval
+                self.sent += 1
+                waited = now - entry[3]
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                if self.stats is not None:
+                    self.stats.record_wait(entry[0], waited)
+                return entry, None
+            wait = allowed_at - now if wait is None else min(wait, allowed_at - now)
+        return None, wait
+
+    def run(self):
+        """Worker thread: send the queued commands in order of priority.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        while True:
+            with self.condition:
+                entry, wait = self.take(time.monotonic())
+                while entry is None:
+                    if self.closed:
+                        return
+                    self.condition.wait(wait)
+                    entry, wait = self.take(time.monotonic())
+
+            command, timeout, future, _ = entry
+            if future is not None and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if future is None:
+                    self.send_without_return(command)
+                else:
+                    future.set_result(self.send(command, timeout))
+            except Exception as e:
+                if future is None:
+                    Tello.LOGGER.error("Failed to send command {}: {}".format(command, e))
+                else:
+                    future.set_exception(e)
+
+    def get_metrics(self) -> dict:
+        """Queue depth, commands sent per class and wait times (in seconds)
+        from submission until sending.
+        """
+        with self.condition:
+            return {
+                'queue_depth': len(self.queue),
+                'max_queue_depth': self.max_queue_depth,
+                'sent': self.sent,
+                'safety_sent': self.safety_sent,
+                'preempted': self.preempted,
+                'rc_sent': self.rc_sent,
+                'rc_superseded': self.rc_superseded,
+                'mean_wait': self.total_wait / self.sent if self.sent else 0.0,
+                'max_wait': self.max_wait,
+                'max_rc_wait': self.max_rc_wait,
+            }
+
+    def close(self):
+        """Cancel the queued commands and stop the worker thread."""
+        with self.condition:
+            self.closed = True
+            for command, _, future, _ in self.queue:
+                if future is not None:
+                    future.set_exception(TelloException("Command '{}' was not sent, the Tello object was ended"
+                                                        .format(command)))
+            self.queue.clear()
+            self.rc = None
+            self.condition.notify()
+
+
+class RcChannel:
+    """Fire-and-forget rc setpoints over UDP to the Tello command port of the
+    simulator, which never answers rc, instead of an HTTP request per
+    setpoint. submit() only stores the newest setpoint and a sender thread
+    transmits it: a new setpoint at most interval seconds after the previous
+    datagram, and the current one again every resend_interval seconds until
+    it is replaced, cleared, a control command takes over (stop_resending())
+    or the channel closes. So the drone always gets
+    the newest setpoint at a fixed rate, setpoints replaced before their
+    turn are dropped, and a lost datagram (say the rc 0 0 0 0 that stops
+    the drone) is made up for by the next one.
+    A full socket buffer or an unreachable simulator drops the datagram
+    instead of blocking the caller.
+    Internal class, Tello creates one per drone.
+    """
+
+    def __init__(self, address: tuple, interval: float, resend_interval: float):
+        """
+        Arguments:
+            address: (host, port) of the Tello command port
+            interval: minimum seconds between datagrams
+            resend_interval: seconds between datagrams of an unchanged setpoint
+        """
+        self.address = address
+        self.interval = interval
+        self.resend_interval = max(interval, resend_interval)
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.socket.connect(address)
+
+        self.condition = Condition()
+        # The newest setpoint, encoded, and when it was submitted; fresh
+        # until it is sent for the first time
+        self.setpoint: Optional[tuple] = None
+        self.fresh = False
+        # Send the setpoint once, not again
+        self.once = False
+        self.sent_at = float('-inf')
+        self.sender: Optional[Thread] = None
+        self.closed = False
+
+        self.sent = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.max_wait = 0.0
+
+    def submit(self, command: str):
+        """Make command the setpoint, replacing the current one."""
+        with self.condition:
+            if self.closed:
+                return
+            if self.fresh:
+                self.superseded += 1
+            self.setpoint = (command.encode('ascii'), time.monotonic())
+            self.fresh = True
+            self.once = False
+            if self.sender is None:
+                self.sender = Thread(target=self.run, daemon=True)
+                self.sender.start()
+            self.condition.notify()
+
+    def clear(self):
+        """Stop sending the setpoint, e.g. before a safety command."""
+        with self.condition:
+            if self.fresh:
+                self.superseded += 1
+            self.setpoint = None
+            self.fresh = False
+
+    def stop_resending(self):
+        """Stop resending the setpoint once it was sent, e.g. before a
+        maneuver that the keep-alive would override.
+        """
+        with self.condition:
+            if self.fresh:
+                self.once = True
+            else:
+                self.setpoint = None
+
+    def run(self):
+        """Sender thread.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        while True:
+            with self.condition:
+                while not self.closed:
+                    now = time.monotonic()
+                    if self.setpoint is None:
+                        self.condition.wait()
+                        continue
+                    due = self.sent_at + (self.interval if self.fresh else self.resend_interval)
+                    if now >= due:
+                        break
+                    self.condition.wait(due - now)
+                if self.closed:
+                    return
+                data, submitted = self.setpoint
+                if self.fresh:
+                    self.fresh = False
+                    self.max_wait = max(self.max_wait, now - submitted)
+                self.sent_at = now
+                if self.once:
+                    self.setpoint = None
+                    self.once = False
+                try:
+                    self.socket.send(data)
+                    self.sent += 1
+                except OSError:
+                    # Full buffer or ICMP port unreachable from an earlier datagram
+                    self.dropped += 1
+
+    def get_metrics(self) -> dict:
+        """Datagrams sent (resends included), setpoints replaced before
+        they were sent once, datagrams the socket refused and the longest
+        wait (in seconds) from submission to the first send.
+        """
+        with self.condition:
+            return {
+                'sent': self.sent,
+                'superseded': self.superseded,
+                'dropped': self.dropped,
+                'max_wait': self.max_wait,
+            }
+
+    def close(self):
+        """Stop the sender thread and close the socket."""
+        with self.condition:
+            self.closed = True
+            self.setpoint = None
+            self.condition.notify()
+        if self.sender is not None and self.sender.is_alive():
+            self.sender.join()
+        self.socket.close()
+
+
 class Tello:
     """Python wrapper to interact with the Ryze Tello drone using the official Tello api.
     Tello API documentation:
@@ -25,14 +535,25 @@ class Tello:
     [2.0 with EDU-only commands](https://dl-cdn.ryzerobotics.com/downloads/Tello/Tello%20SDK%202.0%20User%20Guide.pdf)
     """
     RESPONSE_TIMEOUT = 7  # in seconds
+    CONNECT_TIMEOUT = 1  # in seconds, to open a connection to the simulator
     TAKEOFF_TIMEOUT = 20  # in seconds
     FRAME_GRAB_TIMEOUT = 5
     TIME_BTW_COMMANDS = 0.1  # in seconds
     TIME_BTW_RC_CONTROL_COMMANDS = 0.001  # in seconds
+    RC_RESEND_INTERVAL = 0.02  # in seconds, of an unchanged rc setpoint over UDP
     RETRY_COUNT = 3  # number of retries after a failed command
     TELLO_IP = '127.0.0.1'  # Tello IP address
 
     CONTROL_UDP_PORT = 5000
+    STATE_UDP_PORT = 8890
+    COMMAND_UDP_PORT = 8889  # names the video stream, see get_udp_video_address()
+
+    STATE_HISTORY_SIZE = 1024  # state packets kept per drone, see StateHistory
+
+    # Keep-alive connections of the shared session: hosts to keep a pool for
+    # (one per drone of a swarm) and connections kept open per host
+    POOL_HOSTS = 32
+    POOL_SIZE = 4
 
     # Constants for video settings
     BITRATE_AUTO = 0
@@ -77,6 +598,11 @@ class Tello:
     state_field_converters = {key : int for key in INT_STATE_FIELDS}
     state_field_converters.update({key : float for key in FLOAT_STATE_FIELDS})
 
+    # Fields of a TelloState record, in the order of the SDK 2.0 state
+    # packets. The mission pad attitude 'mpry:pitch,roll,yaw' is split in three.
+    MPRY_FIELDS = ('mpry_pitch', 'mpry_roll', 'mpry_yaw')
+    STATE_FIELDS = INT_STATE_FIELDS[:4] + MPRY_FIELDS + INT_STATE_FIELDS[4:-1] + ('baro', 'time', 'agx', 'agy', 'agz')
+
     # VideoCapture object
     background_frame_read: Optional['BackgroundFrameRead'] = None
 
@@ -85,20 +611,68 @@ class Tello:
 
     def __init__(self,
                  host=TELLO_IP,
-                 retry_count=RETRY_COUNT):
+                 retry_count=RETRY_COUNT,
+                 session: Optional[requests.Session] = None,
+                 connect_timeout=CONNECT_TIMEOUT,
+                 rc_udp=True):
+        """
+        Arguments:
+            host: address of the simulated drone
+            retry_count: number of retries after a failed command
+            session: requests.Session to send the commands with. By default
+                all Tello instances share one, see get_shared_session()
+            connect_timeout: seconds to wait for a new connection
+            rc_udp: send rc commands as UDP datagrams to the command port,
+                see RcChannel, instead of HTTP requests through the scheduler
+        """
 
         global drones
 
         self.address = (host, Tello.CONTROL_UDP_PORT)
+        self.url = "http://{}:{}/send".format(host, Tello.CONTROL_UDP_PORT)
+        self.session = session if session is not None else Tello.get_shared_session()
+        self.connect_timeout = connect_timeout
         self.stream_on = False
         self.retry_count = retry_count
         self.last_received_command_timestamp = time.time()
         self.last_rc_control_timestamp = time.time()
+        self.stats = CommandStats()
+        # Commands are sent in order of priority by a worker thread, see
+        # CommandScheduler. Its rate limits can be changed on the fly.
+        self.scheduler = CommandScheduler(self.send_request, self.send_request, self.TIME_BTW_COMMANDS,
+                                          self.TIME_BTW_RC_CONTROL_COMMANDS, stats=self.stats)
+        self.rc_channel = RcChannel((host, Tello.COMMAND_UDP_PORT), self.TIME_BTW_RC_CONTROL_COMMANDS,
+                                    self.RC_RESEND_INTERVAL) \
+            if rc_udp else None
 
-        drones[host] = {'responses': [], 'state': {}}
+        Tello.start_state_receiver()
+
+        drones[host] = Tello.drone_entry()
 
         self.LOGGER.info("Tello instance was initialized. Host: '{}'. Port: '{}'.".format(host, Tello.CONTROL_UDP_PORT))
 
+    @staticmethod
+    def create_session(pool_hosts: int = POOL_HOSTS, pool_size: int = POOL_SIZE) -> requests.Session:
+        """Create a requests.Session keeping up to pool_size keep-alive
+        connections open to each of pool_hosts hosts. When all connections
+        to a host are busy, a command waits for one instead of opening more.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def get_shared_session() -> requests.Session:
+        """The session shared by all Tello instances of the process, created
+        on first use.
+        """
+        global shared_session
+
+        if shared_session is None:
+            shared_session = Tello.create_session()
+        return shared_session
+
     def get_own_udp_object(self):
         """Get own object from the global drones dict. This object is filled
         with responses and state information by the receiver threads.
@@ -109,6 +683,74 @@ class Tello:
         host = self.address[0]
         return drones[host]
 
+    @staticmethod
+    def drone_entry() -> dict:
+        """A new entry of the global drones dict, filled by the state receiver.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        return {'responses': [], 'state': None, 'spare': TelloState(),
+                'history': StateHistory(Tello.STATE_HISTORY_SIZE)}
+
+    @staticmethod
+    def start_state_receiver():
+        """Run the state UDP receiver in a background thread, once per
+        process. Tello and AsyncTello instances share it.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        global threads_initialized
+
+        if not threads_initialized:
+            state_receiver_thread = Thread(target=Tello.udp_state_receiver)
+            state_receiver_thread.daemon = True
+            state_receiver_thread.start()
+
+            threads_initialized = True
+
+    @staticmethod
+    def udp_state_receiver():
+        """Setup state UDP receiver. This method listens for state information from
+        the simulator, which pushes it at a fixed rate, and keeps the latest
+        state of every drone so that the get_* functions never go to the network.
+        Must be run from a background thread in order to not block the main thread.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        state_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        state_socket.bind(("", Tello.STATE_UDP_PORT))
+        parser = StateParser()
+
+        while True:
+            try:
+                data, address = state_socket.recvfrom(1024)
+
+                drone = drones.get(address[0])
+                if drone is None:
+                    continue
+
+                # Every drone has two records: packets are parsed into the
+                # spare one, which then replaces the current one. Readers
+                # always see one complete packet, and no record is allocated
+                # per packet.
+                parsed = parser.values(data)
+                if parsed is None:
+                    continue
+                received_at = time.time()
+                drone['history'].append(*parsed, received_at)
+                record = drone['spare']
+                StateParser.fill_record(record, *parsed)
+                record.received_at = received_at
+                drone['spare'] = drone['state'] or TelloState()
+                drone['state'] = record
+
+            except OSError as e:
+                if state_socket.fileno() == -1:
+                    # The socket was closed, nothing more to receive
+                    break
+                # A transient socket error, keep the telemetry flowing
+                Tello.LOGGER.error('State receiver: {}'.format(e))
+            except Exception as e:
+                # One bad packet must not stop the state updates for good
+                Tello.LOGGER.error('State receiver: {}'.format(e))
+
     @staticmethod
     def parse_state(state: str) -> Dict[str, Union[int, float, str]]:
         """Parse a state line to a dictionary
@@ -145,19 +787,32 @@ class Tello:
 
     def get_current_state(self) -> dict:
         """Call this function to attain the state of the Tello. Returns a dict
-        with all fields.
+        with all fields, empty before the first state packet.
         Internal method, you normally wouldn't call this yourself.
         """
+        record = self.get_own_udp_object()['state']
+        return record.as_dict() if record is not None else {}
+
+    def get_state_record(self) -> Optional['TelloState']:
+        """The TelloState of the latest state packet, None before the first
+        one. It is reused for the packet after the next one.
+        """
         return self.get_own_udp_object()['state']
 
+    def get_state_history(self) -> 'StateHistory':
+        """The StateHistory of the last STATE_HISTORY_SIZE state packets, e.g.
+        get_state_history().mean('h', 2) for the mean height over the last 2 s.
+        """
+        return self.get_own_udp_object()['history']
+
     def get_state_field(self, key: str):
         """Get a specific sate field by name.
         Internal method, you normally wouldn't call this yourself.
         """
-        state = self.get_current_state()
+        record = self.get_own_udp_object()['state']
 
-        if key in state:
-            return state[key]
+        if record is not None and key in TelloState.__slots__:
+            return getattr(record, key)
         else:
             raise TelloException('Could not get state property: {}'.format(key))
 
@@ -167,7 +822,7 @@ class Tello:
         Returns:
             datetime: last state update
         """
-        return self.get_state_field('received_at')
+        return datetime.fromtimestamp(self.get_state_field('received_at'))
 
     def get_mission_pad_id(self) -> int:
         """Mission pad ID of the currently detected mission pad
@@ -324,56 +979,135 @@ class Tello:
         """
         return self.get_state_field('bat')
 
-    def get_udp_video_address(self) -> str:
-        raise NotImplementedError("This method is not implemented yet")
-
-    def get_frame_read(self, with_queue = False, max_queue_len = 32):
-        raise NotImplementedError("This method is not implemented yet")
+    def get_stats(self) -> dict:
+        """Instrumentation of the commands sent to this drone: per command
+        verb the round trip latency and throttle wait (in seconds), retries,
+        timeouts and failures (see CommandStats.snapshot()), and the
+        metrics of the scheduler and of the rc channel.
+        """
+        return {
+            'drone': self.address[0],
+            'commands': self.stats.snapshot(),
+            'scheduler': self.scheduler.get_metrics(),
+            'rc_channel': self.rc_channel.get_metrics() if self.rc_channel is not None else None,
+        }
+
+    def export_stats(self, format: str = 'json') -> str:
+        """get_stats() as JSON, or the per verb stats in the Prometheus text
+        exposition format ('prometheus'), labelled with the drone address.
+        """
+        if format == 'json':
+            return json.dumps(self.get_stats())
+        if format == 'prometheus':
+            return CommandStats.to_prometheus({self.address[0]: self.stats})
+        raise ValueError("Unknown stats format '{}', use 'json' or 'prometheus'".format(format))
 
-    def send_command_with_return(self, command: str, timeout: int = RESPONSE_TIMEOUT) -> str:
-        """Send command to Tello and wait for its response.
+    def get_udp_video_address(self) -> str:
+        """Name of the shared memory block the simulator publishes the camera
+        frames to, the simulated counterpart of the UDP video address.
         Internal method, you normally wouldn't call this yourself.
-        Return:
-            bool/str: str with response text on success, False when unsuccessfull.
         """
-        # Commands very consecutive makes the drone not respond to them.
-        # So wait at least self.TIME_BTW_COMMANDS seconds
-        diff = time.time() - self.last_received_command_timestamp
-        if diff < self.TIME_BTW_COMMANDS:
-            self.LOGGER.debug('Waiting {} seconds to execute command: {}...'.format(diff, command))
-            time.sleep(diff)
+        host = self.address[0]
+        if host in ('0.0.0.0', 'localhost'):
+            host = '127.0.0.1'
+        return 'tello_video_{}_{}'.format(host, Tello.COMMAND_UDP_PORT)
+
+    def get_frame_read(self, with_queue = False, max_queue_len = 32) -> 'BackgroundFrameRead':
+        """Get the BackgroundFrameRead object from the camera drone. Then, you just need to call
+        backgroundFrameRead.frame to get the actual frame received by the drone.
+        Call streamon() first.
+        Arguments:
+            with_queue: also collect every frame in a queue, see
+                BackgroundFrameRead.get_queued_frame()
+            max_queue_len: frames kept in the queue
+        Returns:
+            BackgroundFrameRead
+        """
+        if self.background_frame_read is None:
+            address = self.get_udp_video_address()
+            self.background_frame_read = BackgroundFrameRead(self, address, with_queue, max_queue_len)
+            self.background_frame_read.start()
+        return self.background_frame_read
 
-        self.LOGGER.info("Send command: '{}'".format(command))
+    def send_request(self, command: str, timeout: float = RESPONSE_TIMEOUT) -> str:
+        """Send command to the simulator right away and return the response text.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if command.startswith('rc '):
+            # Debug level, rc commands come in at up to 1 kHz
+            self.LOGGER.debug("Send command (no response expected): '{}'".format(command))
+        else:
+            self.LOGGER.info("Send command: '{}'".format(command))
 
-        r = requests.get(
-            f"http://{self.address[0]}:{self.address[1]}/send",
-            params={'command': command.encode('utf-8')},
-            timeout=timeout,
-        )
+        start = time.perf_counter()
+        try:
+            r = self.session.get(self.url, params={'command': command}, timeout=(self.connect_timeout, timeout))
+        except requests.Timeout:
+            self.stats.record_timeout(command)
+            raise
+        except requests.RequestException:
+            self.stats.record_failure(command)
+            raise
+        self.stats.record_latency(command, time.perf_counter() - start)
+        self.last_received_command_timestamp = time.time()
         if r.status_code == 200:
-            self.LOGGER.info(f"Command {command} sent successfully.")
+            self.LOGGER.debug(f"Command {command} sent successfully.")
         else:
+            # Counted as a failure by the caller that checks the reply, once
             self.LOGGER.error(f"Failed to send command {command}. Status code: {r.status_code}")
 
         return r.text
 
-    def send_command_without_return(self, command: str):
-        """Send command to Tello without expecting a response.
+    def send_command_with_return(self, command: str, timeout: int = RESPONSE_TIMEOUT) -> str:
+        """Send command to Tello and wait for its response.
+        Commands very consecutive makes the drone not respond to them, so the
+        scheduler sends at most one every self.TIME_BTW_COMMANDS seconds.
+        Safety commands (emergency, land, stop) cancel the queued commands
+        and are sent right away.
         Internal method, you normally wouldn't call this yourself.
+        Return:
+            str: response text
         """
-        # Commands very consecutive makes the drone not respond to them. So wait at least self.TIME_BTW_COMMANDS seconds
+        if CommandScheduler.is_safety(command):
+            self.preempt(command)
+            return self.send_request(command, timeout)
 
-        self.LOGGER.info("Send command (no response expected): '{}'".format(command))
+        self.stop_rc(command)
+        return self.scheduler.submit(command, timeout).result()
 
-        r = requests.get(
-            f"http://{self.address[0]}:{self.address[1]}/send",
-            params={'command': command.encode('utf-8')},
-            timeout=self.RESPONSE_TIMEOUT,
-        )
-        if r.status_code == 200:
-            self.LOGGER.info(f"Command {command} sent successfully.")
+    def send_command_without_return(self, command: str):
+        """Send command to Tello without expecting a response. rc commands
+        are latest-wins: a setpoint not sent yet is replaced by a newer one.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if command.startswith('rc '):
+            if self.rc_channel is not None:
+                self.rc_channel.submit(command)
+            else:
+                self.scheduler.submit_rc(command)
+        elif CommandScheduler.is_safety(command):
+            self.preempt(command)
+            self.send_request(command)
         else:
-            self.LOGGER.error(f"Failed to send command {command}. Status code: {r.status_code}")
+            self.stop_rc(command)
+            self.scheduler.submit(command, self.RESPONSE_TIMEOUT, wait_for_return=False)
+
+    def stop_rc(self, command: str):
+        """Stop resending the rc setpoint before a control command, queries
+        leave it alone.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if self.rc_channel is not None and not command.endswith('?'):
+            self.rc_channel.stop_resending()
+
+    def preempt(self, command: str):
+        """Cancel the queued commands and the pending rc setpoint before the
+        safety command is sent.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        self.scheduler.preempt(command)
+        if self.rc_channel is not None:
+            self.rc_channel.clear()
 
     def send_control_command(self, command: str, timeout: int = RESPONSE_TIMEOUT) -> bool:
         """Send control command to Tello and wait for its response.
@@ -381,11 +1115,14 @@ class Tello:
         """
         response = "max retries exceeded"
         for i in range(0, self.retry_count):
+            if i > 0:
+                self.stats.record_retry(command)
             response = self.send_command_with_return(command, timeout=timeout)
 
             if 'ok' in response.lower():
                 return True
 
+            self.stats.record_failure(command)
             self.LOGGER.debug("Command attempt #{} failed for command: '{}'".format(i, command))
 
         self.raise_result_error(command, response)
@@ -404,6 +1141,7 @@ class Tello:
             self.LOGGER.error(e)
 
         if any(word in response for word in ('error', 'ERROR', 'False')):
+            self.stats.record_failure(command)
             self.raise_result_error(command, response)
             return "Error: this code should never be reached"
 
@@ -486,10 +1224,20 @@ class Tello:
         self.is_flying = False
 
     def streamon(self):
-        raise NotImplementedError("This method is not implemented yet")
+        """Turn on video streaming. Use `tello.get_frame_read` afterwards.
+        """
+        self.send_control_command("streamon")
+        self.stream_on = True
 
     def streamoff(self):
-        raise NotImplementedError("This method is not implemented yet")
+        """Turn off video streaming.
+        """
+        self.send_control_command("streamoff")
+        self.stream_on = False
+
+        if self.background_frame_read is not None:
+            self.background_frame_read.stop()
+            self.background_frame_read = None
 
     def emergency(self):
         """Stop all motors immediately.
@@ -705,7 +1453,9 @@ class Tello:
 
     def send_rc_control(self, left_right_velocity: int, forward_backward_velocity: int, up_down_velocity: int,
                         yaw_velocity: int):
-        """Send RC control via four channels. Command is sent every self.TIME_BTW_RC_CONTROL_COMMANDS seconds.
+        """Send RC control via four channels. Returns right away; the commands
+        go out as UDP datagrams at most every self.TIME_BTW_RC_CONTROL_COMMANDS
+        seconds, always the latest setpoint.
         Arguments:
             left_right_velocity: -100~100 (left/right)
             forward_backward_velocity: -100~100 (forward/backward)
@@ -715,15 +1465,14 @@ class Tello:
         def clamp100(x: int) -> int:
             return max(-100, min(100, x))
 
-        if time.time() - self.last_rc_control_timestamp > self.TIME_BTW_RC_CONTROL_COMMANDS:
-            self.last_rc_control_timestamp = time.time()
-            cmd = 'rc {} {} {} {}'.format(
-                clamp100(left_right_velocity),
-                clamp100(forward_backward_velocity),
-                clamp100(up_down_velocity),
-                clamp100(yaw_velocity)
-            )
-            self.send_command_without_return(cmd)
+        self.last_rc_control_timestamp = time.time()
+        cmd = 'rc {} {} {} {}'.format(
+            clamp100(left_right_velocity),
+            clamp100(forward_backward_velocity),
+            clamp100(up_down_velocity),
+            clamp100(yaw_velocity)
+        )
+        self.send_command_without_return(cmd)
 
     def set_wifi_credentials(self, ssid: str, password: str):
         """Set the Wi-Fi SSID and password. The Tello will reboot afterwords.
@@ -912,9 +1661,1336 @@ class Tello:
             self.background_frame_read.stop()
             self.background_frame_read = None
 
+        self.scheduler.close()
+        if self.rc_channel is not None:
+            self.rc_channel.close()
+
         host = self.address[0]
         if host in drones:
             del drones[host]
 
     def __del__(self):
         self.end()
+
+
+class TelloState:
+    """The fields of one state packet, Tello.STATE_FIELDS, and the time
+    (time.time()) it was received. StateParser fills a record in place.
+    Fields missing from a packet keep their value.
+    """
+    __slots__ = Tello.STATE_FIELDS + ('received_at',)
+
+    def __init__(self):
+        for name in Tello.STATE_FIELDS:
+            setattr(self, name, 0.0 if name in Tello.FLOAT_STATE_FIELDS else 0)
+        self.mid = -1
+        self.received_at = 0.0
+
+    def set_values(self, values):
+        """Set all of Tello.STATE_FIELDS, values in their order."""
+        (self.mid, self.x, self.y, self.z, self.mpry_pitch, self.mpry_roll, self.mpry_yaw,
+         self.pitch, self.roll, self.yaw, self.vgx, self.vgy, self.vgz, self.templ, self.temph,
+         self.tof, self.h, self.bat, self.baro, self.time, self.agx, self.agy, self.agz) = values
+
+    def as_dict(self) -> dict:
+        """The fields as a dict, like Tello.parse_state() with received_at
+        as a datetime.
+        """
+        state = {name: getattr(self, name) for name in Tello.STATE_FIELDS}
+        state['received_at'] = datetime.fromtimestamp(self.received_at)
+        return state
+
+
+# One row of a state history, the fields of TelloState
+STATE_DTYPE = np.dtype([(name, '<f8' if name in Tello.FLOAT_STATE_FIELDS else '<i4')
+                        for name in Tello.STATE_FIELDS] + [('received_at', '<f8')])
+
+
+class StateParser:
+    """Parses state packets straight into a TelloState or a row of a
+    STATE_DTYPE array, without a dict or a string per field.
+
+    The keys of a packet (its layout) are the same from packet to packet. A
+    translate() that deletes the values gives them, and the record field of
+    every value is looked up once per layout. Another translate() deletes
+    the keys, and the values, now a comma-separated list, are decoded in one
+    go by the JSON decoder, ints as int and floats as float. Packets the
+    decoder rejects go through Tello.parse_state() instead.
+    """
+    # Deleted to leave the keys, e.g. b'mid:;x:;...;mpry:,,;...'
+    VALUE_BYTES = b'0123456789.-+'
+    # Deleted to leave the values
+    KEY_BYTES = bytes(range(ord('a'), ord('z') + 1)) + bytes(range(ord('A'), ord('Z') + 1)) + b': \r\n'
+    SEPARATORS = bytes.maketrans(b';', b',')
+    MAX_LAYOUTS = 64
+
+    def __init__(self):
+        # Layout -> record field of every value, None for unknown keys
+        self.layouts: Dict[bytes, tuple] = {}
+        self.decode = json.JSONDecoder().raw_decode
+
+    @staticmethod
+    def plan(layout: bytes) -> tuple:
+        """Record field of every value of a packet with the given layout.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        fields = []
+        for item in layout.decode('ascii', 'replace').split(';'):
+            key, _, commas = item.partition(':')
+            if not key or not _:
+                continue
+            if key == 'mpry' and commas == ',,':
+                fields.extend(Tello.MPRY_FIELDS)
+            elif key in Tello.state_field_converters and not commas:
+                fields.append(key)
+            else:
+                fields.extend([None] * (len(commas) + 1))
+        fields = tuple(fields)
+        # The common layout is recognised by identity
+        return Tello.STATE_FIELDS if fields == Tello.STATE_FIELDS else fields
+
+    def values(self, data: bytes):
+        """The record fields and the values of a state packet, None for a
+        packet without state ('ok').
+        """
+        layout = data.translate(None, self.VALUE_BYTES)
+        fields = self.layouts.get(layout)
+        if fields is None:
+            # Values with letters make a layout of their own, keep that bounded
+            if len(self.layouts) >= self.MAX_LAYOUTS:
+                self.layouts.clear()
+            fields = self.layouts[layout] = self.plan(layout)
+        if not fields:
+            return None
+        try:
+            text = data.translate(self.SEPARATORS, self.KEY_BYTES).decode('ascii')
+            values, _ = self.decode('[' + text.rstrip(',') + ']')
+            if len(values) == len(fields):
+                return fields, values
+        except ValueError:
+            pass
+        return self.values_of_dict(Tello.parse_state(data.decode('ascii', 'replace')))
+
+    @staticmethod
+    def values_of_dict(state: dict):
+        """The record fields and values of a dict of Tello.parse_state(), None
+        if it has no state.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        fields, values = [], []
+        for key, value in state.items():
+            if key == 'mpry':
+                try:
+                    mpry = [int(v) for v in value.split(',')]
+                except ValueError:
+                    continue
+                if len(mpry) == 3:
+                    fields.extend(Tello.MPRY_FIELDS)
+                    values.extend(mpry)
+            elif key in Tello.state_field_converters:
+                fields.append(key)
+                values.append(value)
+        return (tuple(fields), values) if fields else None
+
+    @staticmethod
+    def fill_record(record: TelloState, fields: tuple, values):
+        """Set the fields of record from values().
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if fields is Tello.STATE_FIELDS:
+            record.set_values(values)
+        else:
+            for name, value in zip(fields, values):
+                if name is not None:
+                    setattr(record, name, value)
+
+    @staticmethod
+    def fill_row(array: np.ndarray, index: int, fields: tuple, values, received_at: float):
+        """Set row index of array, of dtype STATE_DTYPE, from values(). Fields
+        missing from the packet are set to those of a new TelloState.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if fields is Tello.STATE_FIELDS:
+            array[index] = (*values, received_at)
+        else:
+            array[index] = STATE_DEFAULTS
+            for name, value in zip(fields, values):
+                if name is not None:
+                    array[name][index] = value
+            array['received_at'][index] = received_at
+
+    def parse(self, data: bytes, record: TelloState) -> bool:
+        """Parse a state packet into record. Returns False, and leaves record
+        as it is, for a packet without state.
+        """
+        parsed = self.values(data)
+        if parsed is None:
+            return False
+        self.fill_record(record, *parsed)
+        return True
+
+    def parse_into(self, data: bytes, array: np.ndarray, index: int, received_at: float) -> bool:
+        """Parse a state packet into row index of array, of dtype STATE_DTYPE.
+        Returns False, and leaves the row as it is, for a packet without state.
+        """
+        parsed = self.values(data)
+        if parsed is None:
+            return False
+        self.fill_row(array, index, *parsed, received_at)
+        return True
+
+
+STATE_DEFAULTS = tuple(getattr(TelloState(), name) for name in STATE_DTYPE.names)
+
+
+class StateHistory:
+    """Ring buffer of the last state packets of one drone, rows of
+    STATE_DTYPE in a preallocated array, for rates and smoothed values
+    without query commands:
+
+        history = tello.get_state_history()
+        history.mean('h', 2)          # mean height over the last 2 s, in cm
+        history.rate('h', 1)          # climb rate over the last 1 s, in cm/s
+        data = history.window(5)      # the rows of the last 5 s, oldest first
+        data['yaw'], data['received_at']
+
+    The state receiver thread appends, any thread may read. Reads return
+    copies, ordered by time of reception (received_at, time.time()).
+    """
+
+    def __init__(self, capacity: int = Tello.STATE_HISTORY_SIZE):
+        self.array = np.zeros(capacity, STATE_DTYPE)
+        self.capacity = capacity
+        # Packets appended in total; the latest is at (count - 1) % capacity
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, fields: tuple, values, received_at: float):
+        """Append a packet parsed by StateParser.values().
+        Internal method, you normally wouldn't call this yourself.
+        """
+        StateParser.fill_row(self.array, self.count % self.capacity, fields, values, received_at)
+        # Counted once written, readers never see a half written row
+        self.count += 1
+
+    def latest(self) -> Optional[np.void]:
+        """A copy of the latest row, None if there is none yet."""
+        count = self.count
+        if count == 0:
+            return None
+        return self.array[(count - 1) % self.capacity].copy()
+
+    def rows(self, first: int, end: int) -> np.ndarray:
+        """A copy of the rows of packets first to end - 1, counted from the
+        first packet ever appended, that are still kept.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        start = first % self.capacity
+        if start + end - first <= self.capacity:
+            rows = self.array[start:start + end - first].copy()
+        else:
+            rows = np.concatenate((self.array[start:], self.array[:start + end - first - self.capacity]))
+        # Rows the receiver overwrote while they were copied are dropped
+        overwritten = self.count - self.capacity - first
+        return rows[overwritten:] if overwritten > 0 else rows
+
+    def export(self) -> np.ndarray:
+        """A copy of all rows, oldest first."""
+        count = self.count
+        return self.rows(count - min(count, self.capacity), count)
+
+    def window(self, seconds: float, now: Optional[float] = None) -> np.ndarray:
+        """A copy of the rows received in the last seconds before now
+        (time.time() by default), oldest first.
+        """
+        if now is None:
+            now = time.time()
+        count = self.count
+        oldest = count - min(count, self.capacity)
+        # The reception times in order, as one or two views of the ring
+        times = self.array['received_at']
+        first = oldest % self.capacity
+        if first + count - oldest <= self.capacity:
+            segments = (times[first:first + count - oldest],)
+        else:
+            segments = (times[first:], times[:first + count - oldest - self.capacity])
+        return self.rows(oldest + self.search(segments, now - seconds, 'left'),
+                         oldest + self.search(segments, now, 'right'))
+
+    @staticmethod
+    def search(segments: tuple, value: float, side: str) -> int:
+        """np.searchsorted() over consecutive sorted segments.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        offset = 0
+        for segment in segments:
+            index = int(np.searchsorted(segment, value, side))
+            if index < len(segment):
+                return offset + index
+            offset += len(segment)
+        return offset
+
+    def mean(self, field: str, seconds: float, now: Optional[float] = None) -> float:
+        """Mean of field over the last seconds, nan without packets."""
+        rows = self.window(seconds, now)
+        return float(rows[field].mean()) if len(rows) else float('nan')
+
+    def rate(self, field: str, seconds: float, now: Optional[float] = None) -> float:
+        """Rate of change of field per second over the last seconds, the
+        slope of a least squares line. nan with less than two packets.
+        """
+        rows = self.window(seconds, now)
+        if len(rows) < 2:
+            return float('nan')
+        t = rows['received_at'] - rows['received_at'].mean()
+        denominator = np.dot(t, t)
+        if denominator == 0:
+            return float('nan')
+        return float(np.dot(t, rows[field] - rows[field].mean()) / denominator)
+
+
+class BackgroundFrameRead:
+    """The camera frames of a simulated drone, read from the shared memory
+    the simulator publishes them to (controllers/cfc/video_stream.py) instead
+    of decoding a video stream.
+
+    frame is a NumPy view of the newest frame in shared memory, (height,
+    width, 3) RGB, no copy is made. The view stays valid for the next
+    SLOTS - 1 frames (about 200 ms), copy it to keep it longer. With
+    with_queue a worker thread also copies every new frame into a bounded
+    queue, see get_queued_frame().
+
+    get_latency_stats() reports the time from the publication of a frame in
+    the simulation step to its first read, in seconds, and the frames the
+    queue worker missed.
+    """
+
+    # Layout of the shared memory block, as written by video_stream.py
+    MAGIC = b'TVID'
+    VERSION = 1
+    HEADER = struct.Struct('<4s5IQ')
+    SLOT_HEADER = struct.Struct('<Qdd')
+    ALIGNMENT = 64
+    POLL_INTERVAL = 0.002  # in seconds, of the queue worker
+    LATENCY_SAMPLES = 1024
+
+    def __init__(self, tello, address, with_queue = False, maxsize = 32):
+        """
+        Arguments:
+            tello: the Tello the frames come from
+            address: name of the shared memory block, see
+                Tello.get_udp_video_address()
+            with_queue: collect every frame in a queue
+            maxsize: frames kept in the queue, the oldest are dropped
+        """
+        self.tello = tello
+        self.address = address
+        self.with_queue = with_queue
+        self.frames: Deque[np.ndarray] = deque([], maxsize)
+        self.latencies: Deque[float] = deque([], self.LATENCY_SAMPLES)
+        self.last_sequence = 0
+        self.dropped = 0
+        self.stopped = False
+        self.worker = Thread(target=self.update_frame, args=(), daemon=True)
+
+        self.memory = self.attach(address, Tello.FRAME_GRAB_TIMEOUT)
+        buffer = self.memory.buf
+        _, version, width, height, channels, slots, _ = self.HEADER.unpack_from(buffer, 0)
+        if version != self.VERSION:
+            self.memory.close()
+            raise TelloException('Unsupported video stream version {}'.format(version))
+        self.slots = slots
+        self.latest = np.ndarray((), '<u8', buffer, self.HEADER.size - 8)
+        header_size = self.aligned(self.HEADER.size)
+        slot_size = self.aligned(self.SLOT_HEADER.size) + self.aligned(width * height * channels)
+        self.slot_headers = [header_size + i * slot_size for i in range(slots)]
+        self.slot_frames = [np.ndarray((height, width, channels), np.uint8, buffer,
+                                       offset + self.aligned(self.SLOT_HEADER.size))
+                            for offset in self.slot_headers]
+        self.blank = np.zeros((height, width, channels), np.uint8)
+        self.blank.flags.writeable = False
+
+    @classmethod
+    def aligned(cls, size: int) -> int:
+        return (size + cls.ALIGNMENT - 1) // cls.ALIGNMENT * cls.ALIGNMENT
+
+    @classmethod
+    def attach(cls, name: str, timeout: float) -> shared_memory.SharedMemory:
+        """Open the shared memory block name, waiting up to timeout seconds
+        for the simulator to create it.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        end = time.time() + timeout
+        while True:
+            try:
+                memory = shared_memory.SharedMemory(name)
+            except FileNotFoundError:
+                memory = None
+            else:
+                # The simulator owns the block, the resource tracker would
+                # remove it when this process exits
+                if hasattr(resource_tracker, 'unregister') and hasattr(memory, '_name'):
+                    resource_tracker.unregister(memory._name, 'shared_memory')
+                if bytes(memory.buf[:4]) == cls.MAGIC:
+                    return memory
+            if time.time() > end:
+                if memory is not None:
+                    memory.close()
+                raise TelloException('Failed to grab video frames from video stream')
+            if memory is not None:
+                memory.close()
+            time.sleep(0.01)
+
+    def start(self):
+        """Start the queue worker, if with_queue.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if self.with_queue:
+            self.worker.start()
+
+    def read_slot(self, sequence: int) -> Optional[np.ndarray]:
+        """The frame view of sequence, None if it was overwritten already.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        offset = self.slot_headers[sequence % self.slots]
+        slot_sequence, _, published_at = self.SLOT_HEADER.unpack_from(self.memory.buf, offset)
+        if slot_sequence != sequence:
+            return None
+        if sequence > self.last_sequence:
+            # First read of this frame
+            self.latencies.append(time.time() - published_at)
+            self.last_sequence = sequence
+        return self.slot_frames[sequence % self.slots]
+
+    def update_frame(self):
+        """Copy every new frame into the queue.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        buffer = self.memory.buf
+        queued = int(self.latest)
+        while not self.stopped:
+            sequence = int(self.latest)
+            if sequence == queued:
+                time.sleep(self.POLL_INTERVAL)
+                continue
+            # Frames published since the last poll, the older ones first.
+            # The slot of the oldest may be being rewritten already.
+            first = max(queued + 1, sequence - self.slots + 2)
+            self.dropped += first - queued - 1
+            for next_sequence in range(first, sequence + 1):
+                view = self.read_slot(next_sequence)
+                if view is not None:
+                    frame = view.copy()
+                    # The slot may have been rewritten while it was copied
+                    offset = self.slot_headers[next_sequence % self.slots]
+                    if self.SLOT_HEADER.unpack_from(buffer, offset)[0] == next_sequence:
+                        self.frames.append(frame)
+                        continue
+                self.dropped += 1
+            queued = sequence
+
+    @property
+    def frame(self) -> np.ndarray:
+        """View of the newest frame, black until the first one arrives."""
+        if self.stopped:
+            return self.blank
+        while True:
+            sequence = int(self.latest)
+            if sequence == 0:
+                return self.blank
+            view = self.read_slot(sequence)
+            if view is not None:
+                return view
+
+    def get_queued_frame(self) -> Optional[np.ndarray]:
+        """The oldest frame of the queue, None if it is empty."""
+        try:
+            return self.frames.popleft()
+        except IndexError:
+            return None
+
+    def get_latency_stats(self) -> dict:
+        """Seconds from the publication of a frame by the simulator to its
+        first read, over the last LATENCY_SAMPLES frames read.
+        """
+        latencies = np.array(self.latencies)
+        if not len(latencies):
+            return {'frames': self.last_sequence, 'samples': 0, 'dropped': self.dropped}
+        return {
+            'frames': self.last_sequence,
+            'samples': len(latencies),
+            'dropped': self.dropped,
+            'mean': float(latencies.mean()),
+            'median': float(np.median(latencies)),
+            'p95': float(np.percentile(latencies, 95)),
+            'max': float(latencies.max()),
+        }
+
+    def stop(self):
+        """Stop the queue worker and release the shared memory."""
+        self.stopped = True
+        if self.worker.is_alive():
+            self.worker.join()
+        self.latest = None
+        self.slot_frames = []
+        try:
+            self.memory.close()
+        except BufferError:
+            # The caller still holds a frame view, the mapping goes with it
+            pass
+
+
+class SwarmResults:
+    """Outcome of a command fanned out to a TelloSwarm, one entry per member
+    in swarm order: results[i] is the return value of member i (None if it
+    failed), errors maps the index of every failed member to its exception
+    and started[i] is the time.perf_counter() at which member i started the
+    command (None if it never did).
+    """
+
+    def __init__(self, count: int):
+        self.results: List[Any] = [None] * count
+        self.errors: Dict[int, BaseException] = {}
+        self.started: List[Optional[float]] = [None] * count
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def spread(self) -> float:
+        """Seconds between the first and the last member to start."""
+        started = [t for t in self.started if t is not None]
+        return max(started) - min(started) if started else 0.0
+
+    def raise_errors(self):
+        """Raise a TelloException naming the failed members, if any."""
+        if self.errors:
+            raise TelloException('Swarm command failed on {} of {} drones: {}'.format(
+                len(self.errors), len(self.results),
+                '; '.join('{}: {}'.format(i, e) for i, e in sorted(self.errors.items()))))
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __repr__(self):
+        return 'SwarmResults(results={}, errors={})'.format(self.results, self.errors)
+
+
+class TelloSwarm:
+    """Several simulated Tellos commanded together, like djitellopy's
+    TelloSwarm:
+
+        swarm = TelloSwarm.fromIps(['127.0.0.1', '127.0.0.2'])
+        swarm.connect()
+        swarm.takeoff()
+        swarm.move_up(lambda i, tello: 20 * (i + 1))   # per drone arguments
+        swarm.call('move_forward', 50, synchronized=True)
+        swarm.land()
+        swarm.end()
+
+    Any Tello method called on the swarm runs on all members in parallel and
+    returns a SwarmResults. Every member has its own worker thread, so its
+    commands keep their order and a slow drone only delays itself: the call
+    returns after timeout seconds with the late members in the errors.
+    Arguments that are callables are called with (index, tello) to get the
+    argument of each member.
+
+    In synchronized (barrier) mode the members wait for each other after
+    their arguments are resolved and start the command together; if one
+    cannot start within timeout, none does.
+    """
+
+    TIMEOUT = Tello.TAKEOFF_TIMEOUT  # in seconds, the longest a single command waits
+
+    def __init__(self, tellos: List[Tello], timeout: Optional[float] = TIMEOUT, synchronized: bool = False):
+        """
+        Arguments:
+            tellos: the members
+            timeout: default seconds to wait for the members, None waits
+                for all of them
+            synchronized: default of the barrier mode, see call()
+        """
+        self.tellos = list(tellos)
+        self.timeout = timeout
+        self.synchronized = synchronized
+        self.workers = [ThreadPoolExecutor(1, thread_name_prefix='tello-swarm-{}'.format(i))
+                        for i in range(len(self.tellos))]
+
+    @staticmethod
+    def fromFile(path: str) -> 'TelloSwarm':
+        """Create a swarm from a file with one drone address per line."""
+        with open(path, 'r') as fd:
+            ips = fd.readlines()
+        return TelloSwarm.fromIps([ip.strip() for ip in ips if ip.strip()])
+
+    @staticmethod
+    def fromIps(ips: list) -> 'TelloSwarm':
+        """Create a swarm from a list of drone addresses."""
+        if not ips:
+            raise TelloException('No ips provided')
+        return TelloSwarm([Tello(ip) for ip in ips])
+
+    def sequential(self, func: Callable[[int, Tello], Any]) -> list:
+        """Call func(i, tello) for every member, one after the other."""
+        return [func(i, tello) for i, tello in enumerate(self.tellos)]
+
+    def parallel(self, func: Callable[[int, Tello], Any], timeout: Optional[float] = None,
+                 synchronized: Optional[bool] = None) -> SwarmResults:
+        """Call func(i, tello) for every member on its worker thread.
+        Arguments:
+            func: called with the index and the Tello of each member
+            timeout: seconds to wait for all members, the swarm's by default
+            synchronized: start func on all members at the same instant,
+                the swarm's mode by default
+        Returns:
+            SwarmResults
+        """
+        return self.fan_out(lambda i, tello: lambda: func(i, tello), timeout, synchronized)
+
+    def call(self, attr: str, *args, timeout: Optional[float] = None, synchronized: Optional[bool] = None,
+             **kwargs) -> SwarmResults:
+        """Call the Tello method attr on all members in parallel. Arguments
+        that are callables are called with (index, tello) for the value of
+        each member, before the barrier in synchronized mode.
+        Returns:
+            SwarmResults
+        """
+        def prepare(i: int, tello: Tello) -> Callable[[], Any]:
+            member_args = [arg(i, tello) if callable(arg) else arg for arg in args]
+            member_kwargs = {key: arg(i, tello) if callable(arg) else arg for key, arg in kwargs.items()}
+            method = getattr(tello, attr)
+            return lambda: method(*member_args, **member_kwargs)
+
+        return self.fan_out(prepare, timeout, synchronized)
+
+    def fan_out(self, prepare: Callable[[int, Tello], Callable[[], Any]], timeout: Optional[float],
+                synchronized: Optional[bool]) -> SwarmResults:
+        """Run prepare(i, tello) on the worker of every member, then (after
+        the barrier in synchronized mode) the callable it returns.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        synchronized = self.synchronized if synchronized is None else synchronized
+        results = SwarmResults(len(self.tellos))
+        barrier = Barrier(len(self.tellos)) if synchronized else None
+
+        def run(i: int, tello: Tello):
+            command = prepare(i, tello)
+            if barrier is not None:
+                barrier.wait(timeout)
+            results.started[i] = time.perf_counter()
+            return command()
+
+        futures = [worker.submit(run, i, tello) for i, (worker, tello) in enumerate(zip(self.workers, self.tellos))]
+        wait(futures, timeout)
+        if barrier is not None and not all(future.done() for future in futures):
+            # Release the members waiting for one that will not come
+            barrier.abort()
+        for i, future in enumerate(futures):
+            host = self.tellos[i].address[0]
+            if not future.done():
+                # Still running, or queued behind an earlier command of the
+                # same drone, which cancels it
+                future.cancel()
+                results.errors[i] = TelloException('{} did not finish within {} s'.format(host, timeout))
+            elif future.cancelled():
+                results.errors[i] = TelloException('{} did not start'.format(host))
+            elif isinstance(future.exception(), BrokenBarrierError):
+                results.errors[i] = TelloException('{} did not start, the swarm was not ready within {} s'
+                                                   .format(host, timeout))
+            elif future.exception() is not None:
+                results.errors[i] = future.exception()
+            else:
+                results.results[i] = future.result()
+        return results
+
+    def sync(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every member has finished its queued commands.
+        Returns:
+            bool: False if some did not within timeout seconds
+        """
+        done, _ = wait([worker.submit(lambda: None) for worker in self.workers], timeout)
+        return len(done) == len(self.workers)
+
+    def get_stats(self) -> list:
+        """Tello.get_stats() of every member."""
+        return [tello.get_stats() for tello in self.tellos]
+
+    def export_stats(self, format: str = 'json') -> str:
+        """The stats of all members as a JSON list or in one Prometheus text
+        exposition, see Tello.export_stats().
+        """
+        if format == 'json':
+            return json.dumps(self.get_stats())
+        if format == 'prometheus':
+            return CommandStats.to_prometheus({tello.address[0]: tello.stats for tello in self.tellos})
+        raise ValueError("Unknown stats format '{}', use 'json' or 'prometheus'".format(format))
+
+    def end(self):
+        """Call end() on all members and stop the worker threads."""
+        self.parallel(lambda i, tello: tello.end(), synchronized=False)
+        for worker in self.workers:
+            worker.shutdown(wait=False, cancel_futures=True)
+
+    def __getattr__(self, attr: str) -> Callable[..., SwarmResults]:
+        """Tello methods, called on all members, see call()."""
+        if attr.startswith('_') or not callable(getattr(Tello, attr, None)):
+            raise AttributeError("'TelloSwarm' object has no attribute '{}'".format(attr))
+        return lambda *args, **kwargs: self.call(attr, *args, **kwargs)
+
+    def __iter__(self) -> Iterator[Tello]:
+        return iter(self.tellos)
+
+    def __len__(self) -> int:
+        return len(self.tellos)
+
+    def __getitem__(self, index: int) -> Tello:
+        return self.tellos[index]
+
+
+class TelloReplyProtocol(asyncio.DatagramProtocol):
+    """Hands the replies of one drone to the command of AsyncTello waiting
+    for them.
+    Internal class, you normally wouldn't use this yourself.
+    """
+
+    def __init__(self, tello: 'AsyncTello'):
+        self.tello = tello
+
+    def datagram_received(self, data, addr):
+        self.tello.reply_received(data)
+
+    def error_received(self, exc):
+        # E.g. connection refused, nothing listens at the address of the drone
+        reply = self.tello.reply
+        if reply is not None and not reply.done():
+            reply.set_exception(exc)
+
+
+class AsyncTello:
+    """asyncio client for the simulated Tello, with the commands of Tello as
+    coroutines. It speaks the Tello UDP protocol to the command port of the
+    drone instead of the HTTP route, so one event loop drives a whole swarm
+    without a thread per drone:
+
+        drones = [AsyncTello('127.0.0.{}'.format(i + 1)) for i in range(12)]
+        await asyncio.gather(*(tello.connect() for tello in drones))
+        await asyncio.gather(*(tello.takeoff() for tello in drones))
+
+    Every try of a command waits at most RESPONSE_TIMEOUT seconds for the
+    reply (TAKEOFF_TIMEOUT for takeoff). asyncio.wait_for() bounds a command
+    as a whole, retries included, and cancelling it stops waiting for the
+    reply right away. The get_* functions read the latest state packet like
+    those of Tello; the state receiver tells drones apart by their address,
+    so a swarm must use host addressing for them.
+    """
+    RESPONSE_TIMEOUT = Tello.RESPONSE_TIMEOUT
+    TAKEOFF_TIMEOUT = Tello.TAKEOFF_TIMEOUT
+    TIME_BTW_COMMANDS = Tello.TIME_BTW_COMMANDS
+    TIME_BTW_RC_CONTROL_COMMANDS = Tello.TIME_BTW_RC_CONTROL_COMMANDS
+    RETRY_COUNT = Tello.RETRY_COUNT
+    TELLO_IP = Tello.TELLO_IP
+
+    COMMAND_UDP_PORT = 8889
+
+    LOGGER = Tello.LOGGER
+
+    is_flying = False
+
+    def __init__(self,
+                 host=TELLO_IP,
+                 retry_count=RETRY_COUNT,
+                 port=COMMAND_UDP_PORT):
+        """
+        Arguments:
+            host: address of the simulated drone
+            retry_count: number of retries after a failed command
+            port: command port of the drone
+        The socket is opened by the first command, in the running event loop.
+        """
+
+        global drones
+
+        self.address = (host, port)
+        self.retry_count = retry_count
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        # Replies carry nothing to match them to their command, so a drone
+        # has one command waiting for its reply at a time
+        self.lock = asyncio.Lock()
+        self.reply: Optional[asyncio.Future] = None
+        # (deadline, forget_at, reply future or None) of the commands sent
+        # whose reply has not arrived yet, oldest first, see reply_received()
+        self.unanswered: Deque[tuple] = deque()
+        # Replies taken as the late replies of commands that timed out
+        self.late_replies = 0
+        self.stats = CommandStats()
+        self.last_received_command_timestamp = time.time()
+        self.last_rc_control_timestamp = time.time()
+        # The newest rc setpoint not sent yet and the task sending it once
+        # TIME_BTW_RC_CONTROL_COMMANDS is over, see send_rc_control()
+        self.rc_pending: Optional[str] = None
+        self.rc_sender: Optional[asyncio.Task] = None
+
+        Tello.start_state_receiver()
+
+        drones[host] = Tello.drone_entry()
+
+        self.LOGGER.info("AsyncTello instance was initialized. Host: '{}'. Port: '{}'.".format(host, port))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.end()
+
+    async def open(self):
+        """Open the UDP socket to the drone if it is not open yet.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if self.transport is not None:
+            return
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: TelloReplyProtocol(self),
+                                                           remote_addr=self.address)
+        # Another command may have opened one in the meantime
+        if self.transport is None:
+            self.transport = transport
+        else:
+            transport.close()
+
+    # The state getters only read the latest state packet and never block
+    get_own_udp_object = Tello.get_own_udp_object
+    get_current_state = Tello.get_current_state
+    get_state_record = Tello.get_state_record
+    get_state_history = Tello.get_state_history
+    get_state_field = Tello.get_state_field
+    get_last_state_update = Tello.get_last_state_update
+    get_mission_pad_id = Tello.get_mission_pad_id
+    get_mission_pad_distance_x = Tello.get_mission_pad_distance_x
+    get_mission_pad_distance_y = Tello.get_mission_pad_distance_y
+    get_mission_pad_distance_z = Tello.get_mission_pad_distance_z
+    get_pitch = Tello.get_pitch
+    get_roll = Tello.get_roll
+    get_yaw = Tello.get_yaw
+    get_speed_x = Tello.get_speed_x
+    get_speed_y = Tello.get_speed_y
+    get_speed_z = Tello.get_speed_z
+    get_acceleration_x = Tello.get_acceleration_x
+    get_acceleration_y = Tello.get_acceleration_y
+    get_acceleration_z = Tello.get_acceleration_z
+    get_lowest_temperature = Tello.get_lowest_temperature
+    get_highest_temperature = Tello.get_highest_temperature
+    get_temperature = Tello.get_temperature
+    get_height = Tello.get_height
+    get_distance_tof = Tello.get_distance_tof
+    get_barometer = Tello.get_barometer
+    get_flight_time = Tello.get_flight_time
+    get_battery = Tello.get_battery
+
+    raise_result_error = Tello.raise_result_error
+    export_stats = Tello.export_stats
+
+    def get_stats(self) -> dict:
+        """Instrumentation of the commands sent to this drone, see
+        Tello.get_stats().
+        """
+        return {'drone': self.address[0], 'commands': self.stats.snapshot()}
+
+    async def send_command_with_return(self, command: str, timeout: float = RESPONSE_TIMEOUT) -> str:
+        """Send command to Tello and wait for its response.
+        Internal method, you normally wouldn't call this yourself.
+        Return:
+            str: response text, or an 'Aborting command' message after timeout seconds.
+        """
+        submitted = time.perf_counter()
+        if CommandScheduler.is_safety(command):
+            self.drop_rc()
+        async with self.lock:
+            await self.open()
+
+            # Commands very consecutive makes the drone not respond to them.
+            # So wait at least self.TIME_BTW_COMMANDS seconds
+            wait = self.last_received_command_timestamp + self.TIME_BTW_COMMANDS - time.time()
+            if wait > 0:
+                self.LOGGER.debug('Waiting {} seconds to execute command: {}...'.format(wait, command))
+                await asyncio.sleep(wait)
+
+            self.LOGGER.info("Send command: '{}'".format(command))
+
+            self.reply = asyncio.get_running_loop().create_future()
+            start = time.perf_counter()
+            self.stats.record_wait(command, start - submitted)
+            entry = self.expect_reply(timeout, self.reply)
+            late_replies = self.late_replies
+            self.transport.sendto(command.encode('utf-8'))
+            try:
+                data = await asyncio.wait_for(self.reply, timeout)
+            except asyncio.TimeoutError:
+                if self.late_replies != late_replies and entry in self.unanswered:
+                    # The reply taken as late was this one, the older
+                    # reply is lost; the next reply belongs to the next command
+                    self.unanswered.remove(entry)
+                self.stats.record_timeout(command)
+                message = "Aborting command '{}'. Did not receive a response after {} seconds".format(
+                    command, timeout)
+                self.LOGGER.warning(message)
+                return message
+            finally:
+                self.reply = None
+                self.last_received_command_timestamp = time.time()
+            self.stats.record_latency(command, time.perf_counter() - start)
+
+        return data.decode('utf-8', errors='replace').rstrip('\r\n')
+
+    async def send_command_without_return(self, command: str):
+        """Send command to Tello without expecting a response.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        await self.open()
+
+        # Debug level, rc commands come in at up to 1 kHz
+        self.LOGGER.debug("Send command (no response expected): '{}'".format(command))
+        if not command.startswith('rc '):
+            if CommandScheduler.is_safety(command):
+                self.drop_rc()
+            # The drone answers everything but rc, e.g. "ok" to emergency
+            self.expect_reply(self.RESPONSE_TIMEOUT)
+        self.transport.sendto(command.encode('utf-8'))
+
+    def expect_reply(self, timeout: float, reply: Optional[asyncio.Future] = None):
+        """Note a command about to be sent, answered within timeout seconds;
+        reply is the future waiting for the answer, None if nobody waits.
+        Returns the entry of the command in self.unanswered.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        now = time.monotonic()
+        self.forget_lost(now)
+        entry = (now + timeout, now + 2 * timeout, reply)
+        self.unanswered.append(entry)
+        return entry
+
+    def forget_lost(self, now: float):
+        """Drop the commands whose reply is not coming anymore: a reply can
+        be late by as much as the timeout of its command, after that it
+        counts as lost.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        unanswered = self.unanswered
+        while unanswered and unanswered[0][1] < now:
+            unanswered.popleft()
+
+    def reply_received(self, data: bytes):
+        """Hand a reply of the drone to the command waiting for it, if it is
+        the reply to that command.
+        Internal method, you normally wouldn't call this yourself.
+
+        Replies carry nothing to match them to their command, but the drone
+        answers in order: a reply belongs to the oldest command still
+        unanswered. A late reply to a command that timed out, or the reply
+        to a command sent without return, takes the entry of that command
+        and is dropped, instead of being taken for the reply of the command
+        waiting now. A reply that never comes is forgotten after twice the
+        timeout of its command (forget_lost()), or as soon as the command
+        after it times out with its reply taken as the late one (see
+        send_command_with_return()), so it does not shift the replies of
+        all later commands.
+        """
+        now = time.monotonic()
+        self.forget_lost(now)
+        if not self.unanswered:
+            return
+        deadline, _, reply = self.unanswered.popleft()
+        if now > deadline:
+            self.late_replies += 1
+            return
+        # Replies nobody waits for anymore are dropped
+        if reply is not None and not reply.done():
+            reply.set_result(data)
+
+    async def send_control_command(self, command: str, timeout: float = RESPONSE_TIMEOUT) -> bool:
+        """Send control command to Tello and wait for its response.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        response = "max retries exceeded"
+        for i in range(0, self.retry_count):
+            if i > 0:
+                self.stats.record_retry(command)
+            response = await self.send_command_with_return(command, timeout=timeout)
+
+            if 'ok' in response.lower():
+                return True
+
+            if not response.startswith('Aborting'):
+                self.stats.record_failure(command)
+            self.LOGGER.debug("Command attempt #{} failed for command: '{}'".format(i, command))
+
+        self.raise_result_error(command, response)
+        return False # never reached
+
+    async def send_read_command(self, command: str) -> str:
+        """Send given command to Tello and wait for its response.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        response = await self.send_command_with_return(command)
+
+        if any(word in response for word in ('error', 'ERROR', 'False', 'Aborting')):
+            if not response.startswith('Aborting'):
+                self.stats.record_failure(command)
+            self.raise_result_error(command, response)
+            return "Error: this code should never be reached"
+
+        return response
+
+    async def send_read_command_int(self, command: str) -> int:
+        """Send given command to Tello and wait for its response.
+        Parses the response to an integer
+        Internal method, you normally wouldn't call this yourself.
+        """
+        response = await self.send_read_command(command)
+        return int(response)
+
+    async def send_read_command_float(self, command: str) -> float:
+        """Send given command to Tello and wait for its response.
+        Parses the response to a float
+        Internal method, you normally wouldn't call this yourself.
+        """
+        response = await self.send_read_command(command)
+        return float(response)
+
+    async def connect(self, wait_for_state=True):
+        """Enter SDK mode. Call this before any of the control functions.
+        """
+        await self.send_control_command("command")
+
+        if wait_for_state:
+            REPS = 20
+            for i in range(REPS):
+                if self.get_current_state():
+                    t = i / REPS  # in seconds
+                    self.LOGGER.debug("'.connect()' received first state packet after {} seconds".format(t))
+                    break
+                await asyncio.sleep(1 / REPS)
+
+            if not self.get_current_state():
+                raise TelloException('Did not receive a state packet from the Tello')
+
+    async def send_keepalive(self):
+        """Send a keepalive packet to prevent the drone from landing after 15s
+        """
+        await self.send_control_command("keepalive")
+
+    async def turn_motor_on(self):
+        """Turn on motors without flying (mainly for cooling)
+        """
+        await self.send_control_command("motoron")
+
+    async def turn_motor_off(self):
+        """Turns off the motor cooling mode
+        """
+        await self.send_control_command("motoroff")
+
+    async def takeoff(self):
+        """Automatic takeoff.
+        """
+        await self.send_control_command("takeoff", timeout=self.TAKEOFF_TIMEOUT)
+        self.is_flying = True
+
+    async def land(self):
+        """Automatic landing.
+        """
+        await self.send_control_command("land")
+        self.is_flying = False
+
+    async def emergency(self):
+        """Stop all motors immediately. Does not wait for a command in
+        flight.
+        """
+        await self.send_command_without_return("emergency")
+        self.is_flying = False
+
+    async def move(self, direction: str, x: int):
+        """Tello fly up, down, left, right, forward or back with distance x cm.
+        Users would normally call one of the move_x functions instead.
+        Arguments:
+            direction: up, down, left, right, forward or back
+            x: 20-500
+        """
+        await self.send_control_command("{} {}".format(direction, x))
+
+    async def move_up(self, x: int):
+        """Fly x cm up.
+        Arguments:
+            x: 20-500
+        """
+        await self.move("up", x)
+
+    async def move_down(self, x: int):
+        """Fly x cm down.
+        Arguments:
+            x: 20-500
+        """
+        await self.move("down", x)
+
+    async def move_left(self, x: int):
+        """Fly x cm left.
+        Arguments:
+            x: 20-500
+        """
+        await self.move("left", x)
+
+    async def move_right(self, x: int):
+        """Fly x cm right.
+        Arguments:
+            x: 20-500
+        """
+        await self.move("right", x)
+
+    async def move_forward(self, x: int):
+        """Fly x cm forward.
+        Arguments:
+            x: 20-500
+        """
+        await self.move("forward", x)
+
+    async def move_back(self, x: int):
+        """Fly x cm backwards.
+        Arguments:
+            x: 20-500
+        """
+        await self.move("back", x)
+
+    async def rotate_clockwise(self, x: int):
+        """Rotate x degree clockwise.
+        Arguments:
+            x: 1-360
+        """
+        await self.send_control_command("cw {}".format(x))
+
+    async def rotate_counter_clockwise(self, x: int):
+        """Rotate x degree counter-clockwise.
+        Arguments:
+            x: 1-360
+        """
+        await self.send_control_command("ccw {}".format(x))
+
+    async def flip(self, direction: str):
+        """Do a flip maneuver.
+        Users would normally call one of the flip_x functions instead.
+        Arguments:
+            direction: l (left), r (right), f (forward) or b (back)
+        """
+        await self.send_control_command("flip {}".format(direction))
+
+    async def flip_left(self):
+        """Flip to the left.
+        """
+        await self.flip("l")
+
+    async def flip_right(self):
+        """Flip to the right.
+        """
+        await self.flip("r")
+
+    async def flip_forward(self):
+        """Flip forward.
+        """
+        await self.flip("f")
+
+    async def flip_back(self):
+        """Flip backwards.
+        """
+        await self.flip("b")
+
+    async def go_xyz_speed(self, x: int, y: int, z: int, speed: int):
+        """Fly to x y z relative to the current position.
+        Speed defines the traveling speed in cm/s.
+        Arguments:
+            x: -500-500
+            y: -500-500
+            z: -500-500
+            speed: 10-100
+        """
+        await self.send_control_command('go {} {} {} {}'.format(x, y, z, speed))
+
+    async def curve_xyz_speed(self, x1: int, y1: int, z1: int, x2: int, y2: int, z2: int, speed: int):
+        """Fly to x2 y2 z2 in a curve via x1 y1 z1. Speed defines the traveling speed in cm/s.
+        See Tello.curve_xyz_speed for the constraints on the points.
+        Arguments:
+            x1, y1, z1: -500-500
+            x2, y2, z2: -500-500
+            speed: 10-60
+        """
+        await self.send_control_command('curve {} {} {} {} {} {} {}'.format(x1, y1, z1, x2, y2, z2, speed))
+
+    async def stop(self):
+        """Hovers in the air. Works at any time.
+        """
+        await self.send_control_command("stop")
+
+    async def set_speed(self, x: int):
+        """Set speed to x cm/s.
+        Arguments:
+            x: 10-100
+        """
+        await self.send_control_command("speed {}".format(x))
+
+    async def send_rc_control(self, left_right_velocity: int, forward_backward_velocity: int, up_down_velocity: int,
+                              yaw_velocity: int):
+        """Send RC control via four channels. Commands go out at most every
+        self.TIME_BTW_RC_CONTROL_COMMANDS seconds, always the latest setpoint:
+        one that comes too early waits for the interval to end, replacing
+        the one waiting before it. Does not wait for a command in flight,
+        the drone never answers rc.
+        Arguments:
+            left_right_velocity: -100~100 (left/right)
+            forward_backward_velocity: -100~100 (forward/backward)
+            up_down_velocity: -100~100 (up/down)
+            yaw_velocity: -100~100 (yaw)
+        """
+        def clamp100(x: int) -> int:
+            return max(-100, min(100, x))
+
+        cmd = 'rc {} {} {} {}'.format(
+            clamp100(left_right_velocity),
+            clamp100(forward_backward_velocity),
+            clamp100(up_down_velocity),
+            clamp100(yaw_velocity)
+        )
+        wait = self.last_rc_control_timestamp + self.TIME_BTW_RC_CONTROL_COMMANDS - time.time()
+        if wait <= 0 and self.rc_sender is None:
+            self.last_rc_control_timestamp = time.time()
+            await self.send_command_without_return(cmd)
+            return
+        self.rc_pending = cmd
+        if self.rc_sender is None:
+            self.rc_sender = asyncio.ensure_future(self.send_pending_rc(wait))
+
+    async def send_pending_rc(self, wait: float):
+        """Send the newest rc setpoint once the interval is over.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if wait > 0:
+            await asyncio.sleep(wait)
+        cmd, self.rc_pending = self.rc_pending, None
+        self.rc_sender = None
+        self.last_rc_control_timestamp = time.time()
+        await self.send_command_without_return(cmd)
+
+    def drop_rc(self):
+        """Drop the rc setpoint waiting to be sent, e.g. before a safety
+        command.
+        Internal method, you normally wouldn't call this yourself.
+        """
+        if self.rc_sender is not None:
+            self.rc_sender.cancel()
+            self.rc_sender = None
+        self.rc_pending = None
+
+    async def query_speed(self) -> int:
+        """Query speed setting (cm/s)
+        Returns:
+            int: 1-100
+        """
+        return await self.send_read_command_int('speed?')
+
+    async def query_battery(self) -> int:
+        """Get current battery percentage via a query command
+        Using get_battery is usually faster
+        Returns:
+            int: 0-100 in %
+        """
+        return await self.send_read_command_int('battery?')
+
+    async def query_flight_time(self) -> int:
+        """Query current fly time (s).
+        Using get_flight_time is usually faster.
+        Returns:
+            int: Seconds elapsed during flight.
+        """
+        return await self.send_read_command_int('time?')
+
+    async def query_height(self) -> int:
+        """Get height in cm via a query command.
+        Using get_height is usually faster
+        Returns:
+            int: 0-3000
+        """
+        return await self.send_read_command_int('height?')
+
+    async def query_temperature(self) -> int:
+        """Query temperature (°C).
+        Using get_temperature is usually faster.
+        Returns:
+            int: 0-90
+        """
+        return await self.send_read_command_int('temp?')
+
+    async def query_attitude(self) -> dict:
+        """Query IMU attitude data.
+        Using get_pitch, get_roll and get_yaw is usually faster.
+        Returns:
+            {'pitch': int, 'roll': int, 'yaw': int}
+        """
+        response = await self.send_read_command('attitude?')
+        return Tello.parse_state(response)
+
+    async def query_barometer(self) -> int:
+        """Get barometer value (cm)
+        Using get_barometer is usually faster.
+        Returns:
+            int: 0-100
+        """
+        baro = await self.send_read_command_int('baro?')
+        return baro * 100
+
+    async def query_distance_tof(self) -> float:
+        """Get distance value from TOF (cm)
+        Using get_distance_tof is usually faster.
+        Returns:
+            float: 30-1000
+        """
+        # example response: 801mm
+        tof = await self.send_read_command('tof?')
+        return int(tof[:-2]) / 10
+
+    async def query_wifi_signal_noise_ratio(self) -> str:
+        """Get Wi-Fi SNR
+        Returns:
+            str: snr
+        """
+        return await self.send_read_command('wifi?')
+
+    async def query_sdk_version(self) -> str:
+        """Get SDK Version
+        Returns:
+            str: SDK Version
+        """
+        return await self.send_read_command('sdk?')
+
+    async def query_serial_number(self) -> str:
+        """Get Serial Number
+        Returns:
+            str: Serial Number
+        """
+        return await self.send_read_command('sn?')
+
+    async def end(self):
+        """Call this method when you want to end the tello object. Lands the
+        drone if it is flying and closes the socket.
+        """
+        try:
+            if self.is_flying:
+                await self.land()
+        except TelloException:
+            pass
+
+        self.drop_rc()
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+        host = self.address[0]
+        if host in drones:
+            del drones[host]
@@ -0,0 +1,496 @@
+"""Stand-in for a fleet of Tello drones, for load and latency tests of the
+clients (djitellopy_webots.Tello, AsyncTello and TelloSwarm, djitellopy)
+without hardware or the simulator.
+
+Every virtual drone speaks both protocols of the simulator:
+    UDP:  Tello SDK commands on the command port, replies to the sender,
+          state packets at --state-rate to every client that sent 'command'
+    HTTP: GET /send?command=... on the HTTP port, the route of the Webots
+          shim, with keep-alive connections
+with the addressing of controllers/cfc/swarm.py:
+    host: drone i at 127.0.0.(i+1), commands 8889, HTTP 5000, state to the
+          client's port 8890 (at most 254 drones)
+    port: drone i at 127.0.0.1, commands 11000 + 10 i, state to the
+          client's port 11001 + 10 i, HTTP 11002 + 10 i
+All drones run in one asyncio event loop, hundreds of them are fine.
+
+The drones keep a simple model of their state: takeoff, land, moves and
+turns change height, position and yaw, and take the time the drone would
+need at its speed (times --duration-scale, 0 answers at once); the reply
+comes when the command is done, one command at a time per drone. On top of
+that every message is delayed by --latency seconds one way, plus a uniform
+random --jitter, and every UDP datagram (commands, replies, state) is lost
+with probability --loss. HTTP requests are not lost, like TCP.
+
+    python mock_tello_fleet.py [--drones 10] [--mode host|port] [--latency 0.005]
+                               [--jitter 0.002] [--loss 0.01] [--duration-scale 1]
+                               [--state-rate 10] [--no-http]
+
+In a benchmark, start it in a thread:
+
+    fleet = MockFleet(100, latency=0.005)
+    fleet.start_in_thread()
+    ...
+    fleet.stop()
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import parse_qs, urlsplit
+
+DroneAddress = namedtuple('DroneAddress', 'host command_port state_port http_port')
+
+COMMAND_PORT = 8889
+STATE_PORT = 8890
+HTTP_PORT = 5000
+PORT_BASE = 11000
+PORT_STRIDE = 10
+MAX_HOSTS = 254
+
+OK = 'ok'
+ERROR = 'error'
+OUT_OF_RANGE = 'out of range'
+NOT_FLYING = 'error Not flying'
+
+TAKEOFF_HEIGHT = 80  # cm
+TAKEOFF_DURATION = 2.0  # s, also of land
+FLIP_DURATION = 1.0  # s
+TURN_RATE = 90  # degrees per second
+DEFAULT_SPEED = 50  # cm/s
+BATTERY_DRAIN = 0.1  # percent per second of flight
+
+STATE_FORMAT = ('mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:0;roll:0;yaw:{yaw};vgx:{vgx};vgy:{vgy};vgz:{vgz};'
+                'templ:60;temph:62;tof:{tof};h:{h};bat:{bat};baro:{baro:.2f};time:{time};'
+                'agx:0.00;agy:0.00;agz:-1000.00;\r\n')
+
+
+def drone_address(index, mode='host'):
+    """DroneAddress of virtual drone index."""
+    if mode == 'host':
+        if not 0 <= index < MAX_HOSTS:
+            raise ValueError('host mode has room for {} drones, got index {}'.format(MAX_HOSTS, index))
+        return DroneAddress('127.0.0.{}'.format(index + 1), COMMAND_PORT, STATE_PORT, HTTP_PORT)
+    if mode == 'port':
+        port = PORT_BASE + PORT_STRIDE * index
+        return DroneAddress('127.0.0.1', port, port + 1, port + 2)
+    raise ValueError("mode must be 'host' or 'port', got {!r}".format(mode))
+
+
+def _int_args(args, count, low, high):
+    """count integer arguments within [low, high], None if invalid, 'range'
+    if out of range.
+    """
+    if len(args) != count:
+        return None
+    try:
+        values = [int(arg) for arg in args]
+    except ValueError:
+        return None
+    if any(not low <= value <= high for value in values):
+        return 'range'
+    return values
+
+
+class MockTello():
+    """State of one virtual drone and its answers to SDK commands."""
+
+    MOVES = {'up': (0, 0, 1), 'down': (0, 0, -1), 'left': (0, -1, 0), 'right': (0, 1, 0),
+             'forward': (1, 0, 0), 'back': (-1, 0, 0)}
+    # Answered like the simulator (controllers/cfc/tello_sdk.py) does
+    QUERIES = {
+        'speed?': lambda d: str(d.speed),
+        'battery?': lambda d: str(int(d.battery)),
+        'time?': lambda d: str(int(d.flight_time)),
+        'height?': lambda d: str(int(d.z)),
+        'temp?': lambda d: '61',
+        'attitude?': lambda d: 'pitch:0;roll:0;yaw:{};'.format(d.yaw),
+        'baro?': lambda d: str(int(round(d.z / 100))),
+        'acceleration?': lambda d: 'agx:0.00;agy:0.00;agz:-1000.00;',
+        'tof?': lambda d: '{}mm'.format(max(100, int(d.z * 10))),
+        'wifi?': lambda d: '90',
+        'sdk?': lambda d: '20',
+        'sn?': lambda d: 'MOCK{:04d}'.format(d.index),
+        'active?': lambda d: OK,
+    }
+
+    def __init__(self, index, address):
+        self.index = index
+        self.address = address
+        self.x = self.y = self.z = 0.0  # cm
+        self.yaw = 0  # degrees
+        self.speed = DEFAULT_SPEED
+        self.battery = 100.0
+        self.flying = False
+        self.rc = (0, 0, 0, 0)
+        self.takeoff_at = None
+        self.flight_time = 0
+        self.lock = None  # asyncio.Lock, created in the loop
+        self.clients = set()  # (host, port) receiving state packets
+        self.handled = 0
+
+    def state_packet(self):
+        if self.flying:
+            self.flight_time = time.monotonic() - self.takeoff_at
+        # rc velocities are -100..100, taken as cm/s
+        return STATE_FORMAT.format(yaw=self.yaw, vgx=self.rc[1], vgy=self.rc[0], vgz=self.rc[2],
+                                   tof=max(10, int(self.z)), h=int(self.z), bat=int(self.battery),
+                                   baro=self.z / 100, time=int(self.flight_time)).encode('ascii')
+
+    def execute(self, text):
+        """Apply one command line. Returns (reply, seconds the command takes);
+        reply None for commands the Tello does not answer (rc).
+        """
+        words = text.strip().split()
+        if not words:
+            return ERROR, 0.0
+        verb, args = words[0].lower(), words[1:]
+        self.handled += 1
+
+        query = self.QUERIES.get(verb)
+        if query is not None:
+            return query(self), 0.0
+        if verb == 'rc':
+            values = _int_args(args, 4, -100, 100)
+            if isinstance(values, list):
+                self.rc = tuple(values)
+            return None, 0.0
+        if verb in ('command', 'streamon', 'streamoff', 'mon', 'moff', 'mdirection', 'keepalive', 'wifi',
+                    'ap', 'port', 'setfps', 'setbitrate', 'setresolution', 'downvision', 'motoron', 'motoroff'):
+            return OK, 0.0
+        if verb == 'takeoff':
+            if not self.flying:
+                self.flying = True
+                self.takeoff_at = time.monotonic()
+                self.z = TAKEOFF_HEIGHT
+            return OK, TAKEOFF_DURATION
+        if verb in ('land', 'emergency'):
+            duration = TAKEOFF_DURATION if verb == 'land' and self.flying else 0.0
+            if self.flying:
+                self.battery = max(0.0, self.battery - BATTERY_DRAIN * (time.monotonic() - self.takeoff_at))
+            self.flying = False
+            self.z = 0.0
+            self.rc = (0, 0, 0, 0)
+            return OK, duration
+        if verb == 'stop':
+            self.rc = (0, 0, 0, 0)
+            return OK, 0.0
+        if verb == 'speed':
+            values = _int_args(args, 1, 10, 100)
+            if values == 'range':
+                return OUT_OF_RANGE, 0.0
+            if values is None:
+                return ERROR, 0.0
+            self.speed = values[0]
+            return OK, 0.0
+
+        if verb in self.MOVES or verb in ('cw', 'ccw', 'flip', 'go', 'curve'):
+            if not self.flying:
+                return NOT_FLYING, 0.0
+        if verb in self.MOVES:
+            values = _int_args(args, 1, 20, 500)
+            if values == 'range':
+                return OUT_OF_RANGE, 0.0
+            if values is None:
+                return ERROR, 0.0
+            dx, dy, dz = self.MOVES[verb]
+            self.move(dx * values[0], dy * values[0], dz * values[0])
+            return OK, values[0] / self.speed
+        if verb in ('cw', 'ccw'):
+            values = _int_args(args, 1, 1, 360)
+            if values == 'range':
+                return OUT_OF_RANGE, 0.0
+            if values is None:
+                return ERROR, 0.0
+            turn = values[0] if verb == 'cw' else -values[0]
+            self.yaw = (self.yaw + turn + 180) % 360 - 180
+            return OK, values[0] / TURN_RATE
+        if verb == 'flip':
+            if len(args) != 1 or args[0] not in ('l', 'r', 'f', 'b'):
+                return ERROR, 0.0
+            return OK, FLIP_DURATION
+        if verb == 'go':
+            values = _int_args(args[:4], 4, -500, 500) if len(args) in (4, 5) else None
+            if values is None or values == 'range':
+                return ERROR if values is None else OUT_OF_RANGE, 0.0
+            x, y, z, speed = values
+            if not 10 <= speed <= 100:
+                return OUT_OF_RANGE, 0.0
+            self.move(x, y, z)
+            return OK, math.sqrt(x * x + y * y + z * z) / speed
+        if verb == 'curve':
+            values = _int_args(args[:7], 7, -500, 500) if len(args) in (7, 8) else None
+            if values is None or values == 'range':
+                return ERROR if values is None else OUT_OF_RANGE, 0.0
+            x1, y1, z1, x2, y2, z2, speed = values
+            if not 10 <= speed <= 60:
+                return OUT_OF_RANGE, 0.0
+            self.move(x2, y2, z2)
+            length = (math.sqrt(x1 * x1 + y1 * y1 + z1 * z1)
+                      + math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2 + (z2 - z1) ** 2))
+            return OK, length / speed
+        return ERROR, 0.0
+
+    def move(self, forward, right, up):
+        """Move by the given cm in the body frame."""
+        yaw = math.radians(self.yaw)
+        self.x += forward * math.cos(yaw) - right * math.sin(yaw)
+        self.y += forward * math.sin(yaw) + right * math.cos(yaw)
+        self.z = max(0.0, self.z + up)
+
+
+class DroneProtocol(asyncio.DatagramProtocol):
+    """The UDP command port of one virtual drone."""
+
+    def __init__(self, fleet, drone):
+        self.fleet = fleet
+        self.drone = drone
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        fleet = self.fleet
+        fleet.received += 1
+        if fleet.lost():
+            fleet.lost_datagrams += 1
+            return
+        try:
+            text = data.decode('ascii')
+        except UnicodeDecodeError:
+            return
+        if text.strip() == 'command':
+            self.drone.clients.add((addr[0], self.drone.address.state_port))
+        asyncio.ensure_future(self.handle(text, addr))
+
+    async def handle(self, text, addr):
+        reply = await self.fleet.execute(self.drone, text)
+        if reply is None:
+            return
+        if self.fleet.lost():
+            self.fleet.lost_datagrams += 1
+            return
+        await asyncio.sleep(self.fleet.delay())
+        self.transport.sendto(reply.encode('ascii'), addr)
+
+
+class MockFleet():
+    def __init__(self, count, mode='host', latency=0.0, jitter=0.0, loss=0.0, duration_scale=1.0,
+                 state_rate=10.0, http=True, seed=None):
+        """
+        Arguments:
+            count: number of virtual drones
+            mode: addressing, 'host' or 'port', see drone_address()
+            latency: one-way delay of every message, in seconds
+            jitter: uniform random extra delay, 0 to jitter seconds
+            loss: probability of losing a UDP datagram
+            duration_scale: factor on the time commands take, 0 for none
+            state_rate: state packets per second and drone, 0 for none
+            http: also serve GET /send
+            seed: of the random generator, for repeatable runs
+        """
+        self.drones = [MockTello(i, drone_address(i, mode)) for i in range(count)]
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.duration_scale = duration_scale
+        self.state_rate = state_rate
+        self.http = http
+        self.random = random.Random(seed)
+
+        self.loop = None
+        self.stopped = None
+        self.transports = []
+        self.http_drones = {}
+        self.servers = []
+        self.tasks = []
+        self.ready = threading.Event()
+        self.error = None
+        self.thread = None
+
+        self.received = 0
+        self.lost_datagrams = 0
+        self.http_requests = 0
+        self.state_packets = 0
+
+    def delay(self):
+        return self.latency + self.random.uniform(0.0, self.jitter) if self.jitter else self.latency
+
+    def lost(self):
+        return self.loss > 0 and self.random.random() < self.loss
+
+    async def execute(self, drone, text):
+        """Run one command on drone after the inbound delay, serialised with
+        its other commands, and return the reply.
+        """
+        delay = self.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if text.startswith('rc ') or text.strip() == 'emergency':
+            # Not queued behind a running command, like the real drone
+            return drone.execute(text)[0]
+        async with drone.lock:
+            reply, duration = drone.execute(text)
+            if duration and self.duration_scale:
+                await asyncio.sleep(duration * self.duration_scale)
+        return reply
+
+    async def handle_http(self, reader, writer):
+        """Minimal HTTP/1.1 server for GET /send?command=..., keep-alive."""
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                lines = request.decode('latin-1').split('\r\n')
+                method, target, version = (lines[0].split(' ') + ['', ''])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+                self.http_requests += 1
+
+                url = urlsplit(target)
+                command = parse_qs(url.query).get('command', [None])[0]
+                if method != 'GET' or url.path != '/send' or command is None:
+                    status, body = '404 Not Found', b'not found'
+                else:
+                    drone = self.http_drones[writer.get_extra_info('sockname')[:2]]
+                    if command.strip() == 'command':
+                        # The state still goes over UDP, as for the UDP clients
+                        drone.clients.add((writer.get_extra_info('peername')[0], drone.address.state_port))
+                    reply = await self.execute(drone, command)
+                    status, body = '200 OK', (reply if reply is not None else OK).encode('ascii')
+                    delay = self.delay()
+                    if delay:
+                        await asyncio.sleep(delay)
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                writer.write('HTTP/1.1 {}\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: {}\r\n'
+                             'Connection: {}\r\n\r\n'.format(status, len(body), 'close' if close else 'keep-alive')
+                             .encode('latin-1') + body)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        except asyncio.CancelledError:
+            # Connection still open when the fleet stops
+            pass
+        finally:
+            writer.close()
+
+    async def send_states(self):
+        """Send the state packets of all drones, state_rate times a second."""
+        period = 1 / self.state_rate
+        next_time = time.monotonic()
+        while True:
+            for drone, transport in zip(self.drones, self.transports):
+                if not drone.clients:
+                    continue
+                packet = drone.state_packet()
+                for client in drone.clients:
+                    if self.lost():
+                        self.lost_datagrams += 1
+                        continue
+                    transport.sendto(packet, client)
+                    self.state_packets += 1
+            next_time += period
+            await asyncio.sleep(max(0.0, next_time - time.monotonic()))
+
+    async def start(self):
+        """Open the sockets of all drones in the running loop."""
+        self.loop = asyncio.get_running_loop()
+        for drone in self.drones:
+            drone.lock = asyncio.Lock()
+            address = drone.address
+            transport, _ = await self.loop.create_datagram_endpoint(
+                lambda drone=drone: DroneProtocol(self, drone), local_addr=(address.host, address.command_port))
+            self.transports.append(transport)
+            if self.http:
+                self.servers.append(await asyncio.start_server(self.handle_http, address.host, address.http_port))
+                self.http_drones[(address.host, address.http_port)] = drone
+        if self.state_rate > 0:
+            self.tasks.append(asyncio.ensure_future(self.send_states()))
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        for transport in self.transports:
+            transport.close()
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+    def run(self):
+        """Serve until stop() (or forever). Blocking."""
+        async def main():
+            self.stopped = asyncio.Event()
+            try:
+                await self.start()
+            except Exception as e:
+                self.error = e
+                self.ready.set()
+                return
+            self.ready.set()
+            await self.stopped.wait()
+            await self.close()
+        asyncio.run(main())
+
+    def start_in_thread(self):
+        """Serve from a daemon thread, returned once all sockets are open."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self.thread
+
+    def stop(self):
+        if self.stopped is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.stopped.set)
+        if self.thread is not None:
+            self.thread.join()
+
+    def summary(self):
+        return ('{} drones: {} datagrams received, {} lost, {} HTTP requests, {} commands handled, '
+                '{} state packets sent'.format(len(self.drones), self.received, self.lost_datagrams,
+                                               self.http_requests, sum(d.handled for d in self.drones),
+                                               self.state_packets))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drones', type=int, default=10)
+    parser.add_argument('--mode', choices=('host', 'port'), default='host', help='addressing mode')
+    parser.add_argument('--latency', type=float, default=0.0, help='one-way delay of every message, in s')
+    parser.add_argument('--jitter', type=float, default=0.0, help='uniform random extra delay, up to this, in s')
+    parser.add_argument('--loss', type=float, default=0.0, help='probability of losing a UDP datagram')
+    parser.add_argument('--duration-scale', type=float, default=1.0,
+                        help='factor on the time commands take, 0 answers at once')
+    parser.add_argument('--state-rate', type=float, default=10.0, help='state packets per second and drone')
+    parser.add_argument('--no-http', action='store_true', help='UDP only')
+    parser.add_argument('--seed', type=int, help='of the random generator')
+    args = parser.parse_args()
+
+    fleet = MockFleet(args.drones, args.mode, args.latency, args.jitter, args.loss, args.duration_scale,
+                      args.state_rate, not args.no_http, args.seed)
+    fleet.start_in_thread()
+    for drone in fleet.drones[:3]:
+        address = drone.address
+        print("drone {:3d}  udp {}:{}  http {}:{}".format(drone.index, address.host, address.command_port,
+                                                          address.host, address.http_port))
+    if len(fleet.drones) > 3:
+        print("...")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    fleet.stop()
+    print(fleet.summary())
@@ -0,0 +1,142 @@
+"""Camera-to-decision latency of the gesture loop, reading the camera inline
+(as dji.py and new.py did, with their fixed sleeps) or through
+LatestFrameCapture.
+
+The camera is simulated like a V4L2 webcam behind cv2.VideoCapture: it
+takes --fps frames per second into --buffers driver buffers; when all
+buffers are full, new frames are dropped, and read() returns the oldest
+buffered frame. Each frame carries its sequence number, so the latency is
+measured from the moment the camera took the frame. Inference is a sleep
+of --inference seconds, or with --engine the real GestureEngine on blank
+frames.
+
+    python bench_capture.py [--seconds 5] [--fps 30] [--buffers 4] [--inference 0.04] [--engine]
+"""
+
+import argparse
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from capture import LatestFrameCapture
+
+
+class SimulatedCamera:
+    """A webcam with a few driver buffers, read() like cv2.VideoCapture."""
+
+    def __init__(self, fps, buffers, seconds, shape=(480, 640, 3)):
+        self.fps = fps
+        self.shape = shape
+        self.buffered = deque()
+        self.buffers = buffers
+        self.taken_at = []
+        self.end = time.perf_counter() + seconds
+        self.available = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        start = time.perf_counter()
+        sequence = 0
+        while True:
+            delay = start + sequence / self.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.perf_counter()
+            with self.available:
+                if now > self.end:
+                    self.buffered.append(None)
+                    self.available.notify_all()
+                    return
+                self.taken_at.append(now)
+                if len(self.buffered) < self.buffers:
+                    self.buffered.append(sequence)
+                    self.available.notify_all()
+            sequence += 1
+
+    def read(self):
+        with self.available:
+            self.available.wait_for(lambda: self.buffered)
+            sequence = self.buffered[0]
+            if sequence is None:
+                return False, None
+            self.buffered.popleft()
+        image = np.zeros(self.shape, dtype=np.uint8)
+        image.reshape(-1)[:8].view(np.uint64)[0] = sequence
+        return True, image
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+def sequence_of(image):
+    return int(image.reshape(-1)[:8].view(np.uint64)[0])
+
+
+def inline_loop(camera, infer, sleep):
+    """The old loops: read, infer, sleep."""
+    decisions = []
+    while True:
+        grabbed, image = camera.read()
+        if not grabbed:
+            return decisions
+        infer(image)
+        decisions.append((sequence_of(image), time.perf_counter()))
+        if sleep:
+            time.sleep(sleep)
+
+
+def capture_loop(camera, infer):
+    capture = LatestFrameCapture(camera).start()
+    decisions = []
+    while True:
+        frame = capture.read()
+        if frame is None:
+            break
+        infer(frame.image)
+        capture.decided(frame)
+        decisions.append((sequence_of(frame.image), time.perf_counter()))
+    capture.release()
+    return decisions, capture.get_latency_stats()
+
+
+def report(label, camera, decisions, seconds):
+    latencies = np.array([at - camera.taken_at[sequence] for sequence, at in decisions]) * 1e3
+    print("{:22s} {:5.1f} decisions/s  latency median {:6.1f} ms  p95 {:6.1f} ms  max {:6.1f} ms".format(
+        label, len(decisions) / seconds, np.median(latencies), np.percentile(latencies, 95), latencies.max()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration of every measurement')
+    parser.add_argument('--fps', type=float, default=30, help='camera frame rate')
+    parser.add_argument('--buffers', type=int, default=4, help='driver buffers of the camera')
+    parser.add_argument('--inference', type=float, default=0.04, help='seconds of simulated inference per frame')
+    parser.add_argument('--engine', action='store_true', help='run the GestureEngine instead of sleeping')
+    args = parser.parse_args()
+
+    if args.engine:
+        from engine import GestureEngine
+        engine = GestureEngine()
+        engine.wait()
+
+        def infer(image):
+            engine.recognize_action(np.ascontiguousarray(image[..., ::-1]))
+    else:
+        def infer(image):
+            time.sleep(args.inference)
+
+    for label, sleep in (('inline + sleep 0.05', 0.05), ('inline + sleep 0.025', 0.025), ('inline', 0)):
+        camera = SimulatedCamera(args.fps, args.buffers, args.seconds)
+        report(label, camera, inline_loop(camera, infer, sleep), args.seconds)
+
+    camera = SimulatedCamera(args.fps, args.buffers, args.seconds)
+    decisions, stats = capture_loop(camera, infer)
+    report('LatestFrameCapture', camera, decisions, args.seconds)
+    print("LatestFrameCapture.get_latency_stats(): median {:.1f} ms, {} of {} frames not read".format(
+        stats['median'] * 1e3, stats['dropped'], stats['frames']))
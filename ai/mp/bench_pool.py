@@ -0,0 +1,65 @@
+"""Throughput of pose inference in this process (GestureEngine) and in a
+GesturePool of 1, 2, 4, ... worker processes, up to --max-workers (by
+default the number of cores, at least 2).
+
+The frames are --frames synthetic 640x480 images of noise, which the pose
+detector searches in full every time, so this is the expensive case of no
+person being tracked. Results come back in submission order; the pool is
+checked for that.
+
+    python bench_pool.py [--frames 200] [--max-workers N] [--depth 2]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from engine import GestureEngine
+from pool import GesturePool
+
+
+def bench_engine(frames):
+    engine = GestureEngine()
+    engine.wait()
+    engine.recognize_action(frames[0].copy())
+    start = time.perf_counter()
+    for frame in frames:
+        engine.recognize_action(frame.copy())
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return len(frames) / elapsed
+
+
+def bench_pool(frames, workers, depth):
+    pool = GesturePool(workers, depth).start()
+    # Warm up every worker, which also waits for their engines
+    for _ in pool.map(frames[:2 * workers]):
+        pass
+    start = time.perf_counter()
+    order = [tag for tag, response in pool.map(frames)]
+    elapsed = time.perf_counter() - start
+    pool.close()
+    assert order == list(range(len(frames))), 'results out of order'
+    return len(frames) / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=200, help='frames per measurement')
+    parser.add_argument('--max-workers', type=int, default=max(2, os.cpu_count()), help='largest pool')
+    parser.add_argument('--depth', type=int, default=2, help='frames in flight per worker')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(args.frames)]
+
+    print("{} cores".format(os.cpu_count()))
+    single = bench_engine(frames)
+    print("{:12s} {:6.1f} frames/s".format('in process', single))
+    workers = 1
+    while workers <= args.max_workers:
+        rate = bench_pool(frames, workers, args.depth)
+        print("{:2d} workers   {:6.1f} frames/s  x{:.2f}".format(workers, rate, rate / single))
+        workers *= 2
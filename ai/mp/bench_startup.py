@@ -0,0 +1,91 @@
+"""Startup cost of the gesture modules: how long importing them takes and
+how long until the first prediction, each in a fresh interpreter.
+
+    eager       what importing run.py used to do (without opening the
+                camera): import MediaPipe, build the pose graph, load the
+                model (the Orange pickle if Orange is installed)
+    lazy        import run, GestureEngine builds on the first frame
+    background  import run, engine.start(), then the application opens its
+                camera (--camera seconds of sleep) while the engine builds
+
+The frame is a synthetic 640x480 image, so the "prediction" finds no pose;
+it still runs the whole pose graph once.
+
+    python bench_startup.py [--repeat 3] [--camera 0.5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PRELUDE = """
+import time
+start = time.perf_counter()
+import sys
+sys.path.insert(0, {here!r})
+"""
+
+EAGER = """
+import cv2
+import mediapipe as mp
+pose = mp.solutions.pose.Pose(False, 1, True, False, True, 0.5, 0.5)
+try:
+    import pickle
+    import Orange
+    model = pickle.load(open('model.pkcls', 'rb'))
+except ImportError:
+    from gesture_model import GestureModel
+    model = GestureModel('model.npz')
+imported = time.perf_counter()
+time.sleep({camera})
+import numpy as np
+from features import landmark_array, landmark_features
+results = pose.process(np.zeros((480, 640, 3), np.uint8))
+if results.pose_landmarks:
+    model.predict(landmark_features(landmark_array(results.pose_landmarks))[None])
+"""
+
+LAZY = """
+import run
+imported = time.perf_counter()
+{start_engine}
+time.sleep({camera})
+import numpy as np
+run.recognize_action(np.zeros((480, 640, 3), np.uint8))
+"""
+
+REPORT = """
+first = time.perf_counter()
+print(json.dumps([imported - start, first - start]))
+"""
+
+
+def measure(code, camera):
+    source = PRELUDE.format(here=HERE) + code + "import json\n" + REPORT
+    output = subprocess.run([sys.executable, '-c', source.replace('{camera}', str(camera))],
+                            cwd=HERE, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per variant')
+    parser.add_argument('--camera', type=float, default=0.5, help='seconds the application spends opening its camera')
+    args = parser.parse_args()
+
+    variants = (
+        ('eager', EAGER),
+        ('lazy', LAZY.replace('{start_engine}', '')),
+        ('background', LAZY.replace('{start_engine}', 'run.engine.start()')),
+    )
+    print("{:10s}  {:>10s}  {:>16s}  (median of {}, camera open {:.1f} s)".format(
+        '', 'import', 'first prediction', args.repeat, args.camera))
+    for label, code in variants:
+        times = np.median([measure(code, args.camera) for _ in range(args.repeat)], axis=0)
+        print("{:10s}  {:8.0f} ms  {:14.0f} ms".format(label, *(times * 1e3)))
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+# One camera frame, image as the camera returned it (BGR for OpenCV), with
+# a sequence number counting from 1 and time.perf_counter() at capture
+CapturedFrame = namedtuple('CapturedFrame', ['sequence', 'timestamp', 'image'])
+
+
+class LatestFrameCapture:
+    """Reads a camera in a background thread and keeps only the newest
+    frame. Reading a cv2.VideoCapture inline between inferences returns
+    the frames OpenCV buffered meanwhile, several inference periods old;
+    here the grabber drains the camera at its own rate and read() returns
+    the newest frame, blocking only until there is one newer than the last
+    one returned.
+
+    Every frame is a new array, replaced, never written to, so consumers
+    may keep and draw into the frames they get.
+
+    decided(frame) records the time from the capture of a frame to the
+    decision made on it; get_latency_stats() reports those times in
+    seconds, together with the frames nobody read.
+
+        capture = LatestFrameCapture(0).start()
+        while True:
+            frame = capture.read()
+            ...
+            capture.decided(frame)
+    """
+
+    LATENCY_SAMPLES = 1024
+
+    def __init__(self, source=0):
+        """
+        Arguments:
+            source: camera index or video path for cv2.VideoCapture, or an
+                opened capture (anything with read() and release())
+        """
+        if hasattr(source, 'read'):
+            self.stream = source
+        else:
+            import cv2
+            self.stream = cv2.VideoCapture(source)
+        self.latest = None
+        self.last_sequence = 0
+        self.dropped = 0
+        self.stopped = False
+        self.latencies = deque([], self.LATENCY_SAMPLES)
+        self._read_sequence = 0
+        self._new_frame = threading.Condition()
+        self._thread = None
+
+    def isOpened(self):
+        """Whether the camera could be opened."""
+        return self.stream.isOpened() if hasattr(self.stream, 'isOpened') else True
+
+    def start(self):
+        """Start the grabber thread. Returns the capture."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._grab, daemon=True)
+            self._thread.start()
+        return self
+
+    def _grab(self):
+        while not self.stopped:
+            grabbed, image = self.stream.read()
+            timestamp = time.perf_counter()
+            with self._new_frame:
+                if not grabbed:
+                    # End of the stream or camera gone
+                    self.stopped = True
+                else:
+                    if self.latest is not None and self.latest.sequence > self._read_sequence:
+                        self.dropped += 1
+                    self.last_sequence += 1
+                    self.latest = CapturedFrame(self.last_sequence, timestamp, image)
+                self._new_frame.notify_all()
+
+    def read(self, after=None, timeout=None):
+        """The newest frame, as soon as there is one with a sequence
+        number above after (by default the last frame read() returned).
+        Returns None when the stream ended or on timeout.
+        """
+        if after is None:
+            after = self._read_sequence
+        with self._new_frame:
+            if not self._new_frame.wait_for(
+                    lambda: self.stopped or (self.latest is not None and self.latest.sequence > after), timeout):
+                return None
+            frame = self.latest
+            if frame is None or frame.sequence <= after:
+                return None
+            self._read_sequence = max(self._read_sequence, frame.sequence)
+            return frame
+
+    def decided(self, frame, at=None):
+        """Record that a decision on frame was made, now or at the given
+        time.perf_counter(). Returns the seconds since its capture.
+        """
+        latency = (time.perf_counter() if at is None else at) - frame.timestamp
+        self.latencies.append(latency)
+        return latency
+
+    def get_latency_stats(self) -> dict:
+        """Seconds from the capture of a frame to the decision made on it,
+        over the last LATENCY_SAMPLES decisions.
+        """
+        latencies = np.array(self.latencies)
+        if not len(latencies):
+            return {'frames': self.last_sequence, 'samples': 0, 'dropped': self.dropped}
+        return {
+            'frames': self.last_sequence,
+            'samples': len(latencies),
+            'dropped': self.dropped,
+            'mean': float(latencies.mean()),
+            'median': float(np.median(latencies)),
+            'p95': float(np.percentile(latencies, 95)),
+            'max': float(latencies.max()),
+        }
+
+    def release(self):
+        """Stop the grabber thread and release the camera."""
+        self.stopped = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.stream.release()
+        with self._new_frame:
+            self._new_frame.notify_all()
@@ -0,0 +1,94 @@
+"""
+Check that a GesturePool survives a dead worker: with --workers workers
+and frames in flight, one worker is killed with SIGKILL. get() must raise
+a RuntimeError for each frame the worker had in flight and return the
+others in order, the remaining workers must take the next frames, and
+once all workers are killed, submit() must raise instead of blocking.
+
+    python check_pool.py [--workers 2] [--frames 20]
+"""
+
+import argparse
+import os
+import signal
+import sys
+
+import numpy as np
+
+from pool import GesturePool
+
+
+def drain(pool, results, lost):
+    while pool.pending():
+        try:
+            result = pool.get(timeout=30)
+        except RuntimeError as e:
+            lost.append(str(e))
+            continue
+        if result is None:
+            return False
+        results.append(result[0])
+    return True
+
+
+def check(workers, frames):
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (240, 320, 3), dtype=np.uint8) for _ in range(frames)]
+    pool = GesturePool(workers).start()
+    ok = True
+    try:
+        # Warm up, so the engines are there before the kill
+        for _ in pool.map(images[:2 * workers]):
+            pass
+
+        results, lost = [], []
+        for i in range(pool.slots):
+            pool.submit(images[i], i)
+        os.kill(pool.processes[0].pid, signal.SIGKILL)
+        if not drain(pool, results, lost):
+            print("FAIL: get() timed out after the kill")
+            return False
+        print("{} frames returned, {} lost to the dead worker".format(len(results), len(lost)))
+        if lost:
+            print("  " + lost[0])
+        if sorted(results) != results or len(results) + len(lost) != pool.slots:
+            print("FAIL: results {} out of order or missing".format(results))
+            ok = False
+
+        results, lost = [], []
+        for i in range(pool.slots, frames):
+            if pool.submit(images[i], i, timeout=30) is None:
+                print("FAIL: submit() timed out with {} workers alive".format(workers - 1))
+                return False
+            drain(pool, results, lost)
+        print("{} frames returned by the other workers".format(len(results)))
+        if lost or results != list(range(pool.slots, frames)):
+            print("FAIL: frames lost or out of order after the kill")
+            ok = False
+
+        for process in pool.processes[1:]:
+            os.kill(process.pid, signal.SIGKILL)
+        for process in pool.processes:
+            process.join()
+        try:
+            pool.submit(images[0], 0, timeout=30)
+            drain(pool, [], [])
+            pool.submit(images[0], 0, timeout=30)
+            print("FAIL: submit() accepted a frame with no worker alive")
+            ok = False
+        except RuntimeError as e:
+            print("submit() without workers: {}".format(e))
+    finally:
+        pool.close()
+    print("OK" if ok else "FAIL")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='worker processes, one of them killed')
+    parser.add_argument('--frames', type=int, default=20, help='frames submitted')
+    args = parser.parse_args()
+    if args.workers < 2:
+        parser.error('--workers must be at least 2, one is killed')
+    sys.exit(0 if check(args.workers, args.frames) else 1)
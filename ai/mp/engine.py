@@ -0,0 +1,165 @@
+import os
+import threading
+
+import numpy as np
+
+try:
+    from .features import landmark_array, landmark_features
+    from .gesture_model import MODEL_PATH, GestureModel
+except ImportError:
+    from features import landmark_array, landmark_features
+    from gesture_model import MODEL_PATH, GestureModel
+
+# The MediaPipe Pose settings the model was trained with
+POSE_OPTIONS = dict(
+    static_image_mode=False,
+    model_complexity=1,
+    smooth_landmarks=True,
+    enable_segmentation=False,
+    smooth_segmentation=True,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5,
+)
+
+
+class GestureEngine:
+    """Pose tracking (MediaPipe Pose) plus the gesture classifier, built on
+    first use instead of at import: importing MediaPipe alone takes most of
+    a second. start() builds them in a background thread instead, so the
+    caller can open its camera or connect to the drone in the meantime.
+
+    The engine never touches a camera; the caller reads the frames and
+    passes them in as RGB arrays, in the order they were taken (the pose
+    tracker follows the person from frame to frame). One engine serves one
+    video stream from one thread at a time.
+
+        engine = GestureEngine().start()
+        stream = cv2.VideoCapture(0)
+        ...
+        r = engine.recognize_action(frame_rgb)
+    """
+
+    def __init__(self, model_path=None, **pose_options):
+        self.model_path = model_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), MODEL_PATH)
+        self.pose_options = dict(POSE_OPTIONS, **pose_options)
+        self._model = None
+        self._pose = None
+        self._lock = threading.Lock()
+        # Separate, so classes does not wait for MediaPipe
+        self._model_lock = threading.Lock()
+        self._thread = None
+        self._error = None
+
+    def start(self):
+        """Build the model and the pose graph in a background thread.
+        Returns the engine.
+        """
+        with self._lock:
+            if self._thread is None and self._pose is None:
+                self._thread = threading.Thread(target=self._build_in_background, daemon=True)
+                self._thread.start()
+        return self
+
+    def _build_in_background(self):
+        try:
+            self._build()
+        except Exception as e:
+            # Raised again by the next call that needs the engine
+            self._error = e
+
+    def _build(self):
+        with self._lock:
+            if self._pose is not None:
+                return
+            self.model  # loads the classifier
+            import mediapipe as mp
+            self._mp_pose = mp.solutions.pose
+            self._draw = mp.solutions.drawing_utils
+            self._pose = self._mp_pose.Pose(**self.pose_options)
+
+    def ready(self):
+        """Whether recognize_action() can run without waiting for the build.
+        Raises the error of a failed background build.
+        """
+        if self._error is not None:
+            self.wait()
+        return self._pose is not None
+
+    def wait(self, timeout=None):
+        """Block until the engine is built, building it here if start() was
+        not called. Returns ready().
+        """
+        if self._thread is None:
+            self._build()
+        else:
+            self._thread.join(timeout)
+        if self._error is not None:
+            error, self._error, self._thread = self._error, None, None
+            raise error
+        return self.ready()
+
+    @property
+    def model(self):
+        """The gesture classifier; loads it (but not MediaPipe) if needed."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = GestureModel(self.model_path)
+        return self._model
+
+    @property
+    def classes(self):
+        """Class names, indexed by the predicted class value."""
+        return self.model.classes
+
+    def recognize_action(self, imgRGB):
+        """Track the pose in one RGB frame and classify it. Draws the
+        landmarks into the frame. Returns (prediction, imgRGB) with
+        prediction (array([class]), array([[probabilities]])), or None
+        without a pose.
+        """
+        if self._pose is None:
+            self.wait()
+        results = self._pose.process(imgRGB)
+        if results.pose_landmarks:
+            points = landmark_array(results.pose_landmarks)
+
+            self._draw.draw_landmarks(imgRGB, results.pose_landmarks, self._mp_pose.POSE_CONNECTIONS)
+
+            # Make a prediction
+            prediction = self._model.predict(landmark_features(points)[None])
+            return prediction, imgRGB
+
+    def recognize_actions(self, frames):
+        """recognize_action() for many RGB frames, with one model.predict call
+        for all of them. The landmarks are drawn into the frames. Returns a
+        list with, per frame, the prediction in the form recognize_action()
+        returns it, or None without a pose.
+        """
+        if self._pose is None:
+            self.wait()
+        found = []
+        points = []
+        for i, imgRGB in enumerate(frames):
+            results = self._pose.process(imgRGB)
+            if results.pose_landmarks:
+                found.append(i)
+                points.append(landmark_array(results.pose_landmarks))
+                self._draw.draw_landmarks(imgRGB, results.pose_landmarks, self._mp_pose.POSE_CONNECTIONS)
+
+        predictions = [None] * len(frames)
+        if found:
+            values, probabilities = self._model.predict(landmark_features(np.stack(points)))
+            for row, i in enumerate(found):
+                predictions[i] = (values[row:row + 1], probabilities[row:row + 1])
+        return predictions
+
+    def close(self):
+        """Release the pose graph. The engine builds it again if used."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._pose is not None:
+                self._pose.close()
+                self._pose = None
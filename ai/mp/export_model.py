@@ -0,0 +1,104 @@
+"""Export the Orange gesture classifier (model.pkcls) to the NumPy arrays of
+gesture_model.GestureModel (model.npz), then check that both give the same
+classes on the training data and on random features.
+
+Needs Orange3 and the scikit-learn version the model was pickled with;
+GestureModel itself only needs NumPy.
+
+    python export_model.py [--model model.pkcls] [--out model.npz]
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+
+from gesture_model import GestureModel
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def export(model):
+    """The arrays of GestureModel for an Orange model wrapping a
+    GradientBoostingClassifier.
+    """
+    skl = model.skl_model
+    stages, classes = skl.estimators_.shape
+    # The init estimator predicts the same prior for every row
+    init = skl._raw_predict_init(np.zeros((1, skl.n_features_in_), dtype=np.float32))[0]
+
+    feature, threshold, left, right, value = [], [], [], [], []
+    roots = np.empty((stages, classes), dtype=np.int32)
+    offset = 0
+    depth = 0
+    for stage in range(stages):
+        for k in range(classes):
+            tree = skl.estimators_[stage, k].tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            roots[stage, k] = offset
+            # Leaves point to themselves and compare anything on feature 0
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, 0.0, tree.threshold))
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            value.append(tree.value[:, 0, 0])
+            depth = max(depth, tree.max_depth)
+            offset += tree.node_count
+
+    return {
+        'classes': np.array(model.domain.class_var.values),
+        'feature_names': np.array([attribute.name for attribute in model.domain.attributes]),
+        'init': init.astype(np.float64),
+        'learning_rate': np.float64(skl.learning_rate),
+        'depth': np.int32(depth),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'value': np.concatenate(value).astype(np.float64),
+        'roots': roots,
+    }
+
+
+def compare(model, compiled, X, label):
+    values, probs = model.predict(X)
+    compiled_values, compiled_probs = compiled.predict(X)
+    assert np.array_equal(values, compiled_values), label + ': classes differ'
+    print("{:9s} {:6d} rows: same classes, probabilities differ by at most {:.1e}".format(
+        label, len(X), np.abs(probs - compiled_probs).max()))
+
+
+def per_call(function, X, seconds=1.0):
+    """Seconds per call of function(X)."""
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        function(X)
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.path.join(HERE, 'model.pkcls'))
+    parser.add_argument('--out', default=os.path.join(HERE, 'model.npz'))
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    np.savez_compressed(args.out, **export(model))
+    print("wrote {} ({} bytes)".format(args.out, os.path.getsize(args.out)))
+
+    compiled = GestureModel(args.out)
+    assert compiled.classes == tuple(model.domain.class_var.values)
+    compare(model, compiled, model.instances.X, 'training')
+    rng = np.random.default_rng(0)
+    low, high = model.instances.X.min(axis=0), model.instances.X.max(axis=0)
+    compare(model, compiled, rng.uniform(low, high, (100000, len(low))), 'random')
+
+    frame = model.instances.X[:1]
+    print("one frame: Orange {:.0f} us, NumPy {:.0f} us".format(
+        per_call(model.predict, frame) * 1e6, per_call(compiled.predict, frame) * 1e6))
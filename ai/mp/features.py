@@ -0,0 +1,88 @@
+import numpy as np
+
+# The model (model.pkcls) was trained on the x, y of landmarks 12 to 16 and
+# 23 to 24 of the 33 MediaPipe pose landmarks, flattened to
+# [x0, y0, x1, y1, ...], each minus the x of landmark 11 (left shoulder)
+FEATURE_INDEX = np.r_[24:34, 46:50]
+ORIGIN_INDEX = 22
+LANDMARKS = 33
+
+
+def landmark_array(pose_landmarks):
+    """The x, y of the pose landmarks of one MediaPipe result as a (33, 2)
+    float64 array.
+    """
+    return np.array([(landmark.x, landmark.y) for landmark in pose_landmarks.landmark], dtype=np.float64)
+
+
+def landmark_features(points):
+    """Model features of landmark arrays: (33, 2) -> (14,), or a batch
+    (n, 33, 2) -> (n, 14).
+    """
+    flat = points.reshape(points.shape[:-2] + (LANDMARKS * 2,))
+    return flat[..., FEATURE_INDEX] - flat[..., ORIGIN_INDEX, None]
+
+
+def legacy_features(features):
+    """The features as recognize_action() used to compute them from the list
+    [x0, y0, x1, y1, ...], kept to check landmark_features() against.
+    """
+    sel_features = [
+        features[22],
+        features[23],
+        features[24],
+        features[25],
+        features[26],
+        features[27],
+        features[28],
+        features[29],
+        features[30],
+        features[31],
+        features[32],
+        features[33],
+
+        features[46],
+        features[47],
+        features[48],
+        features[49],
+    ]
+
+    out_data = np.array(sel_features).reshape(1, -1)
+
+    out_data[:,2] = out_data[:,2] - out_data[:,0]
+    out_data[:,4] = out_data[:,4] - out_data[:,0]
+    out_data[:,6] = out_data[:,6] - out_data[:,0]
+    out_data[:,8] = out_data[:,8] - out_data[:,0]
+    out_data[:,10] = out_data[:,10] - out_data[:,0]
+    out_data[:,12] = out_data[:,12] - out_data[:,0]
+    out_data[:,14] = out_data[:,14] - out_data[:,0]
+
+    out_data[:,1] = out_data[:,1] - out_data[:,0]
+    out_data[:,3] = out_data[:,3] - out_data[:,0]
+    out_data[:,5] = out_data[:,5] - out_data[:,0]
+    out_data[:,7] = out_data[:,7] - out_data[:,0]
+    out_data[:,9] = out_data[:,9] - out_data[:,0]
+    out_data[:,11] = out_data[:,11] - out_data[:,0]
+    out_data[:,13] = out_data[:,13] - out_data[:,0]
+    out_data[:,15] = out_data[:,15] - out_data[:,0]
+
+    out_data[:,0] = out_data[:,0] - out_data[:,0]
+    out_data[:,1] = out_data[:,1] - out_data[:,1]
+
+    return out_data[:,2:]
+
+
+if __name__ == "__main__":
+    # Check that landmark_features() gives bit for bit the features of the
+    # old code, on random landmarks with the float32 precision of MediaPipe
+    rng = np.random.default_rng(0)
+    batch = rng.uniform(-0.5, 1.5, (10000, LANDMARKS, 2)).astype(np.float32).astype(np.float64)
+    expected = np.concatenate([legacy_features([float(value) for value in points.reshape(-1)])
+                               for points in batch])
+
+    single = np.stack([landmark_features(points) for points in batch])
+    batched = landmark_features(batch)
+    assert single.shape == batched.shape == expected.shape == (len(batch), len(FEATURE_INDEX))
+    assert np.array_equal(single.view(np.uint64), expected.view(np.uint64))
+    assert np.array_equal(batched.view(np.uint64), expected.view(np.uint64))
+    print("{} frames: features identical to the old code".format(len(batch)))
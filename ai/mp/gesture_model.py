@@ -0,0 +1,67 @@
+import numpy as np
+
+# Written by export_model.py from model.pkcls
+MODEL_PATH = 'model.npz'
+
+
+class GestureModel:
+    """The gesture classifier of model.pkcls (scikit-learn gradient boosting
+    inside an Orange model) evaluated with NumPy only, from the arrays
+    export_model.py wrote. predict() returns what the Orange model's
+    predict() returns for a NumPy array: (class indices as float,
+    class probabilities).
+
+    The trees of all stages and classes are stored flattened in one set of
+    node arrays; leaves point back to themselves, so depth steps of
+    "go left if x[feature] <= threshold" from the roots reach the leaf of
+    every tree at once.
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.classes = tuple(str(name) for name in data['classes'])
+            self.feature_names = tuple(str(name) for name in data['feature_names'])
+            self.init = data['init']
+            self.learning_rate = float(data['learning_rate'])
+            self.depth = int(data['depth'])
+            self.feature = data['feature']
+            self.threshold = data['threshold']
+            # Left and right child of node i at 2 i and 2 i + 1
+            self.children = np.stack((data['left'], data['right']), axis=1).reshape(-1)
+            self.value = data['value']
+            # (stages, classes) root nodes
+            self.roots = data['roots']
+
+    def leaves(self, X):
+        """Leaf node of every tree for every row of X, (rows, stages, classes).
+        Like scikit-learn, compares the float32 features with the float64
+        thresholds.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        row_starts = np.arange(0, X.size, X.shape[1])[:, None]
+        X = X.reshape(-1)
+        nodes = np.tile(self.roots.reshape(-1), (len(row_starts), 1))
+        for _ in range(self.depth):
+            # not <=, so NaN goes right as in scikit-learn
+            go_right = ~(X[row_starts + self.feature[nodes]] <= self.threshold[nodes])
+            nodes = self.children[2 * nodes + go_right]
+        return nodes.reshape((len(row_starts),) + self.roots.shape)
+
+    def decision_function(self, X):
+        """Raw scores, (rows, classes)."""
+        terms = self.learning_rate * self.value[self.leaves(X)]
+        # init + stage 0 + stage 1 + ..., added up in this order like
+        # scikit-learn does, so the sums round the same: cumsum adds
+        # sequentially, sum() would add pairwise
+        terms = np.concatenate((np.broadcast_to(self.init, (len(terms), 1, len(self.init))), terms), axis=1)
+        return np.cumsum(terms, axis=1)[:, -1]
+
+    def predict(self, X):
+        """(class index per row as float, probabilities (rows, classes))."""
+        raw = self.decision_function(X)
+        values = np.argmax(raw, axis=1).astype(np.float64)
+        # Softmax, as scikit-learn computes it
+        probs = raw - raw.max(axis=1)[:, None]
+        np.exp(probs, out=probs)
+        probs /= probs.sum(axis=1)[:, None]
+        return values, probs
@@ -0,0 +1,275 @@
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+try:
+    from .engine import GestureEngine
+except ImportError:
+    from engine import GestureEngine
+
+
+def _worker(tasks, results, model_path, pose_options):
+    """Worker process: one GestureEngine, frames from shared memory,
+    results to its own pipe.
+    """
+    engine = GestureEngine(model_path, **pose_options)
+    try:
+        engine.wait()
+        error = None
+    except Exception as e:
+        error = e
+    memory = None
+    frames = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        sequence, slot, name, slots, shape = task
+        if memory is None or memory.name != name:
+            if memory is not None:
+                frames = None
+                memory.close()
+            memory = shared_memory.SharedMemory(name)
+            frames = np.ndarray((slots,) + shape, dtype=np.uint8, buffer=memory.buf)
+        if error is not None:
+            results.send((sequence, slot, error))
+            continue
+        try:
+            # Draws the landmarks into the slot, the parent copies it out
+            response = engine.recognize_action(frames[slot])
+            results.send((sequence, slot, None if response is None else response[0]))
+        except Exception as e:
+            results.send((sequence, slot, e))
+    engine.close()
+    results.close()
+    frames = None
+    if memory is not None:
+        memory.close()
+
+
+class GesturePool:
+    """recognize_action() in worker processes, for when one process running
+    MediaPipe Pose (about one core) cannot keep up with the camera.
+
+    Every worker holds its own GestureEngine. submit() copies a frame into a
+    slot of a shared memory block and hands the slot to the worker with the
+    fewest frames in flight; get() returns the results in submission order,
+    so voting over consecutive predictions sees the frames in the order
+    they were taken. Each worker gets its frames in order, but only some of
+    them: with static_image_mode=False (the default) its pose tracker
+    follows the person across gaps of a few frames. Pass
+    static_image_mode=True to detect the pose in every frame on its own.
+
+    Frames in flight are bounded by workers * depth slots; submit() blocks
+    until a slot is free, so the caller keeps reading the newest frame
+    instead of queueing old ones.
+
+    A worker that dies (killed, out of memory, a crash in native code) gets
+    no more frames; get() raises a RuntimeError for each frame it had in
+    flight, and submit() raises one once no worker is left. Every worker
+    answers on its own pipe, so one killed while writing cannot block the
+    others.
+
+        pool = GesturePool(4).start()
+        pool.submit(frame_rgb, tag)
+        ...
+        tag, response = pool.get()
+    """
+
+    def __init__(self, workers=None, depth=2, model_path=None, **pose_options):
+        """
+        Arguments:
+            workers: worker processes, by default one per core
+            depth: frames in flight per worker
+            model_path, pose_options: as for GestureEngine
+        """
+        self.workers = workers or os.cpu_count()
+        self.slots = self.workers * depth
+        self.model_path = model_path
+        self.pose_options = pose_options
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = []
+        self.tasks = []
+        self.results = []
+        self.memory = None
+        self.frames = None
+        self.shape = None
+        self.free = list(range(self.slots))
+        self.in_flight = [0] * self.workers
+        self.dead = set()
+        # sequence -> (worker, slot, tag) of the frames sent, and
+        # sequence -> (tag, result, image) of the results not yet returned
+        self.sent = {}
+        self.done = {}
+        self.next_sequence = 0
+        self.next_result = 0
+
+    def start(self):
+        """Start the worker processes; they build their engines while the
+        caller goes on. Returns the pool.
+        """
+        if not self.processes:
+            for _ in range(self.workers):
+                tasks = self.context.Queue()
+                results, writer = self.context.Pipe(duplex=False)
+                process = self.context.Process(
+                    target=_worker, args=(tasks, writer, self.model_path, self.pose_options), daemon=True)
+                process.start()
+                # Only the worker writes, so its death reads as end of file
+                writer.close()
+                self.tasks.append(tasks)
+                self.results.append(results)
+                self.processes.append(process)
+        return self
+
+    def _allocate(self, shape):
+        self.shape = tuple(shape)
+        self.memory = shared_memory.SharedMemory(create=True, size=self.slots * int(np.prod(shape)))
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=self.memory.buf)
+
+    def pending(self):
+        """Frames submitted whose results get() did not return yet."""
+        return self.next_sequence - self.next_result
+
+    def submit(self, imgRGB, tag=None, timeout=None):
+        """Send an RGB frame to a worker, waiting for a free slot. tag is
+        returned with the result. Returns the sequence number of the
+        frame, or None on timeout. Raises a RuntimeError when all workers
+        died.
+
+        All frames must have the shape of the first.
+        """
+        if not self.processes:
+            self.start()
+        if self.frames is None:
+            self._allocate(imgRGB.shape)
+        elif imgRGB.shape != self.shape:
+            raise ValueError("frame shape {} differs from {}".format(imgRGB.shape, self.shape))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.free:
+            if not self._receive(deadline):
+                return None
+        alive = [w for w in range(self.workers) if w not in self.dead]
+        if not alive:
+            raise RuntimeError("all {} pool workers died".format(self.workers))
+
+        slot = self.free.pop()
+        self.frames[slot] = imgRGB
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        # Fewest frames in flight, ties in turn
+        worker = min(alive, key=lambda w: (self.in_flight[w], (w - sequence) % self.workers))
+        self.in_flight[worker] += 1
+        self.sent[sequence] = (worker, slot, tag)
+        self.tasks[worker].put((sequence, slot, self.memory.name, self.slots, self.shape))
+        return sequence
+
+    def _receive(self, deadline):
+        """Wait for results or dead workers, take the results and free
+        their slots, fail the frames of the dead workers. Returns False on
+        timeout.
+        """
+        results = {self.results[w]: w for w in range(self.workers) if w not in self.dead}
+        if not results:
+            return False
+        sentinels = {self.processes[w].sentinel: w for w in results.values()}
+        timeout = None if deadline is None else max(0, deadline - time.monotonic())
+        ready = wait(list(results) + list(sentinels), timeout)
+        if not ready:
+            return False
+        died = {sentinels[r] for r in ready if r in sentinels}
+        for r in ready:
+            if r not in results:
+                continue
+            worker = results[r]
+            # And all a dead worker sent before it died
+            while True:
+                if self._take(r):
+                    died.add(worker)
+                    break
+                if worker not in died or not r.poll():
+                    break
+        for worker in died:
+            self._reap(worker)
+        return True
+
+    def _take(self, results):
+        """Take one result from a worker's pipe and free its slot. Returns
+        True at the end of the pipe.
+        """
+        try:
+            sequence, slot, result = results.recv()
+        except (EOFError, OSError):
+            return True
+        worker, slot, tag = self.sent.pop(sequence)
+        self.in_flight[worker] -= 1
+        # The drawn frame, only needed with a pose
+        image = self.frames[slot].copy() if result is not None else None
+        self.free.append(slot)
+        self.done[sequence] = (tag, result, image)
+        return False
+
+    def _reap(self, worker):
+        """Fail the frames in flight of a worker that died and free their
+        slots.
+        """
+        self.dead.add(worker)
+        process = self.processes[worker]
+        process.join()
+        error = RuntimeError("pool worker {} exited with code {}".format(worker, process.exitcode))
+        for sequence, (owner, slot, tag) in list(self.sent.items()):
+            if owner == worker:
+                del self.sent[sequence]
+                self.free.append(slot)
+                self.done[sequence] = (tag, error, None)
+        self.in_flight[worker] = 0
+
+    def get(self, timeout=None):
+        """The result of the oldest frame not returned yet, once it is
+        there: (tag, response), response as recognize_action() returns
+        it. Returns None without frames pending or on timeout. Raises the
+        error of a worker, or a RuntimeError for a frame of a worker that
+        died.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.next_result not in self.done:
+            if not self.pending() or not self._receive(deadline):
+                return None
+        tag, result, image = self.done.pop(self.next_result)
+        self.next_result += 1
+        if isinstance(result, Exception):
+            raise result
+        return tag, None if result is None else (result, image)
+
+    def map(self, frames):
+        """(tag, response) for every frame, in order, with as many frames
+        in flight as there are slots. Tags are the frame indices.
+        """
+        for i, imgRGB in enumerate(frames):
+            if not self.free and self.pending():
+                yield self.get()
+            self.submit(imgRGB, i)
+        while self.pending():
+            yield self.get()
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
+        for results in self.results:
+            results.close()
+        self.processes = []
+        self.tasks = []
+        self.results = []
+        self.dead = set()
+        if self.memory is not None:
+            self.frames = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
@@ -1,116 +1,61 @@
-import cv2
-import numpy as np
-import os
-import mediapipe as mp
-import pickle
-import time
+try:
+    from .capture import LatestFrameCapture
+    from .engine import GestureEngine
+except ImportError:
+    from capture import LatestFrameCapture
+    from engine import GestureEngine
 
-stream = cv2.VideoCapture(0)
-# stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+# Nothing is loaded until the first recognize_action() call (or
+# engine.start()), and the camera belongs to whoever reads the frames
+engine = GestureEngine()
+recognize_action = engine.recognize_action
+recognize_actions = engine.recognize_actions
 
-if not stream.isOpened():
-    print("Cannot open camera")
-    exit()
 
-staticImageMode=False
-modelComplexity=1
-smoothLandmarks=True
-enableSegmentation=False
-smoothSegmentation=True
-minDetectionConfidence=0.5
-minTrackingConfidence=0.5
-mpPose = mp.solutions.pose
-pose = mpPose.Pose(staticImageMode, modelComplexity, smoothLandmarks, enableSegmentation, smoothSegmentation, minDetectionConfidence, minTrackingConfidence)
-mpDraw = mp.solutions.drawing_utils
+def __getattr__(name):
+    # classes loads the model, but only when asked for
+    if name == 'classes':
+        return engine.classes
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-# Load the model
-model_path = os.path.join(os.path.dirname(__file__), 'model.pkcls')
-model = pickle.load(open(model_path, 'rb'))
-classes = [cv.values for cv in model.domain.class_vars][0]
-print(classes)
-
-
-def recognize_action(imgRGB):
-    results = pose.process(imgRGB)
-    features = []
-    if results.pose_landmarks:
-
-        for landmark in results.pose_landmarks.landmark:
-            features.append(landmark.x)
-            features.append(landmark.y)
-        
-        if results.pose_landmarks:
-            mpDraw.draw_landmarks(imgRGB, results.pose_landmarks, mpPose.POSE_CONNECTIONS)
-
-        # Make a prediction
-        # features = np.array(features)
-
-        sel_features = [
-            features[22],
-            features[23],
-            features[24],
-            features[25],
-            features[26],
-            features[27],
-            features[28],
-            features[29],
-            features[30],
-            features[31],
-            features[32],
-            features[33],
-
-            features[46],
-            features[47],
-            features[48],
-            features[49],
-        ]
-
-        out_data = np.array(sel_features).reshape(1, -1)
-        
-        out_data[:,2] = out_data[:,2] - out_data[:,0]
-        out_data[:,4] = out_data[:,4] - out_data[:,0]
-        out_data[:,6] = out_data[:,6] - out_data[:,0]
-        out_data[:,8] = out_data[:,8] - out_data[:,0]
-        out_data[:,10] = out_data[:,10] - out_data[:,0]
-        out_data[:,12] = out_data[:,12] - out_data[:,0]
-        out_data[:,14] = out_data[:,14] - out_data[:,0]
-
-        out_data[:,1] = out_data[:,1] - out_data[:,0]
-        out_data[:,3] = out_data[:,3] - out_data[:,0]
-        out_data[:,5] = out_data[:,5] - out_data[:,0]
-        out_data[:,7] = out_data[:,7] - out_data[:,0]
-        out_data[:,9] = out_data[:,9] - out_data[:,0]
-        out_data[:,11] = out_data[:,11] - out_data[:,0]
-        out_data[:,13] = out_data[:,13] - out_data[:,0]
-        out_data[:,15] = out_data[:,15] - out_data[:,0]
+if __name__ == "__main__":
+    import cv2
 
-        out_data[:,0] = out_data[:,0] - out_data[:,0]
-        out_data[:,1] = out_data[:,1] - out_data[:,1]
+    engine.start()
+    stream = cv2.VideoCapture(0)
+    # stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    capture = LatestFrameCapture(stream).start()
 
-        prediction = model.predict(out_data[:,2:])
-        return prediction, imgRGB
+    if not capture.isOpened():
+        print("Cannot open camera")
+        exit()
 
+    classes = engine.classes
+    print(classes)
 
-if __name__ == "__main__":
     while True:
-        (ret, frame) = stream.read()
+        captured = capture.read()
 
-        if not ret:
+        if captured is None:
             print("Can't receive frame (stream end?). Exiting ...")
             break
 
-        imgRGB = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        prediction, imgRGB = recognize_action(imgRGB)
-        if prediction:
+        imgRGB = cv2.cvtColor(captured.image, cv2.COLOR_BGR2RGB)
+        r = recognize_action(imgRGB)
+        if r:
+            prediction, imgRGB = r
             # (array([2.]), array([[0.30498589, 0.19397866, 0.50103545]]))
             # print(prediction)
             # print the most likely class
             # print(f"Predicted class probabilities: {prediction}")
             print(f"Predicted class: {classes[int(prediction[0][0])]}")
             # print(prediction)
-            time.sleep(0.1)
+        capture.decided(captured)
 
         cv2.imshow('Camera', imgRGB)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
+
+    capture.release()
+    print("Camera to decision:", capture.get_latency_stats())
@@ -1,9 +1,6 @@
 import sys
 import cv2
 import numpy as np
-import os
-import mediapipe as mp
-import pickle
 
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QWidget, QVBoxLayout, QHBoxLayout, QFrame, QSizePolicy
@@ -11,57 +8,18 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtGui import QImage, QPixmap, QFont, QColor, QPalette
 
-# --- Ваша логика инициализации модели и функций ---
-staticImageMode=False
-modelComplexity=1
-smoothLandmarks=True
-enableSegmentation=False
-smoothSegmentation=True
-minDetectionConfidence=0.5
-minTrackingConfidence=0.5
-mpPose = mp.solutions.pose
-pose = mpPose.Pose(staticImageMode, modelComplexity, smoothLandmarks, enableSegmentation, smoothSegmentation, minDetectionConfidence, minTrackingConfidence)
-mpDraw = mp.solutions.drawing_utils
+from capture import LatestFrameCapture
+from engine import GestureEngine
 
-model_path = os.path.join(os.path.dirname(__file__), 'model.pkcls')
-model = pickle.load(open(model_path, 'rb'))
-classes = [cv.values for cv in model.domain.class_vars][0]
+# --- Ваша логика инициализации модели и функций ---
+# Built in the background while the window and the camera open
+engine = GestureEngine().start()
+classes = engine.classes
 
 def recognize_action(imgRGB):
-    results = pose.process(imgRGB)
-    features = []
-    if results.pose_landmarks:
-        for landmark in results.pose_landmarks.landmark:
-            features.append(landmark.x)
-            features.append(landmark.y)
-        if results.pose_landmarks:
-            mpDraw.draw_landmarks(imgRGB, results.pose_landmarks, mpPose.POSE_CONNECTIONS)
-        sel_features = [
-            features[22], features[23], features[24], features[25],
-            features[26], features[27], features[28], features[29],
-            features[30], features[31], features[32], features[33],
-            features[46], features[47], features[48], features[49],
-        ]
-        out_data = np.array(sel_features).reshape(1, -1)
-        out_data[:,2] = out_data[:,2] - out_data[:,0]
-        out_data[:,4] = out_data[:,4] - out_data[:,0]
-        out_data[:,6] = out_data[:,6] - out_data[:,0]
-        out_data[:,8] = out_data[:,8] - out_data[:,0]
-        out_data[:,10] = out_data[:,10] - out_data[:,0]
-        out_data[:,12] = out_data[:,12] - out_data[:,0]
-        out_data[:,14] = out_data[:,14] - out_data[:,0]
-        out_data[:,1] = out_data[:,1] - out_data[:,0]
-        out_data[:,3] = out_data[:,3] - out_data[:,0]
-        out_data[:,5] = out_data[:,5] - out_data[:,0]
-        out_data[:,7] = out_data[:,7] - out_data[:,0]
-        out_data[:,9] = out_data[:,9] - out_data[:,0]
-        out_data[:,11] = out_data[:,11] - out_data[:,0]
-        out_data[:,13] = out_data[:,13] - out_data[:,0]
-        out_data[:,15] = out_data[:,15] - out_data[:,0]
-        out_data[:,0] = out_data[:,0] - out_data[:,0]
-        out_data[:,1] = out_data[:,1] - out_data[:,1]
-        prediction = model.predict(out_data[:,2:])
-        return prediction, imgRGB
+    response = engine.recognize_action(imgRGB)
+    if response:
+        return response
     return None, imgRGB
 
 class MainWindow(QWidget):
@@ -104,16 +62,17 @@ class MainWindow(QWidget):
         main_layout.addWidget(self.text_label, stretch=1)
         self.setLayout(main_layout)
 
-        self.cap = cv2.VideoCapture(0)
+        self.capture = LatestFrameCapture(0).start()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)
+        # Polls for a new frame without blocking the GUI thread
+        self.timer.start(5)
 
     def update_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
+        captured = self.capture.read(timeout=0)
+        if captured is None:
             return
-        imgRGB = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        imgRGB = cv2.cvtColor(captured.image, cv2.COLOR_BGR2RGB)
         prediction, imgRGB_draw = recognize_action(imgRGB.copy())
         h, w, ch = imgRGB_draw.shape
         bytes_per_line = ch * w
@@ -127,9 +86,11 @@ class MainWindow(QWidget):
             self.text_label.setText(f"Predicted class: {classes[int(prediction[0][0])]}")
         else:
             self.text_label.setText("Predicted class: ...")
+        self.capture.decided(captured)
 
     def closeEvent(self, event):
-        self.cap.release()
+        self.capture.release()
+        print("Camera to decision:", self.capture.get_latency_stats())
         event.accept()
 
 if __name__ == "__main__":
@@ -1,16 +1,22 @@
 import cv2
-import time
 import numpy as np
 import collections
 
 import requests
 
-from mp.run import recognize_action, classes
+from mp.capture import LatestFrameCapture
+from mp.engine import GestureEngine
+
+# Loads MediaPipe and the model while the camera opens
+engine = GestureEngine().start()
+classes = engine.classes
 
 stream = cv2.VideoCapture(0)
 stream.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
 stream.set(3, 640)
 stream.set(4, 480)
+# Always the newest frame, not the ones OpenCV buffered during inference
+capture = LatestFrameCapture(stream).start()
 
 def send_command(command):
     r = requests.get(f"http://127.0.0.1:5000/{command}")
@@ -23,11 +29,12 @@ predictions_buffer = []
 frames_to_accumulate = 10
 
 while True:
-    (grabbed, frame) = stream.read()
+    captured = capture.read()
+    if captured is None:
+        break
 
-    frame = frame.copy()
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    r = recognize_action(frame_rgb)
+    frame_rgb = cv2.cvtColor(captured.image, cv2.COLOR_BGR2RGB)
+    r = engine.recognize_action(frame_rgb)
     if r:
         prediction, frame_rgb = r
 
@@ -38,6 +45,7 @@ while True:
             most_common = collections.Counter(predictions_buffer).most_common(1)[0][0]
             send_command(most_common)
             predictions_buffer = []
+    capture.decided(captured)
 
     frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
     cv2.imshow('Object detector', frame)
@@ -45,7 +53,7 @@ while True:
     if cv2.waitKey(1) == ord('q'):
         break
 
-    time.sleep(0.05)
-
+capture.release()
+print("Camera to decision:", capture.get_latency_stats())
 cv2.waitKey(0)
 cv2.destroyAllWindows()
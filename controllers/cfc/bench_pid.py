@@ -0,0 +1,151 @@
+"""
+file: bench_pid.py
+
+Microbenchmarks of the Crazyflie PID controllers in pid_controller.py.
+
+scalar: per-call cost of the reference controller and of the fast scalar
+        controller, replaying an input trace through both and checking that
+        they return identical motor commands at every step.
+batch:  N reference controllers stepped one after the other against one
+        batched controller stepping all N drones at once, with the same
+        bit-for-bit check.
+
+A trace is a .npy array of shape (steps, 11) holding the pid() arguments of
+every step in call order (dt first). Without --trace a synthetic one is
+generated; --save-trace writes it out so a run can be repeated exactly.
+
+    python bench_pid.py [scalar|batch|all] [--steps 2000] [--sizes 1 10 100 1000]
+                        [--trace FILE] [--save-trace FILE]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from pid_controller import (pid_velocity_fixed_height_controller, pid_velocity_fixed_height_controller_fast,
+                            pid_velocity_fixed_height_controller_batch)
+
+DT = 0.008  # basicTimeStep of the world, in seconds
+REPEATS = 5
+
+
+def make_trace(steps, seed=0):
+    """Synthetic flight: setpoints that change every second, slowly drifting
+    measurements and a slightly jittery dt. Some setpoint steps are large
+    enough to hit the clipping limits of the controller.
+    """
+    rng = np.random.default_rng(seed)
+    trace = np.empty((steps, 11))
+    trace[:, 0] = DT + rng.normal(0, 1e-4, steps)
+    hold = int(1 / DT)
+    for column, (low, high) in zip(range(1, 5), ((-2, 2), (-2, 2), (-1.5, 1.5), (0.5, 1.5))):
+        setpoints = rng.uniform(low, high, steps // hold + 1)
+        trace[:, column] = np.repeat(setpoints, hold)[:steps]
+    for column, scale in zip(range(5, 11), (0.02, 0.02, 0.05, 0.01, 0.02, 0.02)):
+        trace[:, column] = np.cumsum(rng.normal(0, scale, steps))
+    trace[:, 8] += 1.0  # actual_altitude around the flying height
+    return trace
+
+
+def make_inputs(n, steps, seed=0):
+    """Random but plausible controller inputs, shape (steps, 10, n), in the
+    argument order of pid() after dt.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = np.empty((steps, 10, n))
+    inputs[:, 0] = rng.uniform(-1, 1, (steps, n))        # desired_vx
+    inputs[:, 1] = rng.uniform(-1, 1, (steps, n))        # desired_vy
+    inputs[:, 2] = rng.uniform(-1, 1, (steps, n))        # desired_yaw_rate
+    inputs[:, 3] = rng.uniform(0.5, 1.5, (steps, n))     # desired_altitude
+    inputs[:, 4] = rng.normal(0, 0.1, (steps, n))        # actual_roll
+    inputs[:, 5] = rng.normal(0, 0.1, (steps, n))        # actual_pitch
+    inputs[:, 6] = rng.normal(0, 0.5, (steps, n))        # actual_yaw_rate
+    inputs[:, 7] = rng.uniform(0, 2, (steps, n))         # actual_altitude
+    inputs[:, 8] = rng.normal(0, 0.5, (steps, n))        # actual_vx
+    inputs[:, 9] = rng.normal(0, 0.5, (steps, n))        # actual_vy
+    return inputs
+
+
+def replay(controller_class, rows):
+    """Feed every row of a trace to a fresh controller. Returns the motor
+    commands as an array of shape (steps, 4) and the best time per call.
+    """
+    best = float('inf')
+    for _ in range(REPEATS):
+        controller = controller_class()
+        pid = controller.pid
+        start = time.perf_counter()
+        out = [pid(*row) for row in rows]
+        best = min(best, time.perf_counter() - start)
+    return np.array(out, dtype=float), best / len(rows)
+
+
+def bench_scalar(trace):
+    # Plain Python floats, as the controller receives them from Webots
+    rows = trace.tolist()
+    reference_out, reference_time = replay(pid_velocity_fixed_height_controller, rows)
+    fast_out, fast_time = replay(pid_velocity_fixed_height_controller_fast, rows)
+
+    print(f"scalar, {len(rows)} steps")
+    print(f"  reference {reference_time * 1e6:8.2f} us/call")
+    print(f"  fast      {fast_time * 1e6:8.2f} us/call  ({reference_time / fast_time:.1f}x)")
+    print(f"  identical {np.array_equal(reference_out, fast_out)}")
+
+
+def run_scalar(inputs):
+    steps, _, n = inputs.shape
+    controllers = [pid_velocity_fixed_height_controller() for _ in range(n)]
+    rows = inputs.transpose(0, 2, 1).tolist()
+    out = np.empty((steps, n, 4))
+
+    start = time.perf_counter()
+    for step in range(steps):
+        step_rows = rows[step]
+        step_out = out[step]
+        for i in range(n):
+            step_out[i] = controllers[i].pid(DT, *step_rows[i])
+    elapsed = time.perf_counter() - start
+    return out, elapsed / steps
+
+
+def run_batch(inputs):
+    steps, _, n = inputs.shape
+    controller = pid_velocity_fixed_height_controller_batch(n)
+    out = np.empty((steps, n, 4))
+
+    start = time.perf_counter()
+    for step in range(steps):
+        out[step] = controller.pid(DT, *inputs[step])
+    elapsed = time.perf_counter() - start
+    return out, elapsed / steps
+
+
+def bench_batch(sizes, steps):
+    print(f"{'N':>6} {'scalar/step':>14} {'batch/step':>14} {'speedup':>9} {'identical':>10}")
+    for n in sizes:
+        inputs = make_inputs(n, steps)
+        scalar_out, scalar_time = run_scalar(inputs)
+        batch_out, batch_time = run_batch(inputs)
+        identical = np.array_equal(scalar_out, batch_out)
+        print(f"{n:>6} {scalar_time * 1e6:>11.1f} us {batch_time * 1e6:>11.1f} us "
+              f"{scalar_time / batch_time:>8.1f}x {str(identical):>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('suite', nargs='?', choices=('scalar', 'batch', 'all'), default='all')
+    parser.add_argument('--steps', type=int, default=2000, help='control steps of the synthetic trace')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000], help='swarm sizes to run')
+    parser.add_argument('--trace', help='replay a recorded trace instead of a synthetic one')
+    parser.add_argument('--save-trace', help='write the trace used by the scalar suite to this file')
+    args = parser.parse_args()
+
+    if args.suite in ('scalar', 'all'):
+        trace = np.load(args.trace) if args.trace else make_trace(args.steps)
+        if args.save_trace:
+            np.save(args.save_trace, trace)
+        bench_scalar(trace)
+    if args.suite in ('batch', 'all'):
+        # The batch suite times every drone of every step, keep it shorter
+        bench_batch(args.sizes, min(args.steps, 200))
@@ -0,0 +1,108 @@
+"""
+file: bench_server.py
+
+Command path latency and throughput of the simulator servers in server.py,
+measured over the loopback interface.
+
+udp:  round trip of a control command through TelloUdpServer (the reply is
+      sent after the command is in the control queue), then one second of
+      rc packets at a fixed rate and a burst sent as fast as possible,
+      counting what the server received.
+http: the same round trip through the Flask /send route with a keep-alive
+      requests.Session, for comparison.
+
+    python bench_server.py [--count 2000] [--rate 5000] [--burst 20000]
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+import server
+from tello_sdk import TelloInterpreter
+
+
+def percentiles(samples):
+    us = np.asarray(samples) * 1e6
+    return "median {:7.1f} us  p99 {:7.1f} us".format(np.median(us), np.percentile(us, 99))
+
+
+def bench_udp(count, rate, burst):
+    udp_server = server.TelloUdpServer(TelloInterpreter(), host='127.0.0.1', port=0)
+    threading.Thread(target=udp_server.run, daemon=True).start()
+    udp_server.ready.wait()
+    address = ('127.0.0.1', udp_server.port)
+
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.settimeout(1)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.sendto(b'speed 50', address)
+        client.recvfrom(64)
+        samples.append(time.perf_counter() - start)
+    print("udp   command round trip   " + percentiles(samples))
+
+    before = udp_server.packets
+    start = time.perf_counter()
+    for i in range(rate):
+        # Busy wait, sleep() is far too coarse at these rates
+        while time.perf_counter() - start < i / rate:
+            pass
+        client.sendto(b'rc 0 %d 0 0' % (i % 100), address)
+    time.sleep(0.2)
+    received = udp_server.packets - before
+    print("udp   rc at {:5d}/s         {} sent, {} received".format(rate, rate, received))
+
+    before = udp_server.packets
+    dropped_before = udp_server.dropped()
+    start = time.perf_counter()
+    for i in range(burst):
+        client.sendto(b'rc 0 %d 0 0' % (i % 100), address)
+    sent_time = time.perf_counter() - start
+    # Give the server a moment to drain its socket buffer
+    time.sleep(0.2)
+    received = udp_server.packets - before
+    dropped = udp_server.dropped()
+    print("udp   rc burst             {} sent in {:.3f} s, {} received, {} dropped by the kernel "
+          "({:.0f} packets/s sent)".format(burst, sent_time, received,
+                                           '?' if dropped is None else dropped - dropped_before,
+                                           burst / sent_time))
+
+    udp_server.stop()
+    client.close()
+
+
+def bench_http(count):
+    http_server = make_server('127.0.0.1', 0, server.app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/send'.format(http_server.server_port)
+
+    session = requests.Session()
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        session.get(url, params={'command': 'speed 50'}).text
+        samples.append(time.perf_counter() - start)
+    print("http  command round trip   " + percentiles(samples))
+
+    http_server.shutdown()
+    # Drop the commands the benchmark queued
+    with server.CONTROL_QUEUE.mutex:
+        server.CONTROL_QUEUE.queue.clear()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=2000, help='round trips per transport')
+    parser.add_argument('--rate', type=int, default=5000, help='rc packets per second for one second')
+    parser.add_argument('--burst', type=int, default=20000, help='rc packets in the burst')
+    args = parser.parse_args()
+
+    bench_udp(args.count, args.rate, args.burst)
+    bench_http(args.count)
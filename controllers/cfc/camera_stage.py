@@ -0,0 +1,87 @@
+"""
+file: camera_stage.py
+
+Opt-in camera acquisition stage for the Crazyflie control loop.
+
+The camera is only enabled while at least one consumer is subscribed, at its
+own sampling period instead of the control rate, and images are fetched from
+Webots only when a new one is due. Each image is handed to the subscribers
+as a read-only NumPy view of shape (height, width, 4) over the BGRA buffer
+returned by Camera.getImage(), without copying it.
+"""
+
+import numpy as np
+
+
+class CameraStage():
+    def __init__(self, camera, period):
+        """
+        Arguments:
+            camera: Webots Camera device
+            period: sampling period in ms, a multiple of basicTimeStep
+        """
+        self.camera = camera
+        self.period = int(period)
+        self.width = camera.getWidth()
+        self.height = camera.getHeight()
+        self.subscribers = ()
+        self.image = None
+        self.image_time = None
+        self.next_time = None
+
+    def subscribe(self, callback):
+        """Call callback(image, time) with every new image. The first
+        subscriber turns the camera on.
+        """
+        # Replace the tuple instead of mutating it, so that step() never
+        # iterates over a changing sequence when called from another thread
+        self.subscribers = self.subscribers + (callback,)
+        if len(self.subscribers) == 1:
+            self.camera.enable(self.period)
+            self.next_time = None
+
+    def unsubscribe(self, callback):
+        """Stop delivering images to callback. The camera is turned off when
+        the last subscriber leaves.
+        """
+        subscribers = list(self.subscribers)
+        subscribers.remove(callback)
+        self.subscribers = tuple(subscribers)
+        if not subscribers:
+            self.camera.disable()
+            self.image = None
+            self.image_time = None
+
+    def set_period(self, period):
+        """Change the sampling period (ms), also while the camera is running."""
+        self.period = int(period)
+        if self.subscribers:
+            self.camera.enable(self.period)
+
+    def step(self, now):
+        """Run the stage for the control step at simulated time now (s).
+        Does nothing unless someone is subscribed and a new image is due.
+        """
+        subscribers = self.subscribers
+        if not subscribers:
+            return
+        if self.next_time is None:
+            # Webots delivers the first image one sampling period after the
+            # camera has been enabled
+            self.next_time = now + self.period / 1000
+            return
+        # Half a millisecond of slack absorbs the rounding of the float time
+        if now + 0.0005 < self.next_time:
+            return
+        self.next_time += self.period / 1000
+        if self.next_time <= now:
+            # The loop fell behind, do not try to catch up image by image
+            self.next_time = now + self.period / 1000
+
+        data = self.camera.getImage()
+        if data is None:
+            return
+        self.image = np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 4)
+        self.image_time = now
+        for callback in subscribers:
+            callback(self.image, now)
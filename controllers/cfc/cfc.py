@@ -1,148 +1,46 @@
+import argparse
+
 from controller import Robot
 from controller import Keyboard
 
-from math import cos, sin
-
-from pid_controller import pid_velocity_fixed_height_controller
+from crazyflie import CrazyflieController
+from recorder import FlightRecorder, DEFAULT_CAPACITY
+from swarm import drone_address, drone_index
+from video_stream import stream_name
 
 import threading
-from server import start_server, CONTROL_QUEUE
-
-FLYING_ATTITUDE = 1
+from server import start_server, INTERPRETER, UDP_SERVER
 
 if __name__ == '__main__':
 
-    threading.Thread(target=start_server).start()
+    # Options from controllerArgs. Unknown arguments are ignored, e.g. those
+    # of sil/run_sil.py when it runs this file.
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ports', action='store_true', help='port instead of host addressing, see swarm.py')
+    parser.add_argument('--record', metavar='FILE', help='record every control step to FILE (.npy)')
+    parser.add_argument('--record-steps', type=int, default=DEFAULT_CAPACITY, help='steps to make room for')
+    args, _ = parser.parse_known_args()
 
     robot = Robot()
     timestep = int(robot.getBasicTimeStep())
 
-    # Initialize motors
-    m1_motor = robot.getDevice("m1_motor")
-    m1_motor.setPosition(float('inf'))
-    m1_motor.setVelocity(-1)
-    m2_motor = robot.getDevice("m2_motor")
-    m2_motor.setPosition(float('inf'))
-    m2_motor.setVelocity(1)
-    m3_motor = robot.getDevice("m3_motor")
-    m3_motor.setPosition(float('inf'))
-    m3_motor.setVelocity(-1)
-    m4_motor = robot.getDevice("m4_motor")
-    m4_motor.setPosition(float('inf'))
-    m4_motor.setVelocity(1)
-
-    # Initialize Sensors
-    imu = robot.getDevice("inertial_unit")
-    imu.enable(timestep)
-    gps = robot.getDevice("gps")
-    gps.enable(timestep)
-    gyro = robot.getDevice("gyro")
-    gyro.enable(timestep)
-    camera = robot.getDevice("camera")
-    camera.enable(timestep)
-    range_front = robot.getDevice("range_front")
-    range_front.enable(timestep)
-    range_left = robot.getDevice("range_left")
-    range_left.enable(timestep)
-    range_back = robot.getDevice("range_back")
-    range_back.enable(timestep)
-    range_right = robot.getDevice("range_right")
-    range_right.enable(timestep)
+    # The drones of a swarm world are told apart by their Webots names,
+    # "Crazyflie(i)" is served at the address of drone i
+    address = drone_address(drone_index(robot.getName()), 'port' if args.ports else 'host')
+    threading.Thread(target=start_server, args=address, daemon=True).start()
 
     # Get keyboard
     keyboard = Keyboard()
     keyboard.enable(timestep)
 
-    # Initialize variables
-
-    past_x_global = 0
-    past_y_global = 0
-    past_time = 0
-    first_time = True
-
-    # Crazyflie velocity PID controller
-    PID_crazyflie = pid_velocity_fixed_height_controller()
-    PID_update_last_time = robot.getTime()
-    sensor_read_last_time = robot.getTime()
-
-    height_desired = FLYING_ATTITUDE
-
-    autonomous_mode = False
-
-    # Initialize values
-    desired_state = [0, 0, 0, 0]
-    forward_desired = 0
-    sideways_desired = 0
-    yaw_desired = 0
-    height_diff_desired = 0
+    recorder = FlightRecorder(args.record, args.record_steps) if args.record else None
+    crazyflie = CrazyflieController(robot, INTERPRETER, UDP_SERVER.send_state, recorder=recorder,
+                                    video_name=stream_name(address.host, address.command_port))
 
     # Main loop:
     while robot.step(timestep) != -1:
+        crazyflie.step()
 
-        dt = robot.getTime() - past_time
-        actual_state = {}
-
-        if first_time:
-            past_x_global = gps.getValues()[0]
-            past_y_global = gps.getValues()[1]
-            past_time = robot.getTime()
-            first_time = False
-
-        # Get sensor data
-        roll = imu.getRollPitchYaw()[0]
-        pitch = imu.getRollPitchYaw()[1]
-        yaw = imu.getRollPitchYaw()[2]
-        yaw_rate = gyro.getValues()[2]
-        x_global = gps.getValues()[0]
-        v_x_global = (x_global - past_x_global)/dt
-        y_global = gps.getValues()[1]
-        v_y_global = (y_global - past_y_global)/dt
-        altitude = gps.getValues()[2]
-
-        # Get body fixed velocities
-        cos_yaw = cos(yaw)
-        sin_yaw = sin(yaw)
-        v_x = v_x_global * cos_yaw + v_y_global * sin_yaw
-        v_y = - v_x_global * sin_yaw + v_y_global * cos_yaw
-
-        while not CONTROL_QUEUE.empty():
-            command = CONTROL_QUEUE.get()
-            print(command)
-            if command == "UP":
-                height_diff_desired = 0.1
-            elif command == "DOWN":
-                height_diff_desired = -0.1
-            elif command == "FORWARD":
-                forward_desired += 0.5
-            elif command == "BACKWARD":
-                forward_desired -= 0.5
-            elif command == "LEFT":
-                sideways_desired -= 0.5
-            elif command == "RIGHT":
-                sideways_desired += 0.5
-
-        height_desired += height_diff_desired * dt
-
-        camera_data = camera.getImage()
-
-        # get range in meters
-        range_front_value = range_front.getValue() / 1000
-        range_right_value = range_right.getValue() / 1000
-        range_left_value = range_left.getValue() / 1000
-
-        range_side_value = range_right_value
-
-        # PID velocity controller with fixed height
-        motor_power = PID_crazyflie.pid(dt, forward_desired, sideways_desired,
-                                        yaw_desired, height_desired,
-                                        roll, pitch, yaw_rate,
-                                        altitude, v_x, v_y)
-
-        m1_motor.setVelocity(-motor_power[0])
-        m2_motor.setVelocity(motor_power[1])
-        m3_motor.setVelocity(-motor_power[2])
-        m4_motor.setVelocity(motor_power[3])
-
-        past_time = robot.getTime()
-        past_x_global = x_global
-        past_y_global = y_global
+    crazyflie.close()
+    if recorder is not None:
+        recorder.close()
@@ -0,0 +1,150 @@
+"""
+file: crazyflie.py
+
+The control loop of one simulated Crazyflie, as a class.
+
+CrazyflieController sets up the devices of a Robot and step() runs one
+iteration of the loop: read the sensors, apply the commands received by the
+drone's TelloInterpreter, update the setpoints, publish the telemetry and
+drive the motors through the velocity PID controller. cfc.py runs one of
+them per Webots controller process; the software-in-the-loop swarm host
+runs many in a single process.
+
+After streamon the camera images are published to shared memory, see
+video_stream.py.
+"""
+
+from pid_controller import pid_velocity_fixed_height_controller_fast
+from camera_stage import CameraStage
+from sensors import SensorReader
+from maneuvers import FlightPlan
+from telemetry import TelemetryPublisher
+from video_stream import VideoPublisher
+
+FLYING_ATTITUDE = 1
+CAMERA_PERIOD = 32  # in ms, only used while camera images are consumed
+TELEMETRY_RATE = 10  # state packets per second, up to 100
+
+
+class CrazyflieController():
+    def __init__(self, robot, interpreter, send_state, telemetry_rate=TELEMETRY_RATE, recorder=None,
+                 video_name=None):
+        """
+        Arguments:
+            robot: Webots Robot of the drone
+            interpreter: tello_sdk.TelloInterpreter receiving the commands
+                of this drone
+            send_state: callable sending a state packet to the clients,
+                e.g. TelloUdpServer.send_state
+            telemetry_rate: state packets per second
+            recorder: optional recorder.FlightRecorder, gets every step
+            video_name: shared memory block to publish the camera images
+                to after streamon, see video_stream.stream_name(). None
+                ignores streamon.
+        """
+        self.robot = robot
+        self.recorder = recorder
+        self.interpreter = interpreter
+        self.queue = interpreter.queue
+        timestep = int(robot.getBasicTimeStep())
+
+        # Initialize motors
+        self.motors = []
+        for name, direction in (("m1_motor", -1), ("m2_motor", 1), ("m3_motor", -1), ("m4_motor", 1)):
+            motor = robot.getDevice(name)
+            motor.setPosition(float('inf'))
+            motor.setVelocity(direction)
+            self.motors.append(motor)
+
+        # Initialize Sensors
+        imu = robot.getDevice("inertial_unit")
+        imu.enable(timestep)
+        gps = robot.getDevice("gps")
+        gps.enable(timestep)
+        gyro = robot.getDevice("gyro")
+        gyro.enable(timestep)
+        # The camera is enabled by the camera stage once someone subscribes
+        self.camera_stage = CameraStage(robot.getDevice("camera"), CAMERA_PERIOD)
+        self.video_name = video_name
+        self.video = None
+        self.streaming = False
+        ranges = []
+        for name in ("range_front", "range_left", "range_back", "range_right"):
+            sensor = robot.getDevice(name)
+            sensor.enable(timestep)
+            ranges.append(sensor)
+
+        # Read every sensor once per step
+        self.sensors = SensorReader(robot, imu, gps, gyro, ranges)
+
+        # Crazyflie velocity PID controller
+        self.pid = pid_velocity_fixed_height_controller_fast()
+
+        # Setpoints from the Tello SDK commands, the rc stream and the legacy
+        # UP/DOWN/... commands
+        self.plan = FlightPlan(FLYING_ATTITUDE)
+
+        # State packets to the Tello clients
+        self.telemetry = TelemetryPublisher(interpreter.status, send_state, telemetry_rate)
+
+    def step(self):
+        """Run one iteration of the control loop, after robot.step()."""
+        state = self.sensors.read()
+        dt = state.dt
+        plan = self.plan
+
+        control_queue = self.queue
+        while not control_queue.empty():
+            command = control_queue.get()
+            if isinstance(command, str):
+                plan.submit_legacy(command)
+            else:
+                plan.submit(command)
+        plan.update_rc(self.interpreter.rc)
+        plan.step(state, dt)
+        self.interpreter.status.update(state, plan.flying, plan.flight_time, plan.speed)
+        self.telemetry.step(state.time)
+
+        if self.interpreter.stream_on != self.streaming and self.video_name is not None:
+            self.set_streaming(self.interpreter.stream_on)
+        self.camera_stage.step(state.time)
+
+        # PID velocity controller with fixed height
+        if plan.motors_on:
+            motor_power = self.pid.pid(dt, plan.forward_desired, plan.sideways_desired,
+                                       plan.yaw_desired, plan.height_desired,
+                                       state.roll, state.pitch, state.yaw_rate,
+                                       state.altitude, state.v_x, state.v_y)
+        else:
+            motor_power = (0, 0, 0, 0)
+
+        m1_motor, m2_motor, m3_motor, m4_motor = self.motors
+        m1_motor.setVelocity(-motor_power[0])
+        m2_motor.setVelocity(motor_power[1])
+        m3_motor.setVelocity(-motor_power[2])
+        m4_motor.setVelocity(motor_power[3])
+
+        if self.recorder is not None:
+            self.recorder.record(state, plan, self.pid, motor_power)
+        return state
+
+    def set_streaming(self, on):
+        """Start or stop publishing the camera images. The shared memory
+        block is created by the first streamon and kept until close().
+        """
+        if on:
+            if self.video is None:
+                stage = self.camera_stage
+                self.video = VideoPublisher(self.video_name, stage.width, stage.height)
+            self.camera_stage.subscribe(self.video.publish)
+        else:
+            self.camera_stage.unsubscribe(self.video.publish)
+        self.streaming = on
+
+    def close(self):
+        """Release the video shared memory, after the last step."""
+        if self.streaming:
+            self.set_streaming(False)
+        if self.video is not None:
+            self.video.close()
+            self.video = None
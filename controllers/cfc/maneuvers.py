@@ -0,0 +1,385 @@
+"""
+file: maneuvers.py
+
+Executes Tello SDK commands in the Crazyflie control loop.
+
+FlightPlan turns the Commands of tello_sdk.TelloInterpreter, the rc setpoint
+and the legacy UP/DOWN/... commands into the setpoints of the velocity PID
+controller: forward_desired, sideways_desired, yaw_desired (a yaw rate) and
+height_desired. Maneuvers (move, go, curve, rotate, takeoff, land) run one
+after the other in the order they were received. Between maneuvers the drone
+either holds its position, follows the latest rc setpoint, or keeps the
+velocities set by the legacy commands.
+"""
+
+from collections import deque
+from math import atan2, cos, pi, sin, sqrt
+
+from tello_sdk import DEFAULT_SPEED
+
+POSITION_GAIN = 1.0  # 1/s, position error to velocity correction
+YAW_GAIN = 2.0  # 1/s, yaw error to yaw rate
+MAX_YAW_RATE = 1.5  # rad/s
+CLIMB_SPEED = 0.5  # m/s, for takeoff
+LAND_SPEED = 0.4  # m/s
+POSITION_TOLERANCE = 0.1  # m
+YAW_TOLERANCE = 0.03  # rad
+TOUCHDOWN_ALTITUDE = 0.05  # m
+TIMEOUT_MARGIN = 5.0  # s, added to the nominal duration of a maneuver
+
+# rc channels at 100 map to these
+RC_MAX_SPEED = 1.0  # m/s
+RC_MAX_CLIMB = 0.5  # m/s
+RC_MAX_YAW_RATE = 1.5  # rad/s
+
+
+def _wrap(angle):
+    return (angle + pi) % (2 * pi) - pi
+
+
+class Maneuver():
+    """A maneuver sets the setpoints of the plan at every step until update()
+    returns True. A maneuver that runs past its duration plus TIMEOUT_MARGIN
+    is considered done, so a drone that cannot reach its target does not
+    block the commands queued behind it.
+    """
+    duration = 0.0
+
+    def start(self, plan, state):
+        pass
+
+    def update(self, plan, state, dt):
+        raise NotImplementedError
+
+
+class Path(Maneuver):
+    """Follow a path at a given speed. A carrot point moves along the path
+    and the drone tracks it with a velocity feedforward plus a correction
+    proportional to the position error.
+    """
+
+    def __init__(self, speed):
+        self.speed = speed
+        self.length = 0.0
+        self.progress = 0.0
+        self.end = None
+
+    def point(self, s):
+        """Position and unit tangent (both world frame) at arc length s."""
+        raise NotImplementedError
+
+    def update(self, plan, state, dt):
+        self.progress = min(self.length, self.progress + self.speed * dt)
+        (x, y, z), (tx, ty, _) = self.point(self.progress)
+        feedforward = self.speed if self.progress < self.length else 0.0
+        plan.set_world_velocity(state,
+                                tx * feedforward + POSITION_GAIN * (x - state.x),
+                                ty * feedforward + POSITION_GAIN * (y - state.y))
+        plan.height_desired = z
+
+        if self.progress < self.length:
+            return False
+        ex, ey, ez = self.end
+        error = sqrt((ex - state.x) ** 2 + (ey - state.y) ** 2 + (ez - state.altitude) ** 2)
+        return error < POSITION_TOLERANCE
+
+
+class Move(Path):
+    """Straight flight by an offset given in the body frame."""
+
+    def __init__(self, forward, left, up, speed):
+        super().__init__(speed)
+        self.offset = (forward, left, up)
+
+    def start(self, plan, state):
+        forward, left, up = self.offset
+        cos_yaw, sin_yaw = cos(state.yaw), sin(state.yaw)
+        # Start from the height setpoint rather than the measured altitude so
+        # that consecutive moves do not accumulate the altitude error
+        self.origin = (state.x, state.y, plan.height_desired)
+        self.delta = (forward * cos_yaw - left * sin_yaw, forward * sin_yaw + left * cos_yaw, up)
+        self.length = sqrt(sum(d * d for d in self.delta))
+        self.end = tuple(o + d for o, d in zip(self.origin, self.delta))
+        self.duration = self.length / self.speed
+
+    def point(self, s):
+        fraction = s / self.length if self.length else 1.0
+        tangent = tuple(d / self.length for d in self.delta) if self.length else (0.0, 0.0, 0.0)
+        return tuple(o + d * fraction for o, d in zip(self.origin, self.delta)), tangent
+
+
+class Curve(Path):
+    """Circular arc from the current position through p1 to p2, both given
+    in the body frame relative to the current position.
+    """
+
+    def __init__(self, p1, p2, speed):
+        super().__init__(speed)
+        self.p1, self.p2 = p1, p2
+
+    def start(self, plan, state):
+        cos_yaw, sin_yaw = cos(state.yaw), sin(state.yaw)
+
+        def to_world(p):
+            return (p[0] * cos_yaw - p[1] * sin_yaw, p[0] * sin_yaw + p[1] * cos_yaw, p[2])
+
+        a, b = to_world(self.p1), to_world(self.p2)
+        self.origin = (state.x, state.y, plan.height_desired)
+
+        # Centre of the circle through the origin, a and b:
+        # ((|a|^2 b - |b|^2 a) x (a x b)) / (2 |a x b|^2)
+        n = _cross(a, b)
+        n2 = _dot(n, n)
+        aa, bb = _dot(a, a), _dot(b, b)
+        centre = tuple(c / (2 * n2) for c in _cross(tuple(aa * bi - bb * ai for ai, bi in zip(a, b)), n))
+        self.radius = sqrt(_dot(centre, centre))
+
+        # Orthonormal basis of the arc plane, u pointing from the centre to
+        # the start. Going origin -> a -> b is counter-clockwise around n.
+        self.centre = centre
+        self.u = tuple(-c / self.radius for c in centre)
+        n_norm = sqrt(n2)
+        w = tuple(c / n_norm for c in n)
+        self.v = _cross(w, self.u)
+
+        rel = tuple(bi - ci for bi, ci in zip(b, centre))
+        angle = atan2(_dot(rel, self.v), _dot(rel, self.u)) % (2 * pi)
+        self.length = self.radius * angle
+        self.end = tuple(o + bi for o, bi in zip(self.origin, b))
+        self.duration = self.length / self.speed
+
+    def point(self, s):
+        angle = s / self.radius
+        c, si = cos(angle), sin(angle)
+        position = tuple(o + ce + self.radius * (c * u + si * v)
+                         for o, ce, u, v in zip(self.origin, self.centre, self.u, self.v))
+        tangent = tuple(-si * u + c * v for u, v in zip(self.u, self.v))
+        return position, tangent
+
+
+class Rotate(Maneuver):
+    def __init__(self, angle):
+        self.angle = angle / 180 * pi
+        self.duration = abs(self.angle) / MAX_YAW_RATE
+
+    def start(self, plan, state):
+        self.hold = (state.x, state.y)
+        self.turned = 0.0
+        self.last_yaw = state.yaw
+
+    def update(self, plan, state, dt):
+        # Track the total rotation so that turns of more than 180 degrees
+        # are not cut short by the wrap-around of the yaw angle
+        self.turned += _wrap(state.yaw - self.last_yaw)
+        self.last_yaw = state.yaw
+        error = self.angle - self.turned
+        plan.yaw_desired = max(-MAX_YAW_RATE, min(MAX_YAW_RATE, YAW_GAIN * error))
+        plan.set_world_velocity(state, POSITION_GAIN * (self.hold[0] - state.x),
+                                POSITION_GAIN * (self.hold[1] - state.y))
+        if abs(error) < YAW_TOLERANCE:
+            plan.yaw_desired = 0.0
+            return True
+        return False
+
+
+class Takeoff(Maneuver):
+    def start(self, plan, state):
+        plan.motors_on = True
+        plan.flying = True
+        self.hold = (state.x, state.y)
+        plan.height_desired = min(plan.height_desired, state.altitude)
+        self.duration = max(0.0, plan.flying_height - state.altitude) / CLIMB_SPEED
+
+    def update(self, plan, state, dt):
+        plan.height_desired = min(plan.flying_height, plan.height_desired + CLIMB_SPEED * dt)
+        plan.set_world_velocity(state, POSITION_GAIN * (self.hold[0] - state.x),
+                                POSITION_GAIN * (self.hold[1] - state.y))
+        return abs(plan.flying_height - state.altitude) < POSITION_TOLERANCE
+
+
+class Land(Maneuver):
+    def start(self, plan, state):
+        self.hold = (state.x, state.y)
+        self.duration = state.altitude / LAND_SPEED
+
+    def update(self, plan, state, dt):
+        # Aim below the floor so that the drone does settle on it
+        plan.height_desired = max(-0.2, plan.height_desired - LAND_SPEED * dt)
+        plan.set_world_velocity(state, POSITION_GAIN * (self.hold[0] - state.x),
+                                POSITION_GAIN * (self.hold[1] - state.y))
+        if state.altitude < TOUCHDOWN_ALTITUDE:
+            plan.motors_on = False
+            plan.flying = False
+            return True
+        return False
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+class FlightPlan():
+    def __init__(self, flying_height, flying=True):
+        """
+        Arguments:
+            flying_height: takeoff height in m
+            flying: whether the drone starts airborne (the cfc controller
+                takes off on its own at startup)
+        """
+        self.flying_height = flying_height
+        self.flying = flying
+        self.motors_on = flying
+        self.flight_time = 0.0
+        self.speed = DEFAULT_SPEED
+
+        self.maneuvers = deque()
+        self.current = None
+        self.elapsed = 0.0
+
+        # Idle behaviour: "hold" a position, follow the "rc" setpoint or keep
+        # the "legacy" velocities of the UP/DOWN/... commands
+        self.mode = 'legacy'
+        self.hold = None
+        self.rc_sequence = 0
+        self.rc_value = None
+        self.legacy_forward = 0
+        self.legacy_sideways = 0
+        self.height_diff_desired = 0
+
+        # Setpoints of the PID controller
+        self.forward_desired = 0
+        self.sideways_desired = 0
+        self.yaw_desired = 0
+        self.height_desired = flying_height if flying else 0.0
+
+    def submit(self, command):
+        """Handle one tello_sdk.Command from the interpreter."""
+        verb, args = command
+        if verb == 'emergency':
+            self.clear()
+            self.motors_on = False
+            self.flying = False
+        elif verb == 'stop':
+            self.clear()
+        elif verb == 'speed':
+            self.speed, = args
+        elif verb == 'motoron':
+            if not self.flying:
+                self.motors_on = True
+        elif verb == 'motoroff':
+            if not self.flying:
+                self.motors_on = False
+        elif verb == 'takeoff':
+            self.maneuvers.append(Takeoff())
+        elif verb == 'land':
+            # Never behind a backlog of moves
+            self.clear()
+            self.maneuvers.append(Land())
+        elif verb == 'move':
+            forward, left, up, speed = args
+            self.maneuvers.append(Move(forward, left, up, speed or self.speed))
+        elif verb == 'rotate':
+            self.maneuvers.append(Rotate(*args))
+        elif verb == 'curve':
+            p1, p2, speed = args
+            self.maneuvers.append(Curve(p1, p2, speed))
+
+    def submit_legacy(self, command):
+        """Handle a command of the legacy /up, /down, ... routes."""
+        if self.mode != 'legacy':
+            self.mode = 'legacy'
+            self.rc_value = None
+            self.legacy_forward = self.legacy_sideways = self.height_diff_desired = 0
+        if command == "UP":
+            self.height_diff_desired = 0.1
+        elif command == "DOWN":
+            self.height_diff_desired = -0.1
+        elif command == "FORWARD":
+            self.legacy_forward += 0.5
+        elif command == "BACKWARD":
+            self.legacy_forward -= 0.5
+        elif command == "LEFT":
+            self.legacy_sideways -= 0.5
+        elif command == "RIGHT":
+            self.legacy_sideways += 0.5
+
+    def update_rc(self, rc):
+        """Pick up the latest rc setpoint (a tello_sdk.RcSetpoint). Clients
+        resend an unchanged setpoint as a keep-alive, so only a new value
+        takes over, or any setpoint after a maneuver, a stop or a legacy
+        command: a resent rc 0 0 0 0 does not reset the position hold.
+        """
+        if rc.sequence != self.rc_sequence:
+            self.rc_sequence = rc.sequence
+            if rc.value != self.rc_value:
+                self.rc_value = rc.value
+                self.mode = 'rc'
+
+    def clear(self):
+        """Drop the current and the queued maneuvers and hover in place."""
+        self.maneuvers.clear()
+        self.current = None
+        self.mode = 'hold'
+        self.hold = None
+        self.yaw_desired = 0
+        self.rc_value = None
+
+    def set_world_velocity(self, state, v_x_global, v_y_global):
+        """Set the forward/sideways setpoints from a velocity in the world frame."""
+        cos_yaw, sin_yaw = cos(state.yaw), sin(state.yaw)
+        self.forward_desired = v_x_global * cos_yaw + v_y_global * sin_yaw
+        self.sideways_desired = - v_x_global * sin_yaw + v_y_global * cos_yaw
+
+    def busy(self):
+        return self.current is not None or bool(self.maneuvers)
+
+    def step(self, state, dt):
+        """Update the setpoints for the control step of the given SensorSnapshot."""
+        if self.motors_on:
+            self.flight_time += dt
+
+        while self.current is None and self.maneuvers:
+            maneuver = self.maneuvers.popleft()
+            if not self.flying and not isinstance(maneuver, Takeoff):
+                # Like the Tello, ignore motion commands while on the ground
+                continue
+            self.current = maneuver
+            # The next rc setpoint takes over again, whatever its value
+            self.rc_value = None
+            self.current.start(self, state)
+            self.elapsed = 0.0
+            self.yaw_desired = 0
+        if self.current is not None:
+            self.elapsed += dt
+            if self.current.update(self, state, dt) or \
+                    self.elapsed > self.current.duration + TIMEOUT_MARGIN:
+                self.current = None
+                self.mode = 'hold'
+                self.hold = None
+                self.yaw_desired = 0
+            return
+
+        if self.mode == 'rc':
+            left_right, forward_backward, up_down, yaw = self.rc_value
+            self.forward_desired = forward_backward / 100 * RC_MAX_SPEED
+            self.sideways_desired = -left_right / 100 * RC_MAX_SPEED
+            self.height_desired += up_down / 100 * RC_MAX_CLIMB * dt
+            # A positive rc yaw turns clockwise, a negative yaw rate
+            self.yaw_desired = -yaw / 100 * RC_MAX_YAW_RATE
+            if self.rc_value == (0, 0, 0, 0):
+                self.mode = 'hold'
+                self.hold = None
+        elif self.mode == 'legacy':
+            self.forward_desired = self.legacy_forward
+            self.sideways_desired = self.legacy_sideways
+            self.yaw_desired = 0
+            self.height_desired += self.height_diff_desired * dt
+        else:
+            if self.hold is None:
+                self.hold = (state.x, state.y)
+            self.set_world_velocity(state, POSITION_GAIN * (self.hold[0] - state.x),
+                                    POSITION_GAIN * (self.hold[1] - state.y))
@@ -22,8 +22,24 @@ in Webots
 import numpy as np
 
 
+DEFAULT_GAINS = {"kp_att_y": 1, "kd_att_y": 0.5, "kp_att_rp": 0.5, "kd_att_rp": 0.1,
+                 "kp_vel_xy": 2, "kd_vel_xy": 0.5, "kp_z": 10, "ki_z": 5, "kd_z": 5}
+
+
+def merge_gains(gains=None):
+    """Return DEFAULT_GAINS with the entries of gains overriding the defaults."""
+    merged = dict(DEFAULT_GAINS)
+    if gains:
+        unknown = set(gains) - set(DEFAULT_GAINS)
+        if unknown:
+            raise ValueError("Unknown PID gains: {}".format(", ".join(sorted(unknown))))
+        merged.update(gains)
+    return merged
+
+
 class pid_velocity_fixed_height_controller():
-    def __init__(self):
+    def __init__(self, gains=None):
+        self.gains = merge_gains(gains)
         self.past_vx_error = 0.0
         self.past_vy_error = 0.0
         self.past_alt_error = 0.0
@@ -35,8 +51,7 @@ class pid_velocity_fixed_height_controller():
     def pid(self, dt, desired_vx, desired_vy, desired_yaw_rate, desired_altitude, actual_roll, actual_pitch, actual_yaw_rate,
             actual_altitude, actual_vx, actual_vy):
         # Velocity PID control (converted from Crazyflie c code)
-        gains = {"kp_att_y": 1, "kd_att_y": 0.5, "kp_att_rp": 0.5, "kd_att_rp": 0.1,
-                 "kp_vel_xy": 2, "kd_vel_xy": 0.5, "kp_z": 10, "ki_z": 5, "kd_z": 5}
+        gains = self.gains
 
         # Velocity PID control
         vx_error = desired_vx - actual_vx
@@ -81,3 +96,180 @@ class pid_velocity_fixed_height_controller():
         m4 = np.clip(m4, 0, 600)
 
         return [m1, m2, m3, m4]
+
+
+class pid_velocity_fixed_height_controller_fast():
+    """Drop-in replacement for pid_velocity_fixed_height_controller with less
+    per-call overhead.
+
+    The gains are unpacked into attributes once at construction, clipping is
+    done on plain Python floats instead of going through np.clip, and pid()
+    returns a list of floats. The operations are the same as in the reference
+    controller, so both return identical motor commands.
+    """
+
+    def __init__(self, gains=None):
+        self.past_vx_error = 0.0
+        self.past_vy_error = 0.0
+        self.past_alt_error = 0.0
+        self.past_pitch_error = 0.0
+        self.past_roll_error = 0.0
+        self.altitude_integrator = 0.0
+        self.last_time = 0.0
+
+        self.gains = merge_gains(gains)
+        self.kp_att_y = self.gains["kp_att_y"]
+        self.kp_att_rp = self.gains["kp_att_rp"]
+        self.kd_att_rp = self.gains["kd_att_rp"]
+        self.kp_vel_xy = self.gains["kp_vel_xy"]
+        self.kd_vel_xy = self.gains["kd_vel_xy"]
+        self.kp_z = self.gains["kp_z"]
+        self.ki_z = self.gains["ki_z"]
+        self.kd_z = self.gains["kd_z"]
+
+    def pid(self, dt, desired_vx, desired_vy, desired_yaw_rate, desired_altitude, actual_roll, actual_pitch, actual_yaw_rate,
+            actual_altitude, actual_vx, actual_vy):
+        # The clipping below is written as "lo if x < lo else hi if x > hi else x"
+        # so that NaN passes through unchanged, like it does with np.clip.
+
+        # Velocity PID control
+        vx_error = desired_vx - actual_vx
+        vx_deriv = (vx_error - self.past_vx_error) / dt
+        vy_error = desired_vy - actual_vy
+        vy_deriv = (vy_error - self.past_vy_error) / dt
+        vx_clip = -1.0 if vx_error < -1.0 else 1.0 if vx_error > 1.0 else vx_error
+        vy_clip = -1.0 if vy_error < -1.0 else 1.0 if vy_error > 1.0 else vy_error
+        desired_pitch = self.kp_vel_xy * vx_clip + self.kd_vel_xy * vx_deriv
+        desired_roll = -self.kp_vel_xy * vy_clip - self.kd_vel_xy * vy_deriv
+        self.past_vx_error = vx_error
+        self.past_vy_error = vy_error
+
+        # Altitude PID control
+        alt_error = desired_altitude - actual_altitude
+        alt_deriv = (alt_error - self.past_alt_error) / dt
+        integrator = self.altitude_integrator + alt_error * dt
+        self.altitude_integrator = integrator
+        integrator = -2.0 if integrator < -2.0 else 2.0 if integrator > 2.0 else integrator
+        alt_command = self.kp_z * alt_error + self.kd_z * alt_deriv + self.ki_z * integrator + 48
+        self.past_alt_error = alt_error
+
+        # Attitude PID control
+        pitch_error = desired_pitch - actual_pitch
+        pitch_deriv = (pitch_error - self.past_pitch_error) / dt
+        roll_error = desired_roll - actual_roll
+        roll_deriv = (roll_error - self.past_roll_error) / dt
+        yaw_rate_error = desired_yaw_rate - actual_yaw_rate
+        roll_clip = -1.0 if roll_error < -1.0 else 1.0 if roll_error > 1.0 else roll_error
+        pitch_clip = -1.0 if pitch_error < -1.0 else 1.0 if pitch_error > 1.0 else pitch_error
+        yaw_clip = -1.0 if yaw_rate_error < -1.0 else 1.0 if yaw_rate_error > 1.0 else yaw_rate_error
+        roll_command = self.kp_att_rp * roll_clip + self.kd_att_rp * roll_deriv
+        pitch_command = -self.kp_att_rp * pitch_clip - self.kd_att_rp * pitch_deriv
+        yaw_command = self.kp_att_y * yaw_clip
+        self.past_pitch_error = pitch_error
+        self.past_roll_error = roll_error
+
+        # Motor mixing
+        m1 = alt_command - roll_command + pitch_command + yaw_command
+        m2 = alt_command - roll_command - pitch_command - yaw_command
+        m3 = alt_command + roll_command - pitch_command + yaw_command
+        m4 = alt_command + roll_command + pitch_command - yaw_command
+
+        # Limit the motor command
+        m1 = 0.0 if m1 < 0.0 else 600.0 if m1 > 600.0 else m1
+        m2 = 0.0 if m2 < 0.0 else 600.0 if m2 > 600.0 else m2
+        m3 = 0.0 if m3 < 0.0 else 600.0 if m3 > 600.0 else m3
+        m4 = 0.0 if m4 < 0.0 else 600.0 if m4 > 600.0 else m4
+
+        return [m1, m2, m3, m4]
+
+
+class pid_velocity_fixed_height_controller_batch():
+    """Vectorized pid_velocity_fixed_height_controller for a swarm of N drones.
+
+    The controller state is kept in arrays of shape (N,) and one call to pid()
+    computes the motor commands of every drone. The arithmetic follows the
+    scalar controller operation by operation, so drone i gets exactly the same
+    motor commands as a scalar controller fed with the same inputs.
+    """
+
+    def __init__(self, n, gains=None):
+        self.n = n
+        self.past_vx_error = np.zeros(n)
+        self.past_vy_error = np.zeros(n)
+        self.past_alt_error = np.zeros(n)
+        self.past_pitch_error = np.zeros(n)
+        self.past_roll_error = np.zeros(n)
+        self.altitude_integrator = np.zeros(n)
+        self.last_time = 0.0
+
+        gains = merge_gains(gains)
+        self.kp_att_y = gains["kp_att_y"]
+        self.kp_att_rp = gains["kp_att_rp"]
+        self.kd_att_rp = gains["kd_att_rp"]
+        self.kp_vel_xy = gains["kp_vel_xy"]
+        self.kd_vel_xy = gains["kd_vel_xy"]
+        self.kp_z = gains["kp_z"]
+        self.ki_z = gains["ki_z"]
+        self.kd_z = gains["kd_z"]
+
+        self.motor_power = np.empty((n, 4))
+
+    def reset(self, index=None):
+        """Reset the controller state of all drones, or only of the drones
+        selected by index (an int, slice, or boolean/integer array).
+        """
+        if index is None:
+            index = slice(None)
+        self.past_vx_error[index] = 0.0
+        self.past_vy_error[index] = 0.0
+        self.past_alt_error[index] = 0.0
+        self.past_pitch_error[index] = 0.0
+        self.past_roll_error[index] = 0.0
+        self.altitude_integrator[index] = 0.0
+
+    def pid(self, dt, desired_vx, desired_vy, desired_yaw_rate, desired_altitude, actual_roll, actual_pitch,
+            actual_yaw_rate, actual_altitude, actual_vx, actual_vy):
+        """Same arguments as pid_velocity_fixed_height_controller.pid, each
+        either a scalar shared by all drones or an array of shape (N,).
+
+        Returns an array of shape (N, 4) with the motor commands m1..m4 of
+        every drone. The array is reused by the next call, copy it if needed.
+        """
+        # Velocity PID control
+        vx_error = desired_vx - actual_vx
+        vx_deriv = (vx_error - self.past_vx_error) / dt
+        vy_error = desired_vy - actual_vy
+        vy_deriv = (vy_error - self.past_vy_error) / dt
+        desired_pitch = self.kp_vel_xy * np.clip(vx_error, -1, 1) + self.kd_vel_xy * vx_deriv
+        desired_roll = -self.kp_vel_xy * np.clip(vy_error, -1, 1) - self.kd_vel_xy * vy_deriv
+        self.past_vx_error = vx_error
+        self.past_vy_error = vy_error
+
+        # Altitude PID control
+        alt_error = desired_altitude - actual_altitude
+        alt_deriv = (alt_error - self.past_alt_error) / dt
+        self.altitude_integrator = self.altitude_integrator + alt_error * dt
+        alt_command = self.kp_z * alt_error + self.kd_z * alt_deriv + \
+            self.ki_z * np.clip(self.altitude_integrator, -2, 2) + 48
+        self.past_alt_error = alt_error
+
+        # Attitude PID control
+        pitch_error = desired_pitch - actual_pitch
+        pitch_deriv = (pitch_error - self.past_pitch_error) / dt
+        roll_error = desired_roll - actual_roll
+        roll_deriv = (roll_error - self.past_roll_error) / dt
+        yaw_rate_error = desired_yaw_rate - actual_yaw_rate
+        roll_command = self.kp_att_rp * np.clip(roll_error, -1, 1) + self.kd_att_rp * roll_deriv
+        pitch_command = -self.kp_att_rp * np.clip(pitch_error, -1, 1) - self.kd_att_rp * pitch_deriv
+        yaw_command = self.kp_att_y * np.clip(yaw_rate_error, -1, 1)
+        self.past_pitch_error = pitch_error
+        self.past_roll_error = roll_error
+
+        # Motor mixing, limited to the motor command range
+        motor_power = self.motor_power
+        np.clip(alt_command - roll_command + pitch_command + yaw_command, 0, 600, out=motor_power[:, 0])
+        np.clip(alt_command - roll_command - pitch_command - yaw_command, 0, 600, out=motor_power[:, 1])
+        np.clip(alt_command + roll_command - pitch_command + yaw_command, 0, 600, out=motor_power[:, 2])
+        np.clip(alt_command + roll_command + pitch_command - yaw_command, 0, 600, out=motor_power[:, 3])
+
+        return motor_power
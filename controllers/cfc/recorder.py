@@ -0,0 +1,146 @@
+"""
+file: recorder.py
+
+Binary flight-data recorder for the Crazyflie control loop.
+
+FlightRecorder appends one row per control step to a preallocated .npy file
+mapped into memory, with the structured dtype RECORD_DTYPE: step number,
+time and dt, the full sensor snapshot, the setpoints, the PID errors and the
+motor commands. A row is written with a single struct.pack_into() into the
+mapping, no allocation and no system call per step; the kernel writes the
+pages back in the background and keeps them even if the controller dies.
+
+np.load(path, mmap_mode='r') opens a recording instantly, whatever its size,
+and every field reads as a column (data['altitude']). load_flight() also
+drops the unused rows at the end.
+
+    python recorder.py FLIGHT.npy [--pid-trace TRACE.npy]
+
+prints a summary of a recording and can export the PID inputs as a trace for
+bench_pid.py --trace, to replay the flight through the controllers.
+"""
+
+import argparse
+import struct
+from operator import attrgetter
+
+import numpy as np
+
+from sensors import SensorSnapshot
+
+SETPOINT_FIELDS = ('forward_desired', 'sideways_desired', 'yaw_desired', 'height_desired')
+FLAG_FIELDS = ('motors_on', 'flying')
+# Controller attribute -> field name. After pid() the past_* attributes
+# hold the errors of the current step.
+PID_FIELDS = (
+    ('past_vx_error', 'vx_error'),
+    ('past_vy_error', 'vy_error'),
+    ('past_alt_error', 'alt_error'),
+    ('past_pitch_error', 'pitch_error'),
+    ('past_roll_error', 'roll_error'),
+    ('altitude_integrator', 'altitude_integrator'),
+)
+MOTOR_FIELDS = ('m1', 'm2', 'm3', 'm4')
+
+RECORD_DTYPE = np.dtype(
+    [('step', '<u8')]
+    + [(name, '<f8') for name in SensorSnapshot.__slots__]
+    + [(name, '<f8') for name in SETPOINT_FIELDS]
+    + [(name, '?') for name in FLAG_FIELDS]
+    + [(name, '<f8') for _, name in PID_FIELDS]
+    + [(name, '<f8') for name in MOTOR_FIELDS]
+)
+# The same layout for struct: a packed little-endian dtype has no padding
+_ROW = struct.Struct('<Q{}d{}?{}d'.format(len(SensorSnapshot.__slots__) + len(SETPOINT_FIELDS),
+                                           len(FLAG_FIELDS), len(PID_FIELDS) + len(MOTOR_FIELDS)))
+assert _ROW.size == RECORD_DTYPE.itemsize
+
+DEFAULT_CAPACITY = 125 * 3600  # one hour at the 8 ms basicTimeStep
+
+
+class FlightRecorder():
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        """
+        Arguments:
+            path: .npy file to create, overwritten if it exists
+            capacity: rows to preallocate. The file is sparse, unused rows
+                take no disk space. Steps beyond capacity are not recorded.
+        """
+        self.path = path
+        self.capacity = capacity
+        self.data = np.lib.format.open_memmap(path, mode='w+', dtype=RECORD_DTYPE, shape=(capacity,))
+        # A memoryview skips the buffer export of the array on every write
+        self.buffer = memoryview(self.data.reshape(-1).view(np.uint8))
+        self.count = 0
+        self.dropped = 0
+        self._snapshot = attrgetter(*SensorSnapshot.__slots__)
+        self._setpoints = attrgetter(*(SETPOINT_FIELDS + FLAG_FIELDS))
+        self._pid = attrgetter(*(attribute for attribute, _ in PID_FIELDS))
+
+    def record(self, state, plan, pid, motor_power):
+        """Append one step: the SensorSnapshot, the FlightPlan setpoints, the
+        PID controller terms and the four motor commands.
+        """
+        count = self.count
+        if count == self.capacity:
+            self.dropped += 1
+            return
+        self.count = count + 1
+        _ROW.pack_into(self.buffer, count * _ROW.size, count + 1,
+                       *self._snapshot(state), *self._setpoints(plan), *self._pid(pid), *motor_power)
+
+    def flush(self):
+        """Write the recorded rows back to the file now."""
+        self.data.flush()
+
+    def close(self):
+        self.flush()
+        self.buffer.release()
+        self.data = self.buffer = None
+
+
+def load_flight(path):
+    """Open a recording read-only, without reading it. Returns the recorded
+    rows as a memory-mapped structured array.
+    """
+    data = np.load(path, mmap_mode='r')
+    steps = data['step']
+    if not len(steps):
+        # Recorded with capacity 0
+        return data
+    # Rows are filled in order and step numbers start at 1
+    count = len(data) if steps[-1] else int(np.argmin(steps))
+    return data[:count]
+
+
+def pid_trace(data):
+    """The pid() arguments of every recorded step with the motors on, as a
+    trace of shape (steps, 11) for bench_pid.py.
+    """
+    data = data[data['motors_on']]
+    columns = ('dt', 'forward_desired', 'sideways_desired', 'yaw_desired', 'height_desired',
+               'roll', 'pitch', 'yaw_rate', 'altitude', 'v_x', 'v_y')
+    return np.stack([data[name] for name in columns], axis=1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--pid-trace', metavar='FILE', help='save the PID inputs as a bench_pid.py trace')
+    args = parser.parse_args()
+
+    data = load_flight(args.path)
+    print(f"steps:      {len(data)}")
+    if len(data):
+        dt = data['dt'][1:]
+        print(f"time:       {data['time'][0]:.3f} to {data['time'][-1]:.3f} s")
+        if len(dt):
+            print(f"dt:         {dt.min() * 1000:.1f} to {dt.max() * 1000:.1f} ms")
+        print(f"altitude:   {data['altitude'].min():.3f} to {data['altitude'].max():.3f} m")
+        print(f"attitude:   |roll| <= {np.abs(data['roll']).max():.3f}, "
+              f"|pitch| <= {np.abs(data['pitch']).max():.3f} rad")
+        motors = np.stack([data[name] for name in MOTOR_FIELDS])
+        # pid() clips the motor commands to [0, 600]
+        print(f"saturated:  {np.count_nonzero((motors <= 0) | (motors >= 600))} of {motors.size} motor commands")
+    if args.pid_trace:
+        np.save(args.pid_trace, pid_trace(data))
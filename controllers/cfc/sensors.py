@@ -0,0 +1,111 @@
+"""
+file: sensors.py
+
+Per-step sensor snapshot for the Crazyflie control loop.
+
+Every Webots sensor getter is a call through the controller API that builds a
+fresh list. SensorReader.read() calls each enabled device exactly once per
+control step and stores the values into a single, reused SensorSnapshot,
+together with the velocities estimated from consecutive GPS positions. The
+PID controller and every telemetry consumer read the snapshot instead of the
+devices.
+"""
+
+import time
+from math import cos, sin
+
+
+class SensorSnapshot():
+    """Sensor values of one control step. Angles in rad, positions in m,
+    velocities in m/s, ranges in m, times in s.
+    """
+    __slots__ = (
+        'time', 'dt',
+        'roll', 'pitch', 'yaw',
+        'roll_rate', 'pitch_rate', 'yaw_rate',
+        'x', 'y', 'altitude',
+        'v_x_global', 'v_y_global', 'v_z_global',
+        'v_x', 'v_y',
+        'range_front', 'range_left', 'range_back', 'range_right',
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0.0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SensorReader():
+    def __init__(self, robot, imu, gps, gyro, ranges=(), timed=False):
+        """
+        Arguments:
+            robot: Webots Robot, used for the simulation time
+            imu, gps, gyro: enabled InertialUnit, GPS and Gyro devices
+            ranges: enabled DistanceSensors, in the order front, left, back, right
+            timed: measure the time spent reading the devices
+        """
+        self.robot = robot
+        self.imu = imu
+        self.gps = gps
+        self.gyro = gyro
+        self.ranges = tuple(ranges)
+        self.snapshot = SensorSnapshot()
+        self.past_time = 0.0
+        self.past_position = None
+
+        self.timed = timed
+        self.read_count = 0
+        self.read_time = 0.0
+
+    def read(self):
+        """Read all devices once and return the updated snapshot. The same
+        SensorSnapshot object is returned at every step.
+        """
+        if self.timed:
+            start = time.perf_counter()
+
+        s = self.snapshot
+        now = self.robot.getTime()
+        s.time = now
+        s.dt = dt = now - self.past_time
+        self.past_time = now
+
+        s.roll, s.pitch, s.yaw = self.imu.getRollPitchYaw()
+        s.roll_rate, s.pitch_rate, s.yaw_rate = self.gyro.getValues()
+        x, y, z = self.gps.getValues()
+        s.x = x
+        s.y = y
+        s.altitude = z
+
+        # Velocities estimated from the GPS, zero on the first step
+        past_position = self.past_position
+        if past_position is None:
+            past_position = (x, y, z)
+        s.v_x_global = v_x_global = (x - past_position[0]) / dt
+        s.v_y_global = v_y_global = (y - past_position[1]) / dt
+        s.v_z_global = (z - past_position[2]) / dt
+        self.past_position = (x, y, z)
+
+        # Body fixed velocities
+        cos_yaw = cos(s.yaw)
+        sin_yaw = sin(s.yaw)
+        s.v_x = v_x_global * cos_yaw + v_y_global * sin_yaw
+        s.v_y = - v_x_global * sin_yaw + v_y_global * cos_yaw
+
+        ranges = self.ranges
+        if ranges:
+            s.range_front = ranges[0].getValue() / 1000
+            s.range_left = ranges[1].getValue() / 1000
+            s.range_back = ranges[2].getValue() / 1000
+            s.range_right = ranges[3].getValue() / 1000
+
+        if self.timed:
+            self.read_time += time.perf_counter() - start
+            self.read_count += 1
+        return s
+
+    def mean_read_time(self):
+        """Average time spent in read(), in seconds. Requires timed=True."""
+        return self.read_time / self.read_count if self.read_count else 0.0
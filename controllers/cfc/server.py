@@ -1,43 +1,248 @@
-from flask import Flask
+import asyncio
+import logging
+import os
 import queue
+import socket
+import threading
+
+from flask import Flask, request
+
+from tello_sdk import TelloInterpreter
+
+# Ports of the Tello wire protocol: the drone receives commands on 8889 and
+# sends its state to port 8890 of the client
+TELLO_COMMAND_PORT = 8889
+TELLO_STATE_PORT = 8890
+HTTP_PORT = 5000
+RECEIVE_BUFFER_SIZE = 4 << 20  # bytes
 
 CONTROL_QUEUE = queue.Queue()
+INTERPRETER = TelloInterpreter(CONTROL_QUEUE)
 app = Flask(__name__)
 
+# One log line per request costs more than the request itself
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+
+class TelloProtocol(asyncio.DatagramProtocol):
+    """Answers Tello SDK commands received over UDP, one command per
+    datagram. The command is handled right in the event loop callback:
+    validation and the put into the control queue take microseconds, so no
+    worker thread is involved.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        reply = self.server.handle_datagram(data, addr)
+        if reply is not None:
+            self.transport.sendto(reply, addr)
+
+
+class TelloUdpServer():
+    def __init__(self, interpreter, host='0.0.0.0', port=TELLO_COMMAND_PORT, state_port=TELLO_STATE_PORT):
+        """
+        Arguments:
+            interpreter: TelloInterpreter executing the commands
+            host: address to listen on
+            port: command port, 0 picks a free one
+            state_port: client port the state packets are sent to
+        """
+        self.interpreter = interpreter
+        self.host = host
+        self.port = port
+        self.state_port = state_port
+        # Like the Tello, state goes to the clients that sent "command". The
+        # frozenset is replaced, never mutated, so send_state() can iterate
+        # it from another thread.
+        self.clients = frozenset()
+        self.packets = 0
+        self.socket_inode = None
+
+        self.loop = None
+        self.transport = None
+        self.ready = threading.Event()
+        # State is sent from the control loop thread; a plain non-blocking
+        # socket is thread safe and needs no hop through the event loop
+        self.state_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.state_socket.setblocking(False)
+
+    def handle_datagram(self, data, addr):
+        """Execute one command and return the reply, None for rc commands
+        which the Tello never answers.
+        """
+        self.packets += 1
+        try:
+            text = data.decode('ascii')
+        except UnicodeDecodeError:
+            return b'error'
+        reply = self.interpreter.handle(text)
+        # The interpreter takes verbs in any case
+        if text.lstrip()[:3].lower() == 'rc ':
+            return None
+        if text.strip().lower() == 'command':
+            self.add_client(addr[0])
+        return reply.encode('ascii')
+
+    def add_client(self, host):
+        """Send the state packets to port state_port of host from now on."""
+        if host not in self.clients:
+            self.clients = self.clients | {host}
+
+    def send_state(self, packet):
+        """Send one state packet (bytes) to every client. Thread safe."""
+        for host in self.clients:
+            try:
+                self.state_socket.sendto(packet, (host, self.state_port))
+            except OSError:
+                # A full socket buffer or an unreachable client must never
+                # stall the control loop
+                pass
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: TelloProtocol(self), local_addr=(self.host, self.port))
+        if self.host != '0.0.0.0':
+            # Send the state from the drone's own address, clients tell the
+            # drones of a swarm apart by the source address of the packets
+            self.state_socket.bind((self.host, 0))
+        self.port = self.transport.get_extra_info('sockname')[1]
+        # Room for bursts of rc packets while the event loop thread waits for
+        # the GIL. SO_RCVBUF is capped by net.core.rmem_max, root may go
+        # past that with SO_RCVBUFFORCE.
+        sock = self.transport.get_extra_info('socket')
+        self.socket_inode = os.fstat(sock.fileno()).st_ino
+        for option in (getattr(socket, 'SO_RCVBUFFORCE', None), socket.SO_RCVBUF):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, option, RECEIVE_BUFFER_SIZE)
+                break
+            except (OSError, TypeError):
+                pass
+        # Linux reports twice the size set
+        if sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) < RECEIVE_BUFFER_SIZE:
+            logging.getLogger(__name__).warning(
+                "UDP receive buffer of %s:%s is %d bytes, rc bursts may be dropped; see dropped()",
+                self.host, self.port, sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF))
+        self.ready.set()
+
+    def dropped(self):
+        """Datagrams the kernel dropped because the receive buffer was full,
+        None where that is not known (the count is read from /proc/net/udp,
+        Linux only).
+        """
+        try:
+            with open('/proc/net/udp') as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if int(fields[9]) == self.socket_inode:
+                        return int(fields[-1])
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+
+    def close(self):
+        """Close the sockets, from the event loop thread."""
+        if self.transport is not None:
+            self.transport.close()
+        self.state_socket.close()
+
+    def run(self):
+        """Serve forever in the calling thread."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self.start())
+        try:
+            loop.run_forever()
+        finally:
+            self.close()
+            # Let the transport really close its socket
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
+
+    def stop(self):
+        """Stop run() from another thread."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+UDP_SERVER = TelloUdpServer(INTERPRETER)
+
+# "host:port" an HTTP server listens on -> TelloUdpServer of the drone served
+# there, filled by swarm.SwarmServer. Everything else goes to UDP_SERVER.
+HTTP_ROUTES = {}
+
+
+def routed_server():
+    """TelloUdpServer of the drone served at the address the request came in
+    on. The listening address, not the Host header, which the client sets.
+    """
+    listening = '{}:{}'.format(request.environ['SERVER_NAME'], request.environ['SERVER_PORT'])
+    return HTTP_ROUTES.get(listening, UDP_SERVER)
+
+
+@app.route("/send")
+def send():
+    """Tello SDK command, as sent by ai/djitellopy_webots.py"""
+    udp_server = routed_server()
+    command = request.args.get("command", "")
+    if command.strip().lower() == "command":
+        # The state still goes over UDP, as for the UDP clients
+        udp_server.add_client(request.remote_addr)
+    return udp_server.interpreter.handle(command)
+
+
+def legacy_command(command):
+    """Put a command of the legacy routes into the queue of the drone the
+    client connected to, as /send does.
+    """
+    routed_server().interpreter.queue.put(command)
+    return command + " OK"
+
 
 @app.route("/up")
 def drone_up():
-    CONTROL_QUEUE.put("UP")
-    return "UP OK"
+    return legacy_command("UP")
 
 @app.route("/down")
 def drone_down():
-    CONTROL_QUEUE.put("DOWN")
-    return "DOWN OK"
+    return legacy_command("DOWN")
 
 @app.route("/forward")
 def drone_forward():
-    CONTROL_QUEUE.put("FORWARD")
-    return "FORWARD OK"
+    return legacy_command("FORWARD")
 
 @app.route("/backward")
 def drone_backward():
-    CONTROL_QUEUE.put("BACKWARD")
-    return "BACKWARD OK"
+    return legacy_command("BACKWARD")
 
 @app.route("/left")
 def drone_left():
-    CONTROL_QUEUE.put("LEFT")
-    return "LEFT OK"
+    return legacy_command("LEFT")
 
 @app.route("/right")
 def drone_right():
-    CONTROL_QUEUE.put("RIGHT")
-    return "RIGHT OK"
+    return legacy_command("RIGHT")
+
+
+def start_http_server(host="0.0.0.0", port=HTTP_PORT):
+    app.run(host=host, port=port, debug=False, use_reloader=False)
 
 
-def start_server():
-    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
+def start_server(host="0.0.0.0", port=TELLO_COMMAND_PORT, state_port=TELLO_STATE_PORT, http_port=HTTP_PORT):
+    """Serve the Tello UDP protocol and, for the HTTP clients, the /send and
+    legacy routes of the drone, at the given address. Blocks, run it in a
+    thread.
+    """
+    UDP_SERVER.host, UDP_SERVER.port, UDP_SERVER.state_port = host, port, state_port
+    threading.Thread(target=start_http_server, args=(host, http_port), daemon=True).start()
+    UDP_SERVER.run()
 
 
 if __name__ == "__main__":
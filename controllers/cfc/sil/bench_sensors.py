@@ -0,0 +1,98 @@
+"""
+file: bench_sensors.py
+
+Per-step cost of reading the Crazyflie sensors, before and after the sensor
+snapshot, measured on the software-in-the-loop devices.
+
+legacy:   the access pattern of the original cfc.py loop, three
+          getRollPitchYaw(), three GPS getValues() (five on the first
+          step), one gyro and three range sensor calls per step, plus the
+          velocity estimation.
+snapshot: SensorReader.read(), every device read exactly once.
+
+The SIL devices only build a list per call. In Webots every call also goes
+through the controller library, so the savings there are larger.
+
+    python bench_sensors.py [--steps 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from math import cos, sin
+
+SIL_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [SIL_DIR, os.path.dirname(SIL_DIR)]
+
+from controller import Robot  # noqa: E402
+from sensors import SensorReader  # noqa: E402
+
+
+def make_robot():
+    robot = Robot()
+    devices = [robot.getDevice(name) for name in ('inertial_unit', 'gps', 'gyro', 'range_front',
+                                                  'range_left', 'range_back', 'range_right')]
+    for device in devices:
+        device.enable(8)
+    return robot, devices
+
+
+def legacy(steps):
+    robot, (imu, gps, gyro, range_front, range_left, range_back, range_right) = make_robot()
+    past_x_global = past_y_global = past_time = 0
+    first_time = True
+    elapsed = 0.0
+    for _ in range(steps):
+        robot.time += 0.008
+        start = time.perf_counter()
+
+        dt = robot.getTime() - past_time
+        if first_time:
+            past_x_global = gps.getValues()[0]
+            past_y_global = gps.getValues()[1]
+            past_time = robot.getTime()
+            first_time = False
+        roll = imu.getRollPitchYaw()[0]
+        pitch = imu.getRollPitchYaw()[1]
+        yaw = imu.getRollPitchYaw()[2]
+        yaw_rate = gyro.getValues()[2]
+        x_global = gps.getValues()[0]
+        v_x_global = (x_global - past_x_global) / dt
+        y_global = gps.getValues()[1]
+        v_y_global = (y_global - past_y_global) / dt
+        altitude = gps.getValues()[2]
+        cos_yaw = cos(yaw)
+        sin_yaw = sin(yaw)
+        v_x = v_x_global * cos_yaw + v_y_global * sin_yaw
+        v_y = - v_x_global * sin_yaw + v_y_global * cos_yaw
+        range_front_value = range_front.getValue() / 1000
+        range_right_value = range_right.getValue() / 1000
+        range_left_value = range_left.getValue() / 1000
+        past_time = robot.getTime()
+        past_x_global = x_global
+        past_y_global = y_global
+
+        elapsed += time.perf_counter() - start
+    return elapsed / steps
+
+
+def snapshot(steps):
+    robot, (imu, gps, gyro, *ranges) = make_robot()
+    sensors = SensorReader(robot, imu, gps, gyro, ranges, timed=True)
+    for _ in range(steps):
+        robot.time += 0.008
+        sensors.read()
+    return sensors.mean_read_time()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=20000)
+    args = parser.parse_args()
+
+    legacy_time = legacy(args.steps)
+    snapshot_time = snapshot(args.steps)
+    print(f"legacy    {legacy_time * 1e6:6.2f} us/step (10 device calls)")
+    print(f"snapshot  {snapshot_time * 1e6:6.2f} us/step (7 device calls)")
+    print(f"saved     {(legacy_time - snapshot_time) * 1e6:6.2f} us/step")
@@ -0,0 +1,94 @@
+"""
+file: bench_swarm.py
+
+Scaling of the single-process swarm host (run_swarm.py) with the number of
+drones.
+
+For every swarm size the drones are stepped as fast as possible for a few
+seconds while a client thread sends Tello commands round-robin to
+all drones over UDP, at a fixed rate:
+    step rate:  swarm steps per second and real-time factor, with the
+                command traffic going on;
+    round trip: a battery? query to one drone until its reply;
+    apply:      from the arrival of an rc command at the server until the
+                control step of its drone picks it up.
+
+    python bench_swarm.py [--sizes 1 10 25 50 100] [--seconds 2] [--rate 500]
+                          [--mode host|port]
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+import numpy as np
+
+from run_swarm import build_swarm, run, start_server
+
+
+def client(addresses, rate, stop, round_trips):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(1)
+    start = time.perf_counter()
+    i = 0
+    while not stop.is_set():
+        address = addresses[i % len(addresses)]
+        sock.sendto(b'rc 0 10 0 0' if i % 2 else b'rc 0 0 0 0', address)
+        sent = time.perf_counter()
+        sock.sendto(b'battery?', address)
+        try:
+            sock.recvfrom(64)
+            round_trips.append(time.perf_counter() - sent)
+        except socket.timeout:
+            pass
+        i += 1
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    sock.close()
+
+
+def bench(count, seconds, rate, mode):
+    swarm_server, drones = build_swarm(count, mode, http=False)
+    server_thread = start_server(swarm_server)
+    addresses = [(a.host, a.command_port) for a in swarm_server.addresses.values()]
+
+    applied = []
+    seen = {}
+
+    def after_step(robot, controller):
+        rc = controller.interpreter.rc
+        if seen.get(robot.name, 0) != rc.sequence:
+            seen[robot.name] = rc.sequence
+            applied.append(time.perf_counter() - rc.received_at)
+
+    round_trips = []
+    stop = threading.Event()
+    client_thread = threading.Thread(target=client, args=(addresses, rate, stop, round_trips))
+    client_thread.start()
+    steps, wall = run(drones, float('inf'), after_step, wall_time=seconds)
+    stop.set()
+    client_thread.join()
+    swarm_server.stop()
+    server_thread.join()
+
+    rtt = np.asarray(round_trips) * 1e3
+    apply = np.asarray(applied) * 1e3
+    print("{:6d}  {:9.0f}  {:8.2f}x  {:7.2f} {:7.2f}  {:7.2f} {:7.2f}".format(
+        count, steps / wall, drones[0][0].getTime() / wall,
+        np.median(rtt), np.percentile(rtt, 99), np.median(apply), np.percentile(apply, 99)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 25, 50, 100])
+    parser.add_argument('--seconds', type=float, default=2.0, help='wall-clock seconds per swarm size')
+    parser.add_argument('--rate', type=int, default=500, help='command pairs per second sent by the client')
+    parser.add_argument('--mode', choices=('host', 'port'), default='host', help='addressing mode, see swarm.py')
+    args = parser.parse_args()
+
+    print("drones  steps/s   real time   round trip ms   apply ms")
+    print("                              median    p99  median    p99")
+    for count in args.sizes:
+        bench(count, args.seconds, args.rate, args.mode)
@@ -0,0 +1,74 @@
+"""
+file: check_land.py
+
+Check that land preempts a backlog of moves: one simulated drone in real
+time, served over HTTP like in run_swarm.py, gets --moves "forward 300"
+commands and, --after seconds later, land. The drone must be on the
+ground within --limit seconds of the land command, not after the moves.
+
+    python check_land.py [--moves 4] [--after 1] [--limit 5]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import requests
+
+from run_swarm import build_swarm, run, start_server
+
+
+def check(moves, after, limit):
+    swarm_server, drones = build_swarm(1)
+    start_server(swarm_server)
+    robot, crazyflie = drones[0]
+    address = swarm_server.addresses[robot.getName()]
+    url = 'http://{}:{}/send'.format(address.host, address.http_port)
+
+    landed = {}
+
+    def after_step(robot, controller):
+        if 'land_sent' in landed and 'at' not in landed and not controller.plan.flying:
+            landed['at'] = time.perf_counter()
+            landed['position'] = (robot.body.x, robot.body.y)
+
+    wall_time = after + limit + 5
+    sim = threading.Thread(target=run, args=(drones, float('inf'), after_step, True, wall_time))
+    sim.start()
+
+    session = requests.Session()
+    session.get(url, params={'command': 'command'})
+    for _ in range(moves):
+        session.get(url, params={'command': 'forward 300'})
+    time.sleep(after)
+    landed['start'] = (robot.body.x, robot.body.y)
+    landed['land_sent'] = time.perf_counter()
+    reply = session.get(url, params={'command': 'land'}).text
+    acked = time.perf_counter() - landed['land_sent']
+    sim.join()
+    swarm_server.stop()
+    crazyflie.close()
+
+    print("land acked after {:.0f} ms ({})".format(acked * 1e3, reply))
+    if 'at' not in landed:
+        print("FAIL: still flying {:.1f} s after land".format(wall_time - after))
+        return False
+    took = landed['at'] - landed['land_sent']
+    drift = ((landed['position'][0] - landed['start'][0]) ** 2
+             + (landed['position'][1] - landed['start'][1]) ** 2) ** 0.5
+    print("on the ground {:.2f} s after land, {:.2f} m from where land was sent".format(took, drift))
+    if took > limit:
+        print("FAIL: landing took more than {} s".format(limit))
+        return False
+    print("OK")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--moves', type=int, default=4, help='forward 300 commands queued before land')
+    parser.add_argument('--after', type=float, default=1.0, help='seconds between the moves and land')
+    parser.add_argument('--limit', type=float, default=5.0, help='seconds the landing may take')
+    args = parser.parse_args()
+    sys.exit(0 if check(args.moves, args.after, args.limit) else 1)
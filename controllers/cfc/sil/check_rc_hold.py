@@ -0,0 +1,118 @@
+"""
+file: check_rc_hold.py
+
+Check that the rc keep-alive of the Webots Tello client (RcChannel resends
+the current setpoint) neither moves a hovering drone nor overrides a
+maneuver: one simulated drone in real time, served like in run_swarm.py,
+driven by ai/djitellopy_webots.Tello.
+
+    hold:     rc 0 50 0 0 for a second, then rc 0 0 0 0; after --hold
+              seconds of resent rc 0 0 0 0 the drone must be back within
+              --tolerance m of where it was when rc 0 0 0 0 was sent
+    maneuver: rc 0 50 0 0, then move_back(50); once the move is done the
+              drone must hold its position, within --tolerance m, not fly
+              on with the old rc
+
+    python check_rc_hold.py [--hold 3] [--tolerance 0.05]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'ai'))
+
+from djitellopy_webots import Tello  # noqa: E402
+from run_swarm import build_swarm, run, start_server  # noqa: E402
+
+
+def distance(a, b):
+    return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5
+
+
+class Stopped(Exception):
+    pass
+
+
+def check(hold, tolerance):
+    swarm_server, drones = build_swarm(1)
+    server_thread = start_server(swarm_server)
+    robot, crazyflie = drones[0]
+    stop = threading.Event()
+
+    def after_step(robot, controller):
+        if stop.is_set():
+            raise Stopped
+
+    def simulate():
+        try:
+            run(drones, float('inf'), after_step, realtime=True)
+        except Stopped:
+            pass
+
+    sim = threading.Thread(target=simulate)
+    sim.start()
+
+    def position():
+        return robot.body.x, robot.body.y
+
+    def settle():
+        # The simulator answers ok before the control loop even takes the
+        # maneuver, let alone finishes it
+        time.sleep(0.2)
+        while crazyflie.plan.busy():
+            time.sleep(0.05)
+
+    tello = Tello('127.0.0.1')
+    ok = True
+    try:
+        tello.takeoff()
+        settle()
+
+        tello.send_rc_control(0, 50, 0, 0)
+        time.sleep(1)
+        tello.send_rc_control(0, 0, 0, 0)
+        start = position()
+        time.sleep(hold)
+        drift = distance(position(), start)
+        print("hold      {:.3f} m from where rc 0 0 0 0 was sent, after {} s of resending it".format(drift, hold))
+        if drift > tolerance:
+            print("FAIL: the resent rc 0 0 0 0 kept resetting the position hold")
+            ok = False
+
+        tello.send_rc_control(0, 50, 0, 0)
+        time.sleep(0.5)
+        tello.move_back(50)
+        settle()
+        time.sleep(0.5)
+        start = position()
+        time.sleep(1)
+        drift = distance(position(), start)
+        print("maneuver  moved {:.3f} m in the second after move_back()".format(drift))
+        if drift > tolerance:
+            print("FAIL: the old rc setpoint took over again")
+            ok = False
+
+        tello.land()
+    finally:
+        tello.end()
+        stop.set()
+        sim.join()
+        swarm_server.stop()
+        server_thread.join()
+        crazyflie.close()
+    print("OK" if ok else "FAIL")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hold', type=float, default=3.0, help='seconds of rc 0 0 0 0')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='metres the drone may be off')
+    args = parser.parse_args()
+
+    Tello.LOGGER.setLevel(logging.WARNING)
+    sys.exit(0 if check(args.hold, args.tolerance) else 1)
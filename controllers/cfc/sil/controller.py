@@ -0,0 +1,248 @@
+"""
+file: controller.py
+
+Software-in-the-loop stand-in for the Webots `controller` module.
+
+Provides the subset of the Webots Python API used by the cfc controller
+(Robot, Keyboard, Motor, GPS, InertialUnit, Gyro, Camera and DistanceSensor)
+backed by the quadrotor model in quadrotor.py instead of the Webots physics.
+Put this directory first on sys.path and the unchanged controller runs
+headless, as fast as the host allows. See run_sil.py.
+
+The simulation is configured through class attributes of Robot, set before
+the controller creates its Robot:
+    Robot.basic_time_step   world basicTimeStep in ms
+    Robot.max_time          simulated seconds after which step() returns -1
+    Robot.on_step           callables run as callback(robot) after every step
+"""
+
+from quadrotor import Quadrotor, MAX_MOTOR_VELOCITY
+
+NAN = float('nan')
+
+
+class Device():
+    def __init__(self, robot, name):
+        self.robot = robot
+        self.name = name
+
+    def getName(self):
+        return self.name
+
+
+class Sensor(Device):
+    def __init__(self, robot, name):
+        super().__init__(robot, name)
+        self.sampling_period = 0
+
+    def enable(self, sampling_period):
+        self.sampling_period = int(sampling_period)
+
+    def disable(self):
+        self.sampling_period = 0
+
+    def getSamplingPeriod(self):
+        return self.sampling_period
+
+
+class Motor(Device):
+    def __init__(self, robot, name, index):
+        super().__init__(robot, name)
+        self.index = index
+        self.position = 0.0
+        self.velocity = 0.0
+
+    def setPosition(self, position):
+        self.position = position
+
+    def setVelocity(self, velocity):
+        if velocity > MAX_MOTOR_VELOCITY:
+            velocity = MAX_MOTOR_VELOCITY
+        elif velocity < -MAX_MOTOR_VELOCITY:
+            velocity = -MAX_MOTOR_VELOCITY
+        self.velocity = velocity
+        self.robot.body.motor_commands[self.index] = velocity
+
+    def getVelocity(self):
+        return self.velocity
+
+    def getMaxVelocity(self):
+        return MAX_MOTOR_VELOCITY
+
+
+class GPS(Sensor):
+    def getValues(self):
+        if not self.sampling_period:
+            return [NAN, NAN, NAN]
+        body = self.robot.body
+        return [body.x, body.y, body.z]
+
+    def getSpeed(self):
+        if not self.sampling_period:
+            return NAN
+        body = self.robot.body
+        return (body.vx ** 2 + body.vy ** 2 + body.vz ** 2) ** 0.5
+
+    def getSpeedVector(self):
+        if not self.sampling_period:
+            return [NAN, NAN, NAN]
+        body = self.robot.body
+        return [body.vx, body.vy, body.vz]
+
+
+class InertialUnit(Sensor):
+    def getRollPitchYaw(self):
+        if not self.sampling_period:
+            return [NAN, NAN, NAN]
+        body = self.robot.body
+        return [body.roll, body.pitch, body.yaw]
+
+
+class Gyro(Sensor):
+    def getValues(self):
+        if not self.sampling_period:
+            return [NAN, NAN, NAN]
+        body = self.robot.body
+        return [body.p, body.q, body.r]
+
+
+class Camera(Sensor):
+    """Camera returning a uniform grey BGRA image of the configured size."""
+
+    def __init__(self, robot, name, width=324, height=324):
+        super().__init__(robot, name)
+        self.width = width
+        self.height = height
+        self.image = bytearray(b'\x80\x80\x80\xff' * (width * height))
+
+    def getWidth(self):
+        return self.width
+
+    def getHeight(self):
+        return self.height
+
+    def getImage(self):
+        if not self.sampling_period:
+            return None
+        # Webots hands out a fresh copy of the image buffer on every call
+        return bytes(self.image)
+
+
+class DistanceSensor(Sensor):
+    """Ranger that never sees an obstacle: it always returns its maximum
+    value (2 m, reported as 2000 like the Crazyflie range sensors).
+    """
+
+    def __init__(self, robot, name, max_value=2000.0):
+        super().__init__(robot, name)
+        self.max_value = max_value
+        self.value = max_value
+
+    def getValue(self):
+        if not self.sampling_period:
+            return NAN
+        return self.value
+
+    def getMinValue(self):
+        return 0.0
+
+    def getMaxValue(self):
+        return self.max_value
+
+
+class Keyboard():
+    END = 312
+    HOME = 313
+    LEFT = 314
+    UP = 315
+    RIGHT = 316
+    DOWN = 317
+    PAGEUP = 366
+    PAGEDOWN = 367
+    NUMPAD_HOME = 375
+    NUMPAD_LEFT = 376
+    NUMPAD_UP = 377
+    NUMPAD_RIGHT = 378
+    NUMPAD_DOWN = 379
+    NUMPAD_END = 382
+    KEY = 0xffff
+    SHIFT = 1 << 16
+    CONTROL = 1 << 17
+    ALT = 1 << 18
+
+    def __init__(self, sampling_period=None):
+        self.sampling_period = sampling_period or 0
+        self.keys = []
+
+    def enable(self, sampling_period):
+        self.sampling_period = sampling_period
+
+    def disable(self):
+        self.sampling_period = 0
+
+    def getSamplingPeriod(self):
+        return self.sampling_period
+
+    def getKey(self):
+        # Keys can be fed by a test through the keys list
+        if self.keys:
+            return self.keys.pop(0)
+        return -1
+
+
+class Robot():
+    basic_time_step = 8
+    max_time = None
+    on_step = []
+    instance = None  # the last Robot created
+
+    def __init__(self, name='Crazyflie', position=(0.0, 0.0, 0.0), yaw=0.0):
+        self.name = name
+        self.time = 0.0
+        self.steps = 0
+        self.body = Quadrotor(position, yaw)
+        self.devices = {
+            'm1_motor': Motor(self, 'm1_motor', 0),
+            'm2_motor': Motor(self, 'm2_motor', 1),
+            'm3_motor': Motor(self, 'm3_motor', 2),
+            'm4_motor': Motor(self, 'm4_motor', 3),
+            'inertial_unit': InertialUnit(self, 'inertial_unit'),
+            'gps': GPS(self, 'gps'),
+            'gyro': Gyro(self, 'gyro'),
+            'camera': Camera(self, 'camera'),
+            'range_front': DistanceSensor(self, 'range_front'),
+            'range_left': DistanceSensor(self, 'range_left'),
+            'range_back': DistanceSensor(self, 'range_back'),
+            'range_right': DistanceSensor(self, 'range_right'),
+        }
+        Robot.instance = self
+
+    def getDevice(self, name):
+        return self.devices.get(name)
+
+    def getName(self):
+        return self.name
+
+    def getBasicTimeStep(self):
+        return float(self.basic_time_step)
+
+    def getTime(self):
+        return self.time
+
+    def step(self, duration=None):
+        """Advance the simulation by duration ms (basicTimeStep by default).
+        Returns -1 once Robot.max_time is reached, 0 otherwise.
+        """
+        if self.max_time is not None and self.time >= self.max_time:
+            return -1
+        if duration is None:
+            duration = self.basic_time_step
+        dt = self.basic_time_step / 1000
+        for _ in range(max(1, int(duration // self.basic_time_step))):
+            self.body.step(dt)
+            self.steps += 1
+            # Count in integer steps so getTime() does not drift
+            self.time = self.steps * dt
+        for callback in self.on_step:
+            callback(self)
+        return 0
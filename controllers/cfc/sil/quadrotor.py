@@ -0,0 +1,128 @@
+"""
+file: quadrotor.py
+
+Rigid-body quadrotor model used by the software-in-the-loop controller module.
+
+The parameters approximate the Bitcraze Crazyflie of the Webots world: four
+propellers in an X configuration, thrust and drag torque proportional to the
+squared propeller velocity, and the linear/angular damping of the world's
+defaultDamping. The frames follow Webots: x forward, y left, z up, and
+roll/pitch/yaw as returned by InertialUnit.getRollPitchYaw().
+"""
+
+from math import cos, sin, tan
+
+GRAVITY = 9.81
+
+MASS = 0.05  # kg
+INERTIA = (1.4e-5, 1.4e-5, 2.17e-5)  # kg m^2, about body x, y, z
+THRUST_CONSTANT = 4e-5  # N / (rad/s)^2
+TORQUE_CONSTANT = 2.4e-6  # N m / (rad/s)^2
+ARM = 0.031  # m, x and y offset of every motor from the centre
+MAX_MOTOR_VELOCITY = 600  # rad/s
+# Propellers follow their commanded velocity as a first-order lag with a
+# bounded acceleration, like the torque limited Webots motors. Without it the
+# derivative kick of a setpoint step (a single 8 ms spike to 600 rad/s) is
+# enough to flip the drone, and a kick on both the roll and the pitch axis
+# spins it up through the propeller drag torque, neither of which happens in
+# Webots.
+MOTOR_TIME_CONSTANT = 0.05  # s
+MAX_MOTOR_ACCELERATION = 1000  # rad/s^2
+LINEAR_DAMPING = 0.5  # fraction of the velocity lost per second
+ANGULAR_DAMPING = 0.5
+
+# Motors m1..m4 sit front-right, rear-right, rear-left and front-left, each
+# ARM away from the centre along x and y.
+
+
+class Quadrotor():
+    """State and dynamics of one quadrotor.
+
+    step() integrates the model over dt seconds. motor_commands holds the
+    signed motor velocities in rad/s as given to Motor.setVelocity, and
+    motor_velocities the actual propeller velocities following them.
+    """
+
+    def __init__(self, position=(0.0, 0.0, 0.0), yaw=0.0):
+        self.x, self.y, self.z = position
+        self.vx = self.vy = self.vz = 0.0
+        self.roll = self.pitch = 0.0
+        self.yaw = yaw
+        # Angular velocity in the body frame
+        self.p = self.q = self.r = 0.0
+        # Acceleration in the world frame, as of the last step
+        self.ax = self.ay = self.az = 0.0
+        self.motor_commands = [0.0, 0.0, 0.0, 0.0]
+        self.motor_velocities = [0.0, 0.0, 0.0, 0.0]
+
+    def step(self, dt):
+        lag = min(1.0, dt / MOTOR_TIME_CONSTANT)
+        w1, w2, w3, w4 = self.motor_velocities
+        c1, c2, c3, c4 = self.motor_commands
+        limit = MAX_MOTOR_ACCELERATION * dt
+        w1 += max(-limit, min(limit, (c1 - w1) * lag))
+        w2 += max(-limit, min(limit, (c2 - w2) * lag))
+        w3 += max(-limit, min(limit, (c3 - w3) * lag))
+        w4 += max(-limit, min(limit, (c4 - w4) * lag))
+        self.motor_velocities = [w1, w2, w3, w4]
+
+        f1 = THRUST_CONSTANT * w1 * w1
+        f2 = THRUST_CONSTANT * w2 * w2
+        f3 = THRUST_CONSTANT * w3 * w3
+        f4 = THRUST_CONSTANT * w4 * w4
+        thrust = f1 + f2 + f3 + f4
+
+        # Body torques: motors on the left (+y) roll the drone positively,
+        # motors at the back (-x) pitch it positively (nose down) and each
+        # propeller reacts against its spinning direction.
+        tau_x = ARM * (f3 + f4 - f1 - f2)
+        tau_y = ARM * (f2 + f3 - f1 - f4)
+        tau_z = -TORQUE_CONSTANT * (w1 * abs(w1) + w2 * abs(w2) + w3 * abs(w3) + w4 * abs(w4))
+
+        cr, sr = cos(self.roll), sin(self.roll)
+        cp, sp = cos(self.pitch), sin(self.pitch)
+        cy, sy = cos(self.yaw), sin(self.yaw)
+
+        # Translational dynamics, thrust along the body z axis
+        thrust_acc = thrust / MASS
+        self.ax = thrust_acc * (cy * sp * cr + sy * sr)
+        self.ay = thrust_acc * (sy * sp * cr - cy * sr)
+        self.az = thrust_acc * cp * cr - GRAVITY
+
+        linear_decay = (1 - LINEAR_DAMPING) ** dt
+        self.vx = (self.vx + self.ax * dt) * linear_decay
+        self.vy = (self.vy + self.ay * dt) * linear_decay
+        self.vz = (self.vz + self.az * dt) * linear_decay
+
+        # Rotational dynamics, Euler's equations in the body frame
+        ixx, iyy, izz = INERTIA
+        p, q, r = self.p, self.q, self.r
+        angular_decay = (1 - ANGULAR_DAMPING) ** dt
+        self.p = (p + (tau_x - (izz - iyy) * q * r) / ixx * dt) * angular_decay
+        self.q = (q + (tau_y - (ixx - izz) * p * r) / iyy * dt) * angular_decay
+        self.r = (r + (tau_z - (iyy - ixx) * p * q) / izz * dt) * angular_decay
+
+        # Integrate position and attitude
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        self.z += self.vz * dt
+
+        p, q, r = self.p, self.q, self.r
+        self.roll += (p + (q * sr + r * cr) * tan(self.pitch)) * dt
+        self.pitch += (q * cr - r * sr) * dt
+        self.yaw += (q * sr + r * cr) / cp * dt
+        if self.yaw > 3.141592653589793:
+            self.yaw -= 6.283185307179586
+        elif self.yaw < -3.141592653589793:
+            self.yaw += 6.283185307179586
+
+        # Ground contact: the drone rests on the floor until its thrust
+        # exceeds its weight
+        if self.z <= 0.0:
+            self.z = 0.0
+            if self.vz < 0.0:
+                self.vz = 0.0
+            if thrust_acc * cp * cr <= GRAVITY:
+                self.vx = self.vy = self.vz = 0.0
+                self.p = self.q = self.r = 0.0
+                self.roll = self.pitch = 0.0
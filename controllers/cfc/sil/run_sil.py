@@ -0,0 +1,85 @@
+"""
+file: run_sil.py
+
+Run the cfc controller headless, without Webots.
+
+The stand-in controller module of this directory replaces the Webots API and
+simulates the drone with a simple quadrotor model, so the unchanged cfc.py
+control loop runs as fast as the host allows. Commands can be injected into
+the control loop at given simulated times to exercise command ingestion:
+upper-case legacy commands (UP, FORWARD, ...) go straight into the control
+queue, anything else is handled as a Tello SDK command line ("up 50").
+
+    python run_sil.py [--duration 10] [--command 2:UP --command "4:cw 90" ...]
+                      [--record FLIGHT.npy]
+"""
+
+import argparse
+import os
+import runpy
+import sys
+import time
+
+SIL_DIR = os.path.dirname(os.path.abspath(__file__))
+CFC_DIR = os.path.dirname(SIL_DIR)
+sys.path[:0] = [SIL_DIR, CFC_DIR]
+
+import controller  # noqa: E402  (the stand-in, thanks to the sys.path above)
+import server  # noqa: E402
+
+
+def parse_command(value):
+    at, _, command = value.partition(':')
+    return float(at), command
+
+
+def schedule_commands(commands):
+    """Return an on_step callback sending every (time, command) pair to the
+    controller once the simulated time reaches it.
+    """
+    # Latest first, commands given for the same time keep their order
+    pending = sorted(commands, key=lambda c: c[0])[::-1]
+
+    def inject(robot):
+        while pending and robot.getTime() >= pending[-1][0]:
+            command = pending.pop()[1]
+            if command.isupper():
+                server.CONTROL_QUEUE.put(command)
+            else:
+                reply = server.INTERPRETER.handle(command)
+                print(f"{robot.getTime():.3f} s: {command!r} -> {reply!r}")
+
+    return inject
+
+
+def run(duration, commands=(), time_step=8):
+    """Run cfc.py for duration simulated seconds. Returns the robot and the
+    wall-clock time it took.
+    """
+    controller.Robot.basic_time_step = time_step
+    controller.Robot.max_time = duration
+    controller.Robot.on_step = [schedule_commands(commands)]
+
+    start = time.perf_counter()
+    runpy.run_path(os.path.join(CFC_DIR, 'cfc.py'), run_name='__main__')
+    return controller.Robot.instance, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10.0, help='simulated seconds to run')
+    parser.add_argument('--time-step', type=int, default=8, help='basicTimeStep in ms')
+    parser.add_argument('--command', type=parse_command, action='append', default=[],
+                        help='TIME:COMMAND, queue COMMAND (e.g. UP) at TIME simulated seconds')
+    # Read by cfc.py itself, which sees the same command line
+    parser.add_argument('--record', metavar='FILE', help='record every control step to FILE, see recorder.py')
+    args = parser.parse_args()
+
+    robot, wall = run(args.duration, args.command, args.time_step)
+    body = robot.body
+    print(f"steps:      {robot.steps}")
+    print(f"sim time:   {robot.getTime():.3f} s")
+    print(f"wall time:  {wall:.3f} s")
+    print(f"step rate:  {robot.steps / wall:.0f} steps/s ({robot.getTime() / wall:.1f}x real time)")
+    print(f"position:   x={body.x:.3f} y={body.y:.3f} z={body.z:.3f} m")
+    print(f"attitude:   roll={body.roll:.3f} pitch={body.pitch:.3f} yaw={body.yaw:.3f} rad")
@@ -0,0 +1,111 @@
+"""
+file: run_swarm.py
+
+Run a swarm of simulated Crazyflies in one process, without Webots.
+
+Every drone is a stand-in Robot named "Crazyflie(i)" with its own
+CrazyflieController, all stepped in lock-step by a single loop. One
+swarm.SwarmServer serves all of them: drone i answers the Tello protocol at
+the address of drone i (see swarm.py) and the HTTP /send route is routed by
+the address the client connected to.
+
+    python run_swarm.py [--drones 10] [--duration 30] [--mode host|port] [--realtime]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+SIL_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [SIL_DIR, os.path.dirname(SIL_DIR)]
+
+from controller import Robot  # noqa: E402
+from crazyflie import CrazyflieController  # noqa: E402
+from swarm import SwarmServer  # noqa: E402
+from video_stream import stream_name  # noqa: E402
+
+SPACING = 1.0  # m between neighbouring drones on the ground
+# The server thread waits for the GIL while the drones are stepped; a short
+# switch interval bounds how long a command waits before it is handled
+SWITCH_INTERVAL = 0.0005  # s
+
+
+def build_swarm(count, mode='host', http=True):
+    """Create count drones on a square grid and the server for them. Returns
+    the SwarmServer (not started yet) and a list of (robot, controller).
+    """
+    names = ['Crazyflie({})'.format(i) for i in range(count)]
+    swarm_server = SwarmServer(names, mode, http)
+    side = max(1, int(count ** 0.5 + 0.999))
+    drones = []
+    for i, name in enumerate(names):
+        robot = Robot(name, position=((i % side) * SPACING, (i // side) * SPACING, 0.0))
+        udp_server = swarm_server.drones[name]
+        address = swarm_server.addresses[name]
+        video_name = stream_name(address.host, address.command_port)
+        drones.append((robot, CrazyflieController(robot, udp_server.interpreter, udp_server.send_state,
+                                                  video_name=video_name)))
+    return swarm_server, drones
+
+
+def start_server(swarm_server):
+    """Run swarm_server in a thread, returned once the server is ready."""
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    thread = threading.Thread(target=swarm_server.run, daemon=True)
+    thread.start()
+    swarm_server.ready.wait()
+    if swarm_server.error is not None:
+        raise swarm_server.error
+    return thread
+
+
+def run(drones, duration, after_step=None, realtime=False, wall_time=None):
+    """Step all drones until duration simulated seconds (or wall_time
+    seconds of the wall clock), as fast as possible or, with realtime, no
+    faster than the wall clock. after_step(robot, controller) is called
+    after every drone step. Returns the number of swarm steps and the
+    wall-clock time they took.
+    """
+    timestep = int(Robot.basic_time_step)
+    steps = 0
+    start = time.perf_counter()
+    end = start + wall_time if wall_time is not None else float('inf')
+    while drones[0][0].getTime() < duration and time.perf_counter() < end:
+        for robot, controller in drones:
+            robot.step(timestep)
+            controller.step()
+            if after_step is not None:
+                after_step(robot, controller)
+        steps += 1
+        if realtime:
+            ahead = drones[0][0].getTime() - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+    return steps, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drones', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30.0, help='simulated seconds to run')
+    parser.add_argument('--mode', choices=('host', 'port'), default='host', help='addressing mode, see swarm.py')
+    parser.add_argument('--realtime', action='store_true', help='run no faster than the wall clock, for clients')
+    args = parser.parse_args()
+
+    swarm_server, drones = build_swarm(args.drones, args.mode)
+    start_server(swarm_server)
+    for name, address in swarm_server.addresses.items():
+        print("{:14s} udp {}:{}  http {}:{}".format(name, address.host, address.command_port,
+                                                    address.host, address.http_port))
+
+    steps, wall = run(drones, args.duration, realtime=args.realtime)
+    sim_time = drones[0][0].getTime()
+    print(f"drones:     {len(drones)}")
+    print(f"sim time:   {sim_time:.3f} s")
+    print(f"wall time:  {wall:.3f} s")
+    print(f"step rate:  {steps / wall:.0f} swarm steps/s ({sim_time / wall:.1f}x real time)")
+    swarm_server.stop()
+    for _, crazyflie in drones:
+        crazyflie.close()
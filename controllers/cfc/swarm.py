@@ -0,0 +1,132 @@
+"""
+file: swarm.py
+
+Addressing and serving of a swarm of simulated drones.
+
+Every drone of a swarm world is named "Crazyflie(i)" and gets the address of
+drone i, in one of two modes:
+    host: its own loopback address 127.0.0.(i+1) with the usual Tello ports
+          (commands 8889, HTTP 5000). Clients tell the drones apart by IP,
+          like in a real Tello swarm. Linux and Windows route all of
+          127.0.0.0/8 to the loopback interface, macOS needs an alias per
+          address (ifconfig lo0 alias 127.0.0.2).
+    port: 127.0.0.1 with ports PORT_BASE + PORT_STRIDE * i (commands), + 1
+          (state) and + 2 (HTTP), for UDP tooling that can be pointed at any
+          port.
+A drone name without an index is a single drone, served on all interfaces
+at the usual ports, as in my_world.wbt.
+
+SwarmServer serves all drones of one process from a single event loop, each
+drone with its own TelloInterpreter and queue, and an HTTP server listening
+at the address of each drone.
+"""
+
+import asyncio
+import re
+import threading
+from collections import namedtuple
+
+from werkzeug.serving import make_server
+
+import server
+from tello_sdk import TelloInterpreter
+
+DroneAddress = namedtuple('DroneAddress', 'host command_port state_port http_port')
+
+PORT_BASE = 11000
+PORT_STRIDE = 10
+MAX_DRONES = 254  # loopback addresses 127.0.0.1 to 127.0.0.254
+
+_INDEX = re.compile(r'\((\d+)\)$')
+
+
+def drone_index(name):
+    """Index of a swarm drone from its Webots name, None for a single drone."""
+    match = _INDEX.search(name)
+    return int(match.group(1)) if match else None
+
+
+def drone_address(index, mode='host'):
+    """DroneAddress of drone index (None for the single drone)."""
+    if index is None:
+        return DroneAddress('0.0.0.0', server.TELLO_COMMAND_PORT, server.TELLO_STATE_PORT, server.HTTP_PORT)
+    if not 0 <= index < MAX_DRONES:
+        raise ValueError('drone index must be in [0, {}), got {}'.format(MAX_DRONES, index))
+    if mode == 'host':
+        return DroneAddress('127.0.0.{}'.format(index + 1), server.TELLO_COMMAND_PORT,
+                            server.TELLO_STATE_PORT, server.HTTP_PORT)
+    if mode == 'port':
+        port = PORT_BASE + PORT_STRIDE * index
+        return DroneAddress('127.0.0.1', port, port + 1, port + 2)
+    raise ValueError("mode must be 'host' or 'port', got {!r}".format(mode))
+
+
+class SwarmServer():
+    def __init__(self, names, mode='host', http=True):
+        """
+        Arguments:
+            names: Webots names of the drones, "Crazyflie(i)"
+            mode: addressing mode, 'host' or 'port'
+            http: also serve the HTTP /send route
+        """
+        self.mode = mode
+        self.http = http
+        # name -> TelloUdpServer, each with the interpreter of its drone
+        self.drones = {}
+        self.addresses = {}
+        for name in names:
+            address = self.addresses[name] = drone_address(drone_index(name), mode)
+            self.drones[name] = server.TelloUdpServer(TelloInterpreter(name=name), address.host,
+                                                      address.command_port, address.state_port)
+        self.loop = None
+        self.http_servers = []
+        self.ready = threading.Event()
+        self.error = None  # why run() could not start serving
+
+    def run(self):
+        """Serve every drone, forever, in the calling thread."""
+        loop = self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            for udp_server in self.drones.values():
+                loop.run_until_complete(udp_server.start())
+            if self.http:
+                self.start_http()
+        except OSError as e:
+            # Do not leave the threads waiting for ready hanging
+            self.error = e
+            self.ready.set()
+            self.close()
+            raise
+        self.ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        for udp_server in self.drones.values():
+            udp_server.close()
+        # Let the transports really close their sockets
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+
+    def start_http(self):
+        # Requests are routed by the address the server listens on (see
+        # server.routed_server()), so every drone gets its own listener
+        for name, address in self.addresses.items():
+            server.HTTP_ROUTES['{}:{}'.format(address.host, address.http_port)] = self.drones[name]
+        for address in self.addresses.values():
+            http_server = make_server(address.host, address.http_port, server.app, threaded=True)
+            threading.Thread(target=http_server.serve_forever, daemon=True).start()
+            self.http_servers.append(http_server)
+
+    def stop(self):
+        """Stop run() from another thread."""
+        for http_server in self.http_servers:
+            http_server.shutdown()
+            http_server.server_close()
+        for address in self.addresses.values():
+            server.HTTP_ROUTES.pop('{}:{}'.format(address.host, address.http_port), None)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,51 @@
+"""
+file: telemetry.py
+
+Fixed-rate state publisher for the Crazyflie control loop.
+
+Tello clients do not poll for the drone state: the drone pushes a state
+packet in the "key:value;" format to port 8890 of the client, and the client
+keeps the latest one for its get_height(), get_battery(), ... getters.
+TelemetryPublisher does the same for the simulated drone, at its own rate
+instead of the control rate, from the DroneStatus the control loop refreshes
+every step.
+"""
+
+MAX_RATE = 100  # Hz
+DEFAULT_RATE = 10  # Hz, like the Tello
+
+
+class TelemetryPublisher():
+    def __init__(self, status, send, rate=DEFAULT_RATE):
+        """
+        Arguments:
+            status: tello_sdk.DroneStatus to publish
+            send: callable taking one state packet (bytes), e.g.
+                TelloUdpServer.send_state
+            rate: packets per second, up to MAX_RATE
+        """
+        self.status = status
+        self.send = send
+        self.set_rate(rate)
+        self.next_time = None
+        self.packets = 0
+
+    def set_rate(self, rate):
+        """Change the publishing rate (Hz), also while publishing."""
+        if not 0 < rate <= MAX_RATE:
+            raise ValueError('rate must be in (0, {}] Hz, got {}'.format(MAX_RATE, rate))
+        self.rate = rate
+        self.period = 1 / rate
+
+    def step(self, now):
+        """Publish a state packet if one is due at simulation time now (s)."""
+        if self.next_time is not None and now < self.next_time:
+            return
+        self.send(self.status.state_packet())
+        self.packets += 1
+        # Keep the deadlines on a fixed grid, but after a stall publish once
+        # instead of catching up with a burst
+        if self.next_time is None or now - self.next_time >= self.period:
+            self.next_time = now + self.period
+        else:
+            self.next_time += self.period
@@ -0,0 +1,283 @@
+"""
+file: tello_sdk.py
+
+Tello SDK command interpreter for the simulated Crazyflie.
+
+TelloInterpreter.handle() takes one command line of the Tello SDK (as sent
+by djitellopy or ai/djitellopy_webots.py) and returns the reply text right
+away:
+    - control commands (takeoff, land, up 50, cw 90, go 50 0 0 30, curve ...)
+      are validated and queued for the control loop as Command tuples;
+    - rc commands go to a latest-wins slot instead of the queue, so a high
+      rate joystick stream never builds a backlog;
+    - query commands (battery?, height?, attitude?, ...) are answered from
+      the DroneStatus the control loop refreshes every step, which is also
+      what the state packets are made of.
+Legacy commands of the /up, /down, ... routes stay plain strings ("UP").
+"""
+
+import queue
+import time
+from collections import namedtuple
+from math import degrees, sqrt
+
+# A validated control command for the control loop. Distances in m, angles
+# in degrees, speeds in m/s.
+Command = namedtuple('Command', 'verb args')
+
+DEFAULT_SPEED = 0.5  # m/s, until changed with "speed x"
+
+OK = 'ok'
+ERROR = 'error'
+OUT_OF_RANGE = 'out of range'
+
+MOVE_DIRECTIONS = {
+    # direction: (forward, left, up) unit vector in the body frame
+    'up': (0, 0, 1),
+    'down': (0, 0, -1),
+    'left': (0, 1, 0),
+    'right': (0, -1, 0),
+    'forward': (1, 0, 0),
+    'back': (-1, 0, 0),
+}
+
+# Tello state packet, formatted with a DroneStatus
+STATE_FORMAT = ('mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:{0.pitch};roll:{0.roll};yaw:{0.yaw};'
+                'vgx:{0.vgx};vgy:{0.vgy};vgz:{0.vgz};templ:{0.templ};temph:{0.temph};tof:{0.tof};'
+                'h:{0.h};bat:{0.bat};baro:{0.baro:.2f};time:{0.time};'
+                'agx:{0.agx:.2f};agy:{0.agy:.2f};agz:{0.agz:.2f};\r\n')
+
+# Commands answered with "ok" that have no effect in the simulation
+NO_OP_COMMANDS = {'command', 'keepalive', 'mon', 'moff'}
+
+
+class CommandError(Exception):
+    """A command that cannot be executed. The message is the reply."""
+
+
+class RcSetpoint():
+    """Latest-wins slot for rc commands. Writers replace the value, the
+    control loop reads the newest one; older values are simply dropped.
+    """
+
+    def __init__(self):
+        self.value = (0, 0, 0, 0)
+        self.sequence = 0
+        self.received_at = 0.0
+
+    def set(self, left_right, forward_backward, up_down, yaw):
+        self.value = (left_right, forward_backward, up_down, yaw)
+        self.received_at = time.perf_counter()
+        self.sequence += 1
+
+
+class DroneStatus():
+    """Drone state in Tello units, refreshed by the control loop and read by
+    the query commands. Angles in degrees, speeds in cm/s, heights in cm,
+    accelerations in 0.001 g.
+    """
+    __slots__ = ('pitch', 'roll', 'yaw', 'vgx', 'vgy', 'vgz', 'templ', 'temph', 'tof', 'h', 'bat',
+                 'baro', 'time', 'agx', 'agy', 'agz', 'speed', 'flying', 'updated_at')
+
+    def __init__(self):
+        self.pitch = self.roll = self.yaw = 0
+        self.vgx = self.vgy = self.vgz = 0
+        self.templ, self.temph = 60, 62
+        self.tof = 10
+        self.h = 0
+        self.bat = 100
+        self.baro = 0.0
+        self.time = 0
+        # Accelerometer at rest, 1 g along -z
+        self.agx, self.agy, self.agz = 0.0, 0.0, -1000.0
+        self.speed = int(DEFAULT_SPEED * 100)
+        self.flying = False
+        self.updated_at = 0.0
+
+    def update(self, state, flying, flight_time, speed):
+        """Refresh from a SensorSnapshot and the flight state of the control
+        loop (flight_time in s, speed setting in m/s).
+        """
+        self.roll = int(round(degrees(state.roll)))
+        self.pitch = int(round(degrees(state.pitch)))
+        self.yaw = int(round(degrees(state.yaw)))
+        self.vgx = int(round(state.v_x_global * 100))
+        self.vgy = int(round(state.v_y_global * 100))
+        self.vgz = int(round(state.v_z_global * 100))
+        self.h = int(round(state.altitude * 100))
+        # The Tello time-of-flight sensor reads 10 cm when out of range
+        self.tof = max(10, self.h)
+        self.baro = round(state.altitude, 2)
+        self.time = int(flight_time)
+        # Roughly a full battery per 10 minutes of flight
+        self.bat = max(0, 100 - int(flight_time / 6))
+        self.speed = int(round(speed * 100))
+        self.flying = flying
+        self.updated_at = state.time
+
+    def state_packet(self):
+        """The state in the format of the Tello state packets (SDK 2.0, no
+        mission pad detected), as bytes.
+        """
+        return STATE_FORMAT.format(self).encode('ascii')
+
+
+def _ints(args, count):
+    if len(args) != count:
+        raise CommandError(ERROR)
+    try:
+        return [int(a) for a in args]
+    except ValueError:
+        raise CommandError(ERROR)
+
+
+def _check_range(value, low, high):
+    if not low <= value <= high:
+        raise CommandError(OUT_OF_RANGE)
+
+
+def _check_offset(x, y, z):
+    # x, y and z can not all be between -20 and 20 at the same time
+    for value in (x, y, z):
+        _check_range(value, -500, 500)
+    if -20 <= x <= 20 and -20 <= y <= 20 and -20 <= z <= 20:
+        raise CommandError(OUT_OF_RANGE)
+
+
+def _arc_radius(p1, p2):
+    """Radius of the circle through the origin, p1 and p2 (None if the three
+    points are collinear).
+    """
+    a = sqrt(sum(c * c for c in p1))
+    b = sqrt(sum(c * c for c in p2))
+    c = sqrt(sum((u - v) ** 2 for u, v in zip(p1, p2)))
+    cross = (p1[1] * p2[2] - p1[2] * p2[1], p1[2] * p2[0] - p1[0] * p2[2], p1[0] * p2[1] - p1[1] * p2[0])
+    area2 = sqrt(sum(v * v for v in cross))
+    if area2 < 1e-9:
+        return None
+    return a * b * c / (2 * area2)
+
+
+def parse_command(text):
+    """Turn one Tello SDK control command into a Command. Raises CommandError
+    with the reply for invalid or unsupported commands.
+    """
+    words = text.split()
+    if not words:
+        raise CommandError(ERROR)
+    verb, args = words[0].lower(), words[1:]
+
+    if verb in ('takeoff', 'land', 'emergency', 'stop', 'motoron', 'motoroff'):
+        if args:
+            raise CommandError(ERROR)
+        return Command(verb, ())
+
+    if verb in MOVE_DIRECTIONS:
+        distance, = _ints(args, 1)
+        _check_range(distance, 20, 500)
+        forward, left, up = MOVE_DIRECTIONS[verb]
+        d = distance / 100
+        return Command('move', (forward * d, left * d, up * d, None))
+
+    if verb in ('cw', 'ccw'):
+        angle, = _ints(args, 1)
+        _check_range(angle, 1, 360)
+        # Clockwise seen from above is a negative yaw
+        return Command('rotate', (-angle if verb == 'cw' else angle,))
+
+    if verb == 'go':
+        if len(args) == 5:
+            # Mission pad relative flight is not simulated
+            raise CommandError(ERROR)
+        x, y, z, speed = _ints(args, 4)
+        _check_offset(x, y, z)
+        _check_range(speed, 10, 100)
+        return Command('move', (x / 100, y / 100, z / 100, speed / 100))
+
+    if verb == 'curve':
+        if len(args) == 8:
+            raise CommandError(ERROR)
+        x1, y1, z1, x2, y2, z2, speed = _ints(args, 7)
+        _check_offset(x1, y1, z1)
+        _check_offset(x2, y2, z2)
+        _check_range(speed, 10, 60)
+        p1 = (x1 / 100, y1 / 100, z1 / 100)
+        p2 = (x2 / 100, y2 / 100, z2 / 100)
+        radius = _arc_radius(p1, p2)
+        if radius is None or not 0.5 <= radius <= 10:
+            raise CommandError(ERROR)
+        return Command('curve', (p1, p2, speed / 100))
+
+    if verb == 'speed':
+        speed, = _ints(args, 1)
+        _check_range(speed, 10, 100)
+        return Command('speed', (speed / 100,))
+
+    raise CommandError(ERROR)
+
+
+class TelloInterpreter():
+    """Turns Tello SDK command lines into work for one simulated drone.
+
+    queue receives the validated Commands for the control loop, rc holds the
+    newest rc setpoint, stream_on whether the camera frames are wanted
+    (streamon/streamoff) and status is read to answer queries.
+    """
+
+    def __init__(self, control_queue=None, name='Crazyflie'):
+        self.queue = control_queue if control_queue is not None else queue.Queue()
+        self.rc = RcSetpoint()
+        self.stream_on = False
+        self.status = DroneStatus()
+        self.name = name
+        self.queries = {
+            'speed?': lambda s: str(s.speed),
+            'battery?': lambda s: str(s.bat),
+            'time?': lambda s: str(s.time),
+            'height?': lambda s: str(s.h),
+            'temp?': lambda s: str((s.templ + s.temph) // 2),
+            'attitude?': lambda s: 'pitch:{};roll:{};yaw:{};'.format(s.pitch, s.roll, s.yaw),
+            'baro?': lambda s: str(int(round(s.baro))),
+            'acceleration?': lambda s: 'agx:{:.2f};agy:{:.2f};agz:{:.2f};'.format(s.agx, s.agy, s.agz),
+            'tof?': lambda s: '{}mm'.format(s.tof * 10),
+            'wifi?': lambda s: '90',
+            'sdk?': lambda s: '20',
+            'sn?': lambda s: 'SIM-{}'.format(self.name),
+            'active?': lambda s: OK,
+        }
+
+    def handle(self, text):
+        """Execute one command line and return the reply text."""
+        text = text.strip()
+        words = text.split(None, 1)
+        if not words:
+            return ERROR
+        verb = words[0].lower()
+
+        if verb == 'rc':
+            values = text.split()[1:]
+            try:
+                left_right, forward_backward, up_down, yaw = _ints(values, 4)
+            except CommandError as e:
+                return str(e)
+            clamp = lambda v: max(-100, min(100, v))  # noqa: E731
+            self.rc.set(clamp(left_right), clamp(forward_backward), clamp(up_down), clamp(yaw))
+            return OK
+
+        query = self.queries.get(verb)
+        if query is not None:
+            return query(self.status)
+
+        if verb in NO_OP_COMMANDS:
+            return OK
+
+        if verb in ('streamon', 'streamoff'):
+            self.stream_on = verb == 'streamon'
+            return OK
+
+        try:
+            command = parse_command(text)
+        except CommandError as e:
+            return str(e)
+        self.queue.put(command)
+        return OK
@@ -0,0 +1,110 @@
+"""
+file: video_stream.py
+
+Camera frames of a simulated Tello for clients on the same machine, through
+shared memory instead of the H.264 UDP stream of the real drone.
+
+VideoPublisher creates a shared memory block named after the drone's address
+(stream_name()) and, subscribed to the CameraStage, copies every camera
+image into it as RGB, the format djitellopy hands out. The block holds a
+header, then SLOTS frame slots used round robin:
+
+    header  magic b'TVID', version, width, height, channels, slots (u4 each),
+            latest: sequence number of the newest complete frame (u8)
+    slot i  sequence (u8), simulated time (f8), wall-clock time of
+            publication (f8, time.time()), then the frame, aligned to 64 bytes
+
+A slot's sequence is 0 while it is written and set to the frame's sequence
+number (1, 2, ...) once the frame is complete; latest is updated last.
+Readers (djitellopy_webots.BackgroundFrameRead) take NumPy views of the
+slots, without copying, and compare the sequences to detect overwrites.
+"""
+
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = b'TVID'
+VERSION = 1
+SLOTS = 8  # 250 ms of frames at the 32 ms camera period
+CHANNELS = 3
+HEADER = struct.Struct('<4s5IQ')
+SLOT_HEADER = struct.Struct('<Qdd')
+ALIGNMENT = 64
+
+
+def stream_name(host, port):
+    """Name of the shared memory block of the drone serving the Tello
+    protocol at host:port, as seen by a client on the same machine.
+    """
+    if host == '0.0.0.0':
+        host = '127.0.0.1'
+    return 'tello_video_{}_{}'.format(host, port)
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class VideoPublisher():
+    def __init__(self, name, width, height, slots=SLOTS):
+        """
+        Arguments:
+            name: name of the shared memory block, see stream_name()
+            width, height: size of the camera images
+            slots: frames kept, a reader's view of a frame stays valid
+                until slots - 1 newer frames have been published
+        """
+        self.name = name
+        self.width = width
+        self.height = height
+        self.slots = slots
+        self.frame_size = width * height * CHANNELS
+        self.slot_size = _aligned(SLOT_HEADER.size) + _aligned(self.frame_size)
+        size = _aligned(HEADER.size) + slots * self.slot_size
+        try:
+            self.memory = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a controller that did not exit cleanly
+            stale = shared_memory.SharedMemory(name)
+            stale.unlink()
+            stale.close()
+            self.memory = shared_memory.SharedMemory(name, create=True, size=size)
+        buffer = self.memory.buf
+        self.latest = np.ndarray((), '<u8', buffer, HEADER.size - 8)
+        self.slot_headers = []
+        self.frames = []
+        for i in range(slots):
+            offset = _aligned(HEADER.size) + i * self.slot_size
+            self.slot_headers.append(offset)
+            self.frames.append(np.ndarray((height, width, CHANNELS), np.uint8, buffer,
+                                          offset + _aligned(SLOT_HEADER.size)))
+        self.sequence = 0
+        # The magic goes in last, readers wait for it
+        HEADER.pack_into(buffer, 0, b'\0' * 4, VERSION, width, height, CHANNELS, slots, 0)
+        buffer[:4] = MAGIC
+
+    def publish(self, image, sim_time):
+        """Publish one camera image, a (height, width, 4) BGRA array, taken at
+        simulated time sim_time. Has the signature of a CameraStage
+        subscriber.
+        """
+        sequence = self.sequence + 1
+        slot = sequence % self.slots
+        offset = self.slot_headers[slot]
+        buffer = self.memory.buf
+        SLOT_HEADER.pack_into(buffer, offset, 0, 0.0, 0.0)
+        # BGRA to RGB, in the same pass as the copy
+        np.copyto(self.frames[slot], image[:, :, 2::-1])
+        SLOT_HEADER.pack_into(buffer, offset, sequence, sim_time, time.time())
+        self.latest[()] = sequence
+        self.sequence = sequence
+
+    def close(self):
+        """Remove the shared memory block. Readers keep their mapping."""
+        self.latest = None
+        self.frames = []
+        self.memory.close()
+        self.memory.unlink()